@@ -1,4 +1,4 @@
-from src.utils.tsplib_reader import read_tsplib, distance_matrix
+from src.utils.instance_cache import load_cached
 from src.heuristics.greedy import nearest_neighbor
 from src.heuristics.two_opt import two_opt
 from src.utils.tour_utils import tour_cost
@@ -10,11 +10,10 @@ def main():
 
     print(f"Caricamento istanza: {instance_path}")
 
-    coords, n = read_tsplib(instance_path)
-    print(f"Città lette: {n}")
-
-    dist = distance_matrix(coords)
-    print("Matrice delle distanze creata.")
+    # istanza e matrice (distanza euclidea esatta) dalla cache su disco
+    instance, dist = load_cached(instance_path, weight_type=None)
+    print(f"Città lette: {instance.dimension}")
+    print("Matrice delle distanze caricata.")
 
     # euristica greedy (Nearest Neighbor)
     greedy_tour, greedy_cost = nearest_neighbor(dist, start=0)
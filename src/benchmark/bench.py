@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.benchmark.generators import KINDS, ensure_instance_file, instance_name
+from src.heuristics.construction import DENSE_MAX_N, construct
+from src.heuristics.or_opt import or_opt
+from src.heuristics.simulated_annealing import simulated_annealing
+from src.heuristics.two_opt import two_opt
+from src.utils.distances import DistanceOracle, build_distance_matrix
+from src.utils.neighbors import build_neighbor_lists
+from src.utils.tsplib_reader import load_instance
+
+STAGES = ("parse", "distances", "neighbors", "construction", "two_opt", "or_opt", "sa")
+SIZES = (100, 1000, 10000)
+NEIGHBORS = 10
+CONSTRUCTION = "greedy_edge"
+
+# Una misura è una regressione se è più lenta della baseline di oltre
+# TIME_TOLERANCE (relativo) e di oltre MIN_SECONDS (sotto è rumore)
+TIME_TOLERANCE = 0.25
+MIN_SECONDS = 0.005
+# Aumento relativo di costo del tour considerato una regressione
+COST_TOLERANCE = 1e-6
+
+
+def measure(fn, repeats=3):
+    """
+    Esegue fn una volta sotto tracemalloc (picco di memoria, fa anche da
+    riscaldamento) e poi 'repeats' volte cronometrate con perf_counter.
+    Restituisce (risultato, misure) con tempo mediano e minimo in secondi e
+    picco di memoria in MB.
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+
+    return result, {
+        "time": statistics.median(times) if times else None,
+        "time_min": min(times) if times else None,
+        "repeats": repeats,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def benchmark_instance(path, seed=0, stages=STAGES, repeats=3):
+    """
+    Misura in sequenza gli stadi della pipeline su un'istanza: lettura del
+    file, distanze (matrice NxN fino a DENSE_MAX_N, poi DistanceOracle),
+    liste dei vicini, costruzione (CONSTRUCTION), 2-opt e Or-opt con i vicini
+    e SA adattivo. Ogni stadio parte dal risultato del precedente; gli stadi
+    non richiesti vengono eseguiti una volta senza misura se servono ai
+    successivi. Restituisce un dizionario stadio -> misure (con 'cost' per
+    gli stadi che producono un tour).
+    """
+    results = {}
+    state = {}
+
+    def run(stage, fn):
+        if stage in stages:
+            value, stats = measure(fn, repeats)
+            results[stage] = stats
+        else:
+            value = fn()
+        return value
+
+    last = STAGES.index(max(stages, key=STAGES.index))
+
+    instance = run("parse", lambda: load_instance(path))
+    n = instance.dimension
+    if last >= STAGES.index("distances"):
+        state["D"] = run("distances", lambda: build_distance_matrix(instance.coords, None)
+                         if n <= DENSE_MAX_N else DistanceOracle(instance.coords))
+    if last >= STAGES.index("neighbors"):
+        state["nb"] = run("neighbors", lambda: build_neighbor_lists(instance.coords, NEIGHBORS))
+
+    tour_stages = (
+        ("construction", lambda tour: construct(CONSTRUCTION, instance, weight_type=None,
+                                                distance_matrix=state["D"])),
+        ("two_opt", lambda tour: two_opt(state["D"], tour, state["nb"])),
+        ("or_opt", lambda tour: or_opt(state["D"], tour, state["nb"])),
+        ("sa", lambda tour: simulated_annealing(state["D"], tour, neighbors=state["nb"],
+                                                rng=random.Random(seed), schedule="adaptive")),
+    )
+    tour = None
+    for stage, step in tour_stages:
+        if STAGES.index(stage) > last:
+            break
+        tour, cost = run(stage, lambda: step(tour))
+        if stage in results:
+            results[stage]["cost"] = float(cost)
+    return results
+
+
+def run_benchmark(kinds=KINDS, sizes=SIZES, seeds=(0,), stages=STAGES, repeats=3,
+                  instances_dir="results/benchmark/instances", verbose=True):
+    """
+    Benchmark su tutte le istanze sintetiche (tipo x dimensione x seme),
+    generate in 'instances_dir' se non esistono già.
+    Restituisce la lista dei record (uno per istanza e stadio).
+    """
+    records = []
+    for kind in kinds:
+        for n in sizes:
+            for seed in seeds:
+                path = ensure_instance_file(kind, n, seed, instances_dir)
+                name = instance_name(kind, n, seed)
+                if verbose:
+                    print(f"--- {name} ---")
+                for stage, stats in benchmark_instance(path, seed, stages, repeats).items():
+                    record = {"instance": name, "kind": kind, "n": n, "seed": seed,
+                              "stage": stage, **stats}
+                    records.append(record)
+                    if verbose:
+                        print(f"  {_format(record)}")
+    return records
+
+
+def compare(records, baseline, time_tolerance=TIME_TOLERANCE, min_seconds=MIN_SECONDS,
+            cost_tolerance=COST_TOLERANCE):
+    """
+    Confronta i record con quelli della baseline (stessa istanza e stadio).
+    Per il tempo si usa il minimo delle ripetizioni, meno sensibile al
+    rumore della macchina. Restituisce una lista di (record, record della
+    baseline o None, segnalazioni), con segnalazioni "time", "cost" e/o "memory".
+    """
+    base = {(r["instance"], r["stage"]): r for r in baseline}
+    report = []
+    for record in records:
+        old = base.get((record["instance"], record["stage"]))
+        flags = []
+        if old is not None:
+            if (record["time_min"] > old["time_min"] * (1 + time_tolerance)
+                    and record["time_min"] - old["time_min"] > min_seconds):
+                flags.append("time")
+            if (record.get("cost") is not None and old.get("cost") is not None
+                    and record["cost"] > old["cost"] * (1 + cost_tolerance)):
+                flags.append("cost")
+            if record["peak_mb"] > old["peak_mb"] * (1 + time_tolerance) + 1.0:
+                flags.append("memory")
+        report.append((record, old, flags))
+    return report
+
+
+def save_results(records, path):
+    """Salva i record in JSON con le informazioni sull'ambiente di esecuzione."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "records": records,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["records"]
+
+
+def _format(record):
+    text = (f"{record['stage']:<13} {record['time']:10.4f}s (min {record['time_min']:.4f}s)"
+            f"  picco {record['peak_mb']:9.1f} MB")
+    if record.get("cost") is not None:
+        text += f"  costo {record['cost']:.2f}"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della pipeline su istanze sintetiche")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES),
+                        help="numero di città (es. 100 1000 10000 100000)")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=3, help="esecuzioni cronometrate per stadio")
+    parser.add_argument("--instances-dir", default="results/benchmark/instances")
+    parser.add_argument("--output", default="results/benchmark/latest.json")
+    parser.add_argument("--baseline", default="results/benchmark/baseline.json",
+                        help="baseline con cui confrontare i risultati")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="salva i risultati anche come nuova baseline")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                        help="rallentamento relativo oltre il quale si segnala una regressione")
+    args = parser.parse_args()
+
+    records = run_benchmark(args.kinds, args.sizes, args.seeds, args.stages, args.repeats,
+                            args.instances_dir)
+    save_results(records, args.output)
+    print(f"\nRisultati salvati in: {args.output}")
+
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\n== CONFRONTO CON {args.baseline} ==")
+        for record, old, flags in compare(records, load_results(args.baseline), args.tolerance):
+            if old is None:
+                continue
+            ratio = record["time_min"] / old["time_min"] if old["time_min"] else float("inf")
+            mark = "  REGRESSIONE: " + ", ".join(flags) if flags else ""
+            print(f"{record['instance']:<18} {record['stage']:<13} {old['time_min']:9.4f}s -> "
+                  f"{record['time_min']:9.4f}s (x{ratio:.2f}){mark}")
+            regressions += bool(flags)
+        print(f"\n{regressions} regressioni")
+
+    if args.save_baseline:
+        save_results(records, args.baseline)
+        print(f"Baseline salvata in: {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
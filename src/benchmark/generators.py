@@ -0,0 +1,88 @@
+import math
+import os
+
+import numpy as np
+
+from src.utils.tsplib_reader import TSPInstance
+
+KINDS = ("uniform", "clustered", "grid")
+
+# Lato del quadrato in cui vengono generate le città
+SIDE = 1_000_000
+
+# Città per cluster nelle istanze "clustered" (come nel generatore DIMACS portcgen)
+CLUSTER_SIZE = 100
+
+
+def generate_coords(kind, n, seed=0, side=SIDE):
+    """
+    Coordinate (n, 2) di un'istanza sintetica riproducibile.
+
+    - "uniform": città uniformi nel quadrato [0, side)^2
+    - "clustered": n / CLUSTER_SIZE centri uniformi, città distribuite
+      normalmente attorno a un centro scelto a caso
+    - "grid": reticolo quadrato con passo costante (le prime n posizioni),
+      in ordine casuale; molte distanze coincidono, caso difficile per i
+      confronti tra mosse con lo stesso guadagno
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Tipo di istanza non supportato: {kind} (ammessi: {', '.join(KINDS)})")
+    rng = np.random.default_rng(seed)
+
+    if kind == "uniform":
+        return rng.uniform(0.0, side, size=(n, 2))
+
+    if kind == "clustered":
+        n_centres = max(1, n // CLUSTER_SIZE)
+        centres = rng.uniform(0.0, side, size=(n_centres, 2))
+        sigma = side / (4.0 * math.sqrt(n_centres))
+        xy = centres[rng.integers(0, n_centres, size=n)] + rng.normal(0.0, sigma, size=(n, 2))
+        return np.clip(xy, 0.0, side)
+
+    per_side = math.ceil(math.sqrt(n))
+    step = side / per_side
+    cells = np.arange(n)
+    xy = np.stack([cells % per_side, cells // per_side], axis=1) * step
+    return xy[rng.permutation(n)]
+
+
+def generate_instance(kind, n, seed=0, side=SIDE):
+    """TSPInstance EUC_2D con le coordinate di generate_coords."""
+    coords = generate_coords(kind, n, seed, side)
+    name = instance_name(kind, n, seed)
+    return TSPInstance(
+        name=name,
+        dimension=n,
+        edge_weight_type="EUC_2D",
+        comment=f"istanza sintetica {kind}, n={n}, seed={seed}",
+        coords=coords,
+        header={"NAME": name, "TYPE": "TSP", "DIMENSION": str(n), "EDGE_WEIGHT_TYPE": "EUC_2D"},
+    )
+
+
+def instance_name(kind, n, seed=0):
+    return f"{kind}{n}_s{seed}"
+
+
+def write_tsp(instance, path):
+    """Scrive l'istanza (con coordinate) in formato TSPLIB."""
+    n = len(instance.coords)
+    table = np.column_stack([np.arange(1, n + 1), instance.coords])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"NAME : {instance.name}\n")
+        f.write(f"COMMENT : {instance.comment}\n")
+        f.write("TYPE : TSP\n")
+        f.write(f"DIMENSION : {n}\n")
+        f.write(f"EDGE_WEIGHT_TYPE : {instance.edge_weight_type}\n")
+        f.write("NODE_COORD_SECTION\n")
+        np.savetxt(f, table, fmt=("%d", "%.6f", "%.6f"))
+        f.write("EOF\n")
+
+
+def ensure_instance_file(kind, n, seed=0, folder="results/benchmark/instances"):
+    """Percorso del file .tsp dell'istanza sintetica, generato se non esiste."""
+    path = os.path.join(folder, instance_name(kind, n, seed) + ".tsp")
+    if not os.path.exists(path):
+        write_tsp(generate_instance(kind, n, seed), path)
+    return path
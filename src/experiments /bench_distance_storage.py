@@ -0,0 +1,97 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.utils.tsplib_reader import read_tsplib, read_tsplib_header, distance_matrix
+from src.utils.distances import CondensedDistance
+from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.two_opt import two_opt
+from src.heuristics.simulated_annealing import simulated_annealing
+
+
+def measure_build(builder):
+    """
+    Esegue builder() e restituisce (risultato, tempo, memoria occupata dal
+    risultato, picco di memoria durante la costruzione), in byte.
+    """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = builder()
+    elapsed = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def time_lookups(dist, n, samples=200000, seed=0):
+    """Tempo medio (ns) di una lettura d[i][j] su coppie casuali."""
+    rng = random.Random(seed)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(samples)]
+    t0 = time.perf_counter()
+    for i, j in pairs:
+        dist[i][j]
+    return (time.perf_counter() - t0) / samples * 1e9
+
+
+def time_heuristics(dist, sa_iterations):
+    random.seed(0)
+    t0 = time.perf_counter()
+    greedy_tour, greedy_cost = nearest_neighbor(dist)
+    t_greedy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    improved_tour, improved_cost = two_opt(dist, greedy_tour)
+    t_two_opt = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _, sa_cost = simulated_annealing(dist, improved_tour, iterations=sa_iterations)
+    t_sa = time.perf_counter() - t0
+
+    return [(greedy_cost, t_greedy), (improved_cost, t_two_opt), (sa_cost, t_sa)]
+
+
+def main():
+    instance_name = sys.argv[1] if len(sys.argv) > 1 else "ch130.tsp"
+    sa_iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    instance_path = os.path.join("instances", instance_name)
+
+    coords, n = read_tsplib(instance_path)
+    weight_type = read_tsplib_header(instance_path).get("EDGE_WEIGHT_TYPE")
+    print(f"Istanza: {instance_name} ({n} città, {weight_type})\n")
+
+    storages = [
+        ("lista di liste", lambda: distance_matrix(coords)),
+        ("condensata float32", lambda: CondensedDistance.from_coords(coords, dtype=np.float32)),
+    ]
+    if weight_type in ("EUC_2D", "CEIL_2D", "ATT", "GEO"):
+        storages.append(("condensata int32",
+                         lambda: CondensedDistance.from_coords(coords, weight_type, np.int32)))
+
+    print(f"{'struttura':<22}{'memoria [KB]':>14}{'picco [KB]':>12}{'build [s]':>12}{'lookup [ns]':>14}"
+          f"{'greedy [s]':>12}{'2-opt [s]':>12}{'SA [s]':>10}")
+
+    for label, builder in storages:
+        dist, t_build, retained, peak = measure_build(builder)
+        lookup_ns = time_lookups(dist, n)
+        (g_cost, t_g), (o_cost, t_o), (s_cost, t_s) = time_heuristics(dist, sa_iterations)
+
+        print(f"{label:<22}{retained / 1024:>14.1f}{peak / 1024:>12.1f}{t_build:>12.4f}{lookup_ns:>14.1f}"
+              f"{t_g:>12.4f}{t_o:>12.4f}{t_s:>10.4f}")
+        print(f"{'':<22}costi: greedy {g_cost:.2f}, 2-opt {o_cost:.2f}, SA {s_cost:.2f}")
+
+    # proiezione della memoria per istanze più grandi
+    print("\nMemoria stimata (MB) al crescere di n:")
+    print(f"{'n':>8}{'lista di liste':>18}{'condensata 4B':>16}")
+    for size in (1000, 5000, 20000, 50000):
+        # lista di liste: 8 byte di puntatore + 24 byte di float Python per elemento
+        list_mb = size * size * 32 / 2 ** 20
+        condensed_mb = size * (size - 1) // 2 * 4 / 2 ** 20
+        print(f"{size:>8}{list_mb:>18.1f}{condensed_mb:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,28 @@
 import os
 import csv
+import argparse
+import contextlib
 import json
+import random
 import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait
 
-from src.utils.tsplib_reader import read_tsplib, distance_matrix
+from src.utils.instance_cache import load_cached
 from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.construction import construct, METHODS as CONSTRUCTION_METHODS
 from src.heuristics.two_opt import two_opt
+from src.heuristics.or_opt import or_opt
 from src.heuristics.simulated_annealing import simulated_annealing
-from src.solver.tsp_mtz import solve_tsp_mtz
+from src.heuristics.parallel_sa import parallel_simulated_annealing
+from src.heuristics.sa_schedules import SCHEDULES
+from src.heuristics.anytime import Budget, solve_anytime
+from src.heuristics.memetic import memetic_algorithm
+from src.utils.neighbors import neighbors_from_matrix
+from src.solver.held_karp import held_karp_bound
+from src.utils import instrumentation
+from src.utils.profiling import MODES as PROFILE_MODES, profiled
 
 
 def save_tour_json(instance_name, method_name, tour, cost, folder="results/tours"):
@@ -26,111 +41,684 @@ def save_tour_json(instance_name, method_name, tour, cost, folder="results/tours
         json.dump(data, f, indent=4)
 
 
-def run_experiments(instances_folder="instances", output_file="results/output.csv"):
+SA_MODES = ("single", "multistart", "tempering")
+EXACT_SOLVERS = ("mtz", "dfj")
+# metodi eseguibili come task; SEEDED_METHODS girano una volta per seme
+METHODS = ("greedy", "two_opt", "or_opt", "sa", "memetic", "constructions",
+           "hk_bound") + EXACT_SOLVERS
+SEEDED_METHODS = ("sa", "memetic")
+# metodi di cui si salva il tour in results/tours
+TOUR_METHODS = ("greedy", "two_opt", "or_opt", "sa", "memetic") + EXACT_SOLVERS
+EXACT_TIME_LIMIT = 300
+# metodi che con --budget ricevono tutti lo stesso tempo: le euristiche
+# girano con l'interfaccia anytime (tempo contato dal nearest neighbour),
+# i solver esatti con il budget come limite di tempo
+BUDGET_METHODS = ("greedy", "two_opt", "or_opt", "sa", "memetic") + EXACT_SOLVERS
+# frazioni del budget a cui anytime.csv riporta il miglior costo raggiunto
+BUDGET_FRACTIONS = (0.1, 0.25, 0.5)
 
-    files = [f for f in os.listdir(instances_folder) if f.endswith(".tsp")]
+OUTPUT_COLUMNS = [
+    "instance",
+    "greedy_cost",
+    "two_opt_cost",
+    "sa_cost",
+    "mtz_cost",
+    "t_greedy",
+    "t_two_opt",
+    "t_sa",
+    "mtz_time",
+    "gap_greedy",
+    "gap_two_opt",
+    "gap_sa",
+    "or_opt_cost",
+    "t_or_opt",
+    "gap_or_opt",
+    "mtz_build_time",
+    "hk_bound",
+    "t_hk_bound",
+    "gap_hk_greedy",
+    "gap_hk_two_opt",
+    "gap_hk_sa",
+    "gap_hk_or_opt",
+    "memetic_cost",
+    "t_memetic",
+    "gap_memetic",
+    "gap_hk_memetic"
+]
 
-    print("== AVVIO ESPERIMENTI SU TUTTE LE ISTANZE ==\n")
+ANYTIME_COLUMNS = [
+    "instance",
+    "method",
+    "seed",
+    "budget",
+    "cost",
+    "time_to_best",
+    *[f"cost_at_{round(f * 100)}" for f in BUDGET_FRACTIONS],
+    "incumbents"
+]
 
-    os.makedirs("results", exist_ok=True)
+CONSTRUCTION_COLUMNS = [
+    "instance",
+    "method",
+    "cost",
+    "time",
+    "two_opt_cost",
+    "gap",
+    "gap_two_opt"
+]
+SA_NEIGHBORS = 10
+# oltre questa dimensione il bound di Held-Karp usa il grafo dei vicini
+HK_DENSE_MAX_N = 2000
+HK_NEIGHBORS = 10
+
+
+def run_sa(dist, tour, sa_mode="single", sa_chains=None, sa_workers=None, seed=0,
+           sa_schedule="adaptive"):
+    """
+    SA a catena singola oppure parallelo (multistart/tempering). Con lo
+    schedule "adaptive" le mosse usano le liste dei vicini; "geometric"
+    riproduce l'SA originale (T0=10000, alpha=0.9993, mosse casuali).
+    """
+    neighbors = None
+    if sa_schedule == "adaptive":
+        neighbors = neighbors_from_matrix(dist, SA_NEIGHBORS)
+    if sa_mode == "single":
+        return simulated_annealing(dist, tour, neighbors=neighbors, rng=random.Random(seed),
+                                   schedule=sa_schedule)
+    sa_tour, sa_cost, chain_stats = parallel_simulated_annealing(
+        dist, tour, mode=sa_mode, n_chains=sa_chains, workers=sa_workers, seed=seed,
+        neighbors=neighbors, schedule=sa_schedule
+    )
+    print(f"SA {sa_mode}: {len(chain_stats)} catene, migliori costi "
+          f"{[round(st['best_cost'], 2) for st in chain_stats]}")
+    return sa_tour, sa_cost
 
-    with open(output_file, mode="w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-
-        # Nuova intestazione completa
-        writer.writerow([
-            "instance",
-            "greedy_cost",
-            "two_opt_cost",
-            "sa_cost",
-            "mtz_cost",
-            "t_greedy",
-            "t_two_opt",
-            "t_sa",
-            "mtz_time",
-            "gap_greedy",
-            "gap_two_opt",
-            "gap_sa"
-        ])
 
-        for filename in files:
-            instance_path = os.path.join(instances_folder, filename)
-            instance_name = filename.replace(".tsp", "")
+def run_bound(dist, best_tour, best_cost):
+    """
+    Lower bound di Held-Karp (1-albero con subgradiente), con il costo del
+    miglior tour euristico come obiettivo del passo. Restituisce (bound, tempo).
+    """
+    neighbors = None
+    if len(dist) > HK_DENSE_MAX_N:
+        neighbors = neighbors_from_matrix(dist, HK_NEIGHBORS)
+    t0 = time.time()
+    bound, _ = held_karp_bound(dist, neighbors=neighbors, tour=best_tour, upper_bound=best_cost)
+    return bound, time.time() - t0
 
-            print(f"--- ISTANZA: {instance_name} ---")
 
-            coords, n = read_tsplib(instance_path)
-            dist = distance_matrix(coords)
+def gap(cost, reference):
+    """Gap percentuale rispetto al riferimento ("" se il riferimento manca)."""
+    if reference is None:
+        return ""
+    return round((cost - reference) / reference * 100, 4)
 
 
-            # -----------------------
-            #  EURISTICHE (con tempi)
-            # -----------------------
+def run_constructions(instance, dist):
+    """
+    Confronto delle euristiche costruttive sulla stessa istanza: per ogni
+    metodo costo e tempo di costruzione, e costo dopo il 2-opt.
+    Restituisce una lista di (metodo, costo, tempo, costo dopo 2-opt).
+    """
+    rows = []
+    for method in CONSTRUCTION_METHODS:
+        t0 = time.time()
+        tour, cost = construct(method, instance, weight_type=None, distance_matrix=dist)
+        elapsed = time.time() - t0
+        _, improved_cost = two_opt(dist, tour)
+        print(f"  {method:<20}: {cost:.2f}  (time {elapsed:.4f}s, dopo 2-opt {improved_cost:.2f})")
+        rows.append((method, cost, elapsed, improved_cost))
+    return rows
 
-            t0 = time.time()
-            greedy_tour, greedy_cost = nearest_neighbor(dist)
-            t_greedy = time.time() - t0
 
-            t0 = time.time()
-            improved_tour, improved_cost = two_opt(dist, greedy_tour)
-            t_two_opt = time.time() - t0
+def run_task(instance_path, method, seed, options):
+    """
+    Esegue un singolo task (istanza, metodo, seme) e restituisce un record
+    con costo e tempo. Ogni task ricalcola da sé i tour da cui parte
+    (nearest neighbour -> 2-opt -> ...), così i task sono indipendenti e
+    possono girare in processi diversi; il tempo misura solo il metodo.
+    """
+    instance, dist = load_cached(instance_path, weight_type=None)
+    record = {}
 
-            t0 = time.time()
-            sa_tour, sa_cost = simulated_annealing(dist, improved_tour)
-            t_sa = time.time() - t0
+    budget = _task_budget(method, options["budget"])
+    if budget is not None and method not in EXACT_SOLVERS:
+        return run_budgeted(dist, method, seed, budget)
 
-            print(f"Greedy         : {greedy_cost:.2f}  (time {t_greedy:.4f}s)")
-            print(f"2-opt          : {improved_cost:.2f}  (time {t_two_opt:.4f}s)")
-            print(f"SA             : {sa_cost:.2f}  (time {t_sa:.4f}s)")
+    if method == "constructions":
+        record["rows"] = [[m, cost, elapsed, improved]
+                          for m, cost, elapsed, improved in run_constructions(instance, dist)]
+        return record
 
-            # -----------------------
-            #  MTZ (MODELLO ESATTO)
-            # -----------------------
-            print(" >> Risoluzione MTZ con Gurobi...")
+    t0 = time.time()
+    tour, cost = nearest_neighbor(dist)
+    elapsed = time.time() - t0
+    if method == "memetic":
+        # la popolazione iniziale contiene il nearest neighbour e fa da sé la ricerca locale
+        t0 = time.time()
+        tour, cost = memetic_algorithm(dist, tour, seed=seed, workers=options["memetic_workers"])
+        elapsed = time.time() - t0
+    elif method != "greedy":
+        t0 = time.time()
+        tour, cost = two_opt(dist, tour)
+        elapsed = time.time() - t0
 
-            mtz_tour, mtz_cost, mtz_runtime, mtz_status = solve_tsp_mtz(
-                dist, time_limit=300, verbose=False
+    if method == "sa":
+        t0 = time.time()
+        tour, cost = run_sa(dist, tour, options["sa_mode"], options["sa_chains"],
+                            options["sa_workers"], seed, options["sa_schedule"])
+        elapsed = time.time() - t0
+    elif method in ("or_opt", "hk_bound") + EXACT_SOLVERS:
+        t0 = time.time()
+        tour, cost = or_opt(dist, tour)
+        elapsed = time.time() - t0
+
+    if method == "hk_bound":
+        # l'Or-opt fa da obiettivo del passo e da archi aggiuntivi del grafo sparso
+        cost, elapsed = run_bound(dist, tour, cost)
+        tour = None
+    elif method in EXACT_SOLVERS:
+        # l'Or-opt fa da soluzione iniziale (MIP start); i solver vengono
+        # importati solo qui, così le euristiche girano anche senza Gurobi
+        timings = {}
+        if method == "dfj":
+            from src.solver.tsp_dfj import solve_tsp_dfj
+            tour, cost, elapsed, status = solve_tsp_dfj(
+                dist, time_limit=options["exact_time_limit"], verbose=False,
+                initial_tour=tour, timings=timings
+            )
+        else:
+            from src.solver.tsp_mtz import solve_tsp_mtz
+            tour, cost, elapsed, status = solve_tsp_mtz(
+                dist, time_limit=options["exact_time_limit"], verbose=False,
+                k=options["mtz_k"], initial_tour=tour, timings=timings
             )
+        record["build_time"] = timings.get("build", 0.0)
+        record["solver_status"] = status
+
+    record["cost"] = cost
+    record["time"] = elapsed
+    record["tour"] = tour
+    return record
+
+
+def run_budgeted(dist, method, seed, budget):
+    """
+    Esegue il metodo con l'interfaccia anytime entro 'budget' secondi (dal
+    nearest neighbour in poi; l'SA è a catena singola con ripartenze).
+    Il record contiene anche il tempo a cui è stata trovata la soluzione
+    migliore e la sequenza delle soluzioni migliorate [(secondi, costo)].
+    """
+    trace = []
+    limit = Budget(budget)
+    best = solve_anytime(dist, method, limit, seed=seed,
+                         callback=lambda inc: trace.append([round(inc.elapsed, 6), inc.cost]))
+    return {
+        "cost": best.cost,
+        "time": limit.elapsed(),
+        "time_to_best": best.elapsed,
+        "incumbents": trace,
+        "tour": best.tour,
+    }
+
+
+def _task_budget(method, budget):
+    """Budget di tempo del metodo (None se il metodo non lo usa)."""
+    return budget if method in BUDGET_METHODS else None
+
+
+def _task_main(conn, instance_path, method, seed, options):
+    """
+    Corpo del processo figlio: manda al padre il record o l'errore. Con
+    options["instrument"] il record contiene anche contatori, tempi e
+    traccia costo/tempo; con options["profile"] il task gira sotto il
+    profiler e il profilo va in results/profiles/.
+    """
+    try:
+        with _task_profile(instance_path, method, seed, options["profile"]):
+            if options["instrument"]:
+                with instrumentation.recording(trace=True) as rec:
+                    record = run_task(instance_path, method, seed, options)
+                record["instrumentation"] = rec.to_dict()
+            else:
+                record = run_task(instance_path, method, seed, options)
+        record["status"] = "ok"
+    except Exception as exc:
+        record = {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    conn.send(record)
+    conn.close()
+
+
+def _task_profile(instance_path, method, seed, mode, folder="results/profiles"):
+    """Profiler del task (contesto vuoto se mode è None)."""
+    if mode is None:
+        return contextlib.nullcontext()
+    name = os.path.basename(instance_path).replace(".tsp", "") + f"_{method}"
+    if seed is not None:
+        name += f"_s{seed}"
+    ext = ".prof" if mode == "cprofile" else ".txt"
+    return profiled(mode, os.path.join(folder, name + ext))
+
+
+def _task_settings(method, options):
+    """
+    Opzioni che influenzano il risultato del metodo: vengono salvate nel
+    record e un task già nel registro conta come concluso solo se le sue
+    coincidono con quelle attuali.
+    """
+    settings = {"budget": _task_budget(method, options["budget"]),
+                "time_limit": options["time_limit"]}
+    if method == "sa":
+        settings.update(sa_mode=options["sa_mode"], sa_schedule=options["sa_schedule"],
+                        sa_chains=options["sa_chains"])
+    elif method == "memetic":
+        # i semi dei blocchi di figli dipendono dal numero di processi
+        settings["memetic_workers"] = options["memetic_workers"]
+    elif method in EXACT_SOLVERS:
+        settings["exact_time_limit"] = options["exact_time_limit"]
+        if method == "mtz":
+            settings["mtz_k"] = options["mtz_k"]
+    return settings
+
+
+def _with_settings(records, options):
+    """Record eseguiti con le opzioni attuali (vedi _task_settings)."""
+    return [r for r in records
+            if all(r.get(key) == value for key, value in _task_settings(r["method"], options).items())]
+
+
+def load_records(log_file):
+    """
+    Record dei task dal registro JSON-lines. Una riga incompleta (processo
+    interrotto durante la scrittura) viene ignorata.
+    """
+    records = []
+    if not os.path.exists(log_file):
+        return records
+    with open(log_file) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def append_record(log_file, record):
+    """Aggiunge un record al registro: una riga scritta e sincronizzata su disco."""
+    with open(log_file, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_tasks(tasks, options, log_file, workers=1, time_limit=None):
+    """
+    Esegue i task (instance_path, method, seed) con al più 'workers' processi
+    contemporanei. Ogni task gira nel suo processo, che viene terminato se
+    supera 'time_limit' secondi; il record (anche di errore o timeout) viene
+    aggiunto al registro appena il task termina.
+    """
+    pending = deque(tasks)
+    running = {}
+    total = len(tasks)
+    finished = 0
+
+    while pending or running:
+        while pending and len(running) < workers:
+            instance_path, method, seed = pending.popleft()
+            parent_conn, child_conn = mp.Pipe(duplex=False)
+            proc = mp.Process(target=_task_main,
+                              args=(child_conn, instance_path, method, seed, options))
+            proc.start()
+            child_conn.close()
+            running[proc] = (instance_path, method, seed, parent_conn, time.time())
+
+        wait([conn for *_, conn, _ in running.values()] + [p.sentinel for p in running],
+             timeout=0.5)
+
+        for proc, (instance_path, method, seed, conn, started) in list(running.items()):
+            elapsed = time.time() - started
+            if conn.poll():
+                try:
+                    record = conn.recv()
+                except EOFError:
+                    record = {"status": "error", "error": "processo terminato senza risultato"}
+            elif not proc.is_alive():
+                record = {"status": "error", "error": f"exit code {proc.exitcode}"}
+            elif time_limit is not None and elapsed > time_limit:
+                proc.kill()
+                record = {"status": "timeout"}
+            else:
+                continue
+
+            proc.join()
+            conn.close()
+            del running[proc]
+            finished += 1
 
-            print(f"MTZ optimal    : {mtz_cost:.2f} (time {mtz_runtime:.2f}s)\n")
+            instance_name = os.path.basename(instance_path).replace(".tsp", "")
+            tour = record.pop("tour", None)
+            record.update(instance=instance_name, method=method, seed=seed,
+                          wall_time=round(elapsed, 6), **_task_settings(method, options))
+            append_record(log_file, record)
+            if tour is not None and method in TOUR_METHODS and seed in (None, options["first_seed"]):
+                save_tour_json(instance_name, method, tour, record["cost"])
 
-            # -----------------------
-            # GAP rispetto al modello esatto
-            # -----------------------
-            gap_greedy = (greedy_cost - mtz_cost) / mtz_cost * 100
-            gap_twoopt = (improved_cost - mtz_cost) / mtz_cost * 100
-            gap_sa     = (sa_cost - mtz_cost) / mtz_cost * 100
+            outcome = (f"{record['cost']:.2f} (time {record['time']:.4f}s)"
+                       if record["status"] == "ok" and "cost" in record else record["status"])
+            label = method if seed is None else f"{method} (seed {seed})"
+            print(f"[{finished}/{total}] {instance_name:<10} {label:<16}: {outcome}"
+                  + (f" - {record['error']}" if "error" in record else ""))
 
-            # -----------------------
-            # Scrivi CSV
-            # -----------------------
-            writer.writerow([
+
+def write_summary(records, output_file, construction_file, exact=None):
+    """
+    Riscrive output.csv e construction.csv dai record del registro (per ogni
+    task vale l'ultimo record; i costi e i tempi SA sono la media sui semi).
+    Le colonne del modello esatto usano il solver 'exact' se l'istanza ne ha
+    il risultato, altrimenti il primo di EXACT_SOLVERS disponibile.
+    I file vengono scritti su un file temporaneo e poi sostituiti, quindi
+    non restano mai a metà.
+    """
+    latest = {}
+    for record in records:
+        if record.get("status") == "ok":
+            latest[(record["instance"], record["method"], record["seed"])] = record
+
+    by_instance = {}
+    for (instance_name, method, _), record in latest.items():
+        by_instance.setdefault(instance_name, {}).setdefault(method, []).append(record)
+
+    def value(results, method, key="cost"):
+        found = [r[key] for r in results.get(method, []) if r.get(key) is not None]
+        return sum(found) / len(found) if found else None
+
+    def fmt(x, digits=4):
+        return "" if x is None else round(x, digits)
+
+    rows = []
+    construction_rows = []
+    for instance_name in sorted(by_instance):
+        results = by_instance[instance_name]
+        greedy_cost, two_opt_cost = value(results, "greedy"), value(results, "two_opt")
+        sa_cost, oropt_cost = value(results, "sa"), value(results, "or_opt")
+        memetic_cost = value(results, "memetic")
+        exact_method = exact if exact in results else next(
+            (m for m in EXACT_SOLVERS if m in results), None)
+        exact_cost = value(results, exact_method) if exact_method else None
+        hk_bound = value(results, "hk_bound")
+
+        def gaps(reference):
+            return [gap(c, reference) if c is not None else ""
+                    for c in (greedy_cost, two_opt_cost, sa_cost)]
+
+        rows.append([
+            instance_name,
+            fmt(greedy_cost), fmt(two_opt_cost), fmt(sa_cost), fmt(exact_cost),
+            fmt(value(results, "greedy", "time"), 6),
+            fmt(value(results, "two_opt", "time"), 6),
+            fmt(value(results, "sa", "time"), 6),
+            fmt(value(results, exact_method, "time")) if exact_method else "",
+            *gaps(exact_cost),
+            fmt(oropt_cost),
+            fmt(value(results, "or_opt", "time"), 6),
+            gap(oropt_cost, exact_cost) if oropt_cost is not None else "",
+            fmt(value(results, exact_method, "build_time")) if exact_method else "",
+            fmt(hk_bound),
+            fmt(value(results, "hk_bound", "time"), 6),
+            *gaps(hk_bound),
+            gap(oropt_cost, hk_bound) if oropt_cost is not None else "",
+            fmt(memetic_cost),
+            fmt(value(results, "memetic", "time"), 6),
+            gap(memetic_cost, exact_cost) if memetic_cost is not None else "",
+            gap(memetic_cost, hk_bound) if memetic_cost is not None else ""
+        ])
+
+        for method, cost, elapsed, improved in results.get("constructions", [{}])[0].get("rows", []):
+            construction_rows.append([
                 instance_name,
-                round(greedy_cost, 4),
-                round(improved_cost, 4),
-                round(sa_cost, 4),
-                round(mtz_cost, 4),
-                round(t_greedy, 6),
-                round(t_two_opt, 6),
-                round(t_sa, 6),
-                round(mtz_runtime, 4),
-                round(gap_greedy, 4),
-                round(gap_twoopt, 4),
-                round(gap_sa, 4)
+                method,
+                round(cost, 4),
+                round(elapsed, 6),
+                round(improved, 4),
+                gap(cost, exact_cost),
+                gap(improved, exact_cost)
             ])
 
-            # -----------------------
-            # Salvataggio tour JSON
-            # -----------------------
-            save_tour_json(instance_name, "greedy", greedy_tour, greedy_cost)
-            save_tour_json(instance_name, "two_opt", improved_tour, improved_cost)
-            save_tour_json(instance_name, "sa", sa_tour, sa_cost)
-            save_tour_json(instance_name, "mtz", mtz_tour, mtz_cost)
+    _write_csv(output_file, OUTPUT_COLUMNS, rows)
+    _write_csv(construction_file, CONSTRUCTION_COLUMNS, construction_rows)
+
+
+def write_instrumentation(records, csv_file, json_file, trace_file):
+    """
+    Esporta la strumentazione dei task (ultimo record per task): contatori e
+    tempi in 'csv_file', tutto (traccia compresa) in 'json_file' e la
+    traccia costo/tempo in 'trace_file'. Non scrive nulla se nessun task è
+    stato strumentato.
+    """
+    latest = {}
+    for r in records:
+        if r.get("status") == "ok" and "instrumentation" in r:
+            latest[(r["instance"], r["method"], r["seed"])] = r
+    if not latest:
+        return False
+
+    rows, trace_rows, data = [], [], []
+    for (instance, method, seed), r in sorted(latest.items(), key=lambda item: str(item[0])):
+        info = r["instrumentation"]
+        key = ["" if v is None else v for v in (instance, method, seed)]
+        for name, value in sorted(info["counters"].items()):
+            rows.append(key + ["counter", name, value, ""])
+        for name, timer in sorted(info["timers"].items()):
+            rows.append(key + ["timer", name, round(timer["total"], 6), timer["calls"]])
+        for t, label, cost in info["trace"] or []:
+            trace_rows.append(key + [round(t, 6), label, cost])
+        data.append({"instance": instance, "method": method, "seed": seed, **info})
+
+    _write_csv(csv_file, ["instance", "method", "seed", "kind", "name", "value", "calls"], rows)
+    _write_csv(trace_file, ["instance", "method", "seed", "time", "label", "cost"], trace_rows)
+    tmp = json_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, json_file)
+    return True
+
+
+def write_anytime(records, path):
+    """
+    Confronto a parità di tempo: per ogni task eseguito con il budget, costo
+    finale, tempo della soluzione migliore e miglior costo raggiunto entro
+    ogni frazione del budget (BUDGET_FRACTIONS). Non scrive nulla se non ci
+    sono task con budget.
+    """
+    latest = {}
+    for r in records:
+        if r.get("status") == "ok" and "incumbents" in r:
+            latest[(r["instance"], r["method"], r["seed"])] = r
+    if not latest:
+        return False
+
+    rows = []
+    for (instance, method, seed), r in sorted(latest.items(), key=lambda item: str(item[0])):
+        at_fraction = []
+        for fraction in BUDGET_FRACTIONS:
+            reached = [cost for t, cost in r["incumbents"] if t <= fraction * r["budget"]]
+            at_fraction.append(round(min(reached), 4) if reached else "")
+        rows.append([instance, method, "" if seed is None else seed, r["budget"],
+                     round(r["cost"], 4), round(r["time_to_best"], 6), *at_fraction,
+                     len(r["incumbents"])])
+    _write_csv(path, ANYTIME_COLUMNS, rows)
+    return True
+
+
+def _write_csv(path, header, rows):
+    tmp = path + ".tmp"
+    with open(tmp, mode="w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def run_experiments(instances_folder="instances", output_file="results/output.csv",
+                    sa_mode="single", sa_chains=None, sa_workers=None, seed=0,
+                    sa_schedule="adaptive", construction_file="results/construction.csv",
+                    exact="mtz", mtz_k=None, methods=None, seeds=None, workers=1,
+                    time_limit=None, log_file="results/runs.jsonl", fresh=False,
+                    instrument=False, profile=None, budget=None, memetic_workers=1):
+    """
+    Esegue i task (istanza x metodo x seme) in parallelo e in modo
+    riprendibile: ogni task concluso viene aggiunto subito al registro
+    'log_file', e rilanciando il comando i task già conclusi (ok o timeout)
+    vengono saltati. Alla fine output.csv e construction.csv vengono
+    ricostruiti da tutto il registro.
+
+    Parametri:
+    - methods: metodi da eseguire (default tutte le euristiche, il bound e
+      il modello esatto 'exact'); ad esempio senza "mtz" non serve Gurobi
+    - seeds: semi per i metodi randomizzati (default [seed]); gli altri
+      metodi girano una volta sola (seme None nel registro)
+    - workers: task eseguiti contemporaneamente
+    - time_limit: limite in secondi per task (il processo viene terminato)
+    - fresh: se True ignora e azzera il registro esistente
+    - instrument: se True registra contatori, tempi e traccia costo/tempo di
+      ogni task (src.utils.instrumentation) e li esporta accanto a
+      output_file in instrumentation.csv/.json e instrumentation_trace.csv
+    - profile: "cprofile" o "sample" per profilare ogni task (un file per
+      task in results/profiles/), None per non profilare
+    - budget: secondi concessi a ogni metodo di BUDGET_METHODS per il
+      confronto a parità di tempo (euristiche anytime, limite di tempo dei
+      solver esatti); i risultati vanno anche in anytime.csv accanto a
+      output_file
+    - memetic_workers: processi per la generazione dei figli dell'algoritmo
+      memetico (1 = nel processo del task)
+
+    Ogni record salva le opzioni che influenzano il risultato del suo metodo
+    (budget, time_limit, opzioni SA, memetiche e dei solver esatti): i
+    record con opzioni diverse da quelle attuali restano nel registro, ma
+    non vengono saltati né usati per output.csv.
+    """
+    if methods is None:
+        methods = [m for m in METHODS if m not in EXACT_SOLVERS]
+        if exact != "none":
+            methods.append(exact)
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        raise ValueError(f"Metodi non supportati: {', '.join(unknown)} "
+                         f"(ammessi: {', '.join(METHODS)})")
+    seeds = [seed] if seeds is None else list(seeds)
+
+    exact_time_limit = EXACT_TIME_LIMIT
+    if time_limit is not None:
+        # il solver deve fermarsi prima che il processo venga terminato
+        exact_time_limit = min(EXACT_TIME_LIMIT, 0.9 * time_limit)
+    if budget is not None:
+        exact_time_limit = min(exact_time_limit, budget)
+    options = {
+        "sa_mode": sa_mode,
+        "sa_chains": sa_chains,
+        "sa_workers": sa_workers,
+        "sa_schedule": sa_schedule,
+        "mtz_k": mtz_k,
+        "exact_time_limit": exact_time_limit,
+        "first_seed": seeds[0],
+        "instrument": instrument,
+        "profile": profile,
+        "budget": budget,
+        "memetic_workers": memetic_workers,
+        "time_limit": time_limit,
+    }
+
+    os.makedirs("results", exist_ok=True)
+    if fresh and os.path.exists(log_file):
+        os.remove(log_file)
+
+    done = {(r["instance"], r["method"], r["seed"]) for r in _with_settings(load_records(log_file), options)
+            if r.get("status") in ("ok", "timeout")}
+    files = sorted(f for f in os.listdir(instances_folder) if f.endswith(".tsp"))
+    tasks = []
+    for filename in files:
+        instance_name = filename.replace(".tsp", "")
+        for method in methods:
+            for task_seed in (seeds if method in SEEDED_METHODS else [None]):
+                if (instance_name, method, task_seed) not in done:
+                    tasks.append((os.path.join(instances_folder, filename), method, task_seed))
+
+    print("== AVVIO ESPERIMENTI SU TUTTE LE ISTANZE ==")
+    print(f"{len(tasks)} task da eseguire ({len(done)} già conclusi nel registro {log_file})\n")
+
+    run_tasks(tasks, options, log_file, workers=workers, time_limit=time_limit)
+    records = _with_settings(load_records(log_file), options)
+    # solver esatto delle colonne di output.csv: quello richiesto in questa esecuzione
+    exact_method = next((m for m in methods if m in EXACT_SOLVERS), exact)
+    write_summary(records, output_file, construction_file, exact_method)
+    folder = os.path.dirname(output_file)
+    anytime_file = os.path.join(folder, "anytime.csv")
+    budgeted = budget is not None and write_anytime(records, anytime_file)
+    instrumented = instrument and write_instrumentation(
+        records, os.path.join(folder, "instrumentation.csv"),
+        os.path.join(folder, "instrumentation.json"),
+        os.path.join(folder, "instrumentation_trace.csv"),
+    )
 
     print("\n== ESPERIMENTI COMPLETATI ==")
     print(f"Risultati salvati in: {output_file}")
+    print(f"Confronto euristiche costruttive in: {construction_file}")
+    print(f"Registro dei task: {log_file}")
+    if budgeted:
+        print(f"Confronto a parità di tempo ({budget}s) in: {anytime_file}")
+    if instrumented:
+        print(f"Strumentazione in: {os.path.join(folder, 'instrumentation.csv')} (e .json)")
+    if profile is not None:
+        print("Profili dei task in: results/profiles/")
     print("Tour salvati in: results/tours/")
 
 
 if __name__ == "__main__":
-    run_experiments()
+    parser = argparse.ArgumentParser(description="Esegue tutti i metodi su tutte le istanze")
+    parser.add_argument("--sa-mode", choices=SA_MODES, default="single",
+                        help="SA a catena singola, multi-start parallelo o parallel tempering")
+    parser.add_argument("--sa-chains", type=int, default=None,
+                        help="catene/repliche SA in parallelo (default: numero di core)")
+    parser.add_argument("--sa-workers", type=int, default=None,
+                        help="processi per l'SA parallelo (default: numero di core)")
+    parser.add_argument("--seed", type=int, default=0, help="seme per l'SA parallelo")
+    parser.add_argument("--seeds", type=int, nargs="+", default=None,
+                        help="semi dei metodi randomizzati, un task per seme (default: --seed)")
+    parser.add_argument("--exact", choices=EXACT_SOLVERS + ("none",), default="mtz",
+                        help="modello esatto: MTZ, DFJ con sottocicli lazy e warm start, "
+                             "oppure none (solo gap rispetto al bound di Held-Karp)")
+    parser.add_argument("--mtz-k", type=int, default=None,
+                        help="limita gli archi MTZ ai k vicini più gli archi del tour euristico")
+    parser.add_argument("--sa-schedule", choices=SCHEDULES, default="adaptive",
+                        help="schedule di temperatura dell'SA (geometric = SA originale)")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=None,
+                        help="metodi da eseguire (default: tutti, con il modello di --exact)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="task eseguiti in parallelo")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="limite di tempo in secondi per ogni task")
+    parser.add_argument("--log-file", default="results/runs.jsonl",
+                        help="registro dei task conclusi (per riprendere dopo un'interruzione)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignora il registro e riesegue tutti i task")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="secondi per metodo per il confronto a parità di tempo "
+                             "(euristiche anytime, SA a catena singola; limite dei solver esatti)")
+    parser.add_argument("--memetic-workers", type=int, default=1,
+                        help="processi per i figli dell'algoritmo memetico")
+    parser.add_argument("--instrument", action="store_true",
+                        help="registra contatori, tempi e traccia costo/tempo di ogni task")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="profila ogni task con cProfile o con il profiler a campionamento")
+    args = parser.parse_args()
+
+    run_experiments(sa_mode=args.sa_mode, sa_chains=args.sa_chains,
+                    sa_workers=args.sa_workers, seed=args.seed,
+                    sa_schedule=args.sa_schedule, exact=args.exact,
+                    mtz_k=args.mtz_k, methods=args.methods, seeds=args.seeds,
+                    workers=args.workers, time_limit=args.time_limit,
+                    log_file=args.log_file, fresh=args.fresh,
+                    instrument=args.instrument, profile=args.profile,
+                    budget=args.budget, memetic_workers=args.memetic_workers)
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import time
+
+from src.benchmark.generators import KINDS, generate_coords, instance_name
+from src.heuristics.decomposition import (CLUSTER_SIZE, PARTITIONS, SOLVERS,
+                                          cluster_decomposition)
+from src.utils.tsplib_reader import load_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tour per istanze molto grandi con decomposizione in cluster"
+    )
+    parser.add_argument("instance", nargs="?", default=None,
+                        help="file .tsp (in alternativa --synthetic)")
+    parser.add_argument("--synthetic", nargs=2, metavar=("KIND", "N"), default=None,
+                        help=f"istanza sintetica, KIND tra {', '.join(KINDS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cluster-size", type=int, default=CLUSTER_SIZE)
+    parser.add_argument("--partition", choices=PARTITIONS, default="kmeans")
+    parser.add_argument("--solver", choices=SOLVERS, default="or_opt")
+    parser.add_argument("--cluster-time", type=float, default=1.0,
+                        help="secondi per cluster con --solver lk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processi per i cluster (default: numero di core)")
+    parser.add_argument("--no-repair", action="store_true",
+                        help="non riottimizza le giunture tra i cluster")
+    parser.add_argument("--output-folder", default="results/tours")
+    args = parser.parse_args()
+
+    if (args.instance is None) == (args.synthetic is None):
+        parser.error("indicare un file .tsp oppure --synthetic KIND N")
+
+    if args.synthetic is not None:
+        kind, n = args.synthetic[0], int(args.synthetic[1])
+        name = instance_name(kind, n, args.seed)
+        coords, weight_type = generate_coords(kind, n, args.seed), None
+    else:
+        instance = load_instance(args.instance)
+        if instance.coords is None:
+            parser.error(f"{args.instance}: istanza senza coordinate")
+        name = instance.name
+        # stessa convenzione di run_all: distanza euclidea esatta
+        coords, weight_type = instance.coords, None
+
+    print(f"== DECOMPOSIZIONE: {name} ({len(coords)} città) ==")
+    stats = {}
+    t0 = time.perf_counter()
+    tour, cost = cluster_decomposition(
+        coords, weight_type, cluster_size=args.cluster_size, partition=args.partition,
+        solver=args.solver, workers=args.workers, seed=args.seed,
+        repair=not args.no_repair, cluster_time=args.cluster_time, stats=stats
+    )
+    elapsed = time.perf_counter() - t0
+
+    print(f"Cluster: {stats['clusters']} (il più grande {stats['largest_cluster']} città), "
+          f"città di confine: {stats['boundary']}")
+    print(f"Tempi: partizione {stats['partition']:.2f}s, ordine {stats['order']:.2f}s, "
+          f"cluster {stats['solve']:.2f}s, riparazione {stats['repair']:.2f}s")
+    print(f"Costo prima della riparazione: {stats['cost_before_repair']:.2f}")
+    print(f"Costo: {cost:.2f}  (tempo totale {elapsed:.2f}s)")
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    path = os.path.join(args.output_folder, f"{name}_decomposition.json")
+    with open(path, "w") as f:
+        json.dump({"instance": name, "method": "decomposition", "tour": tour, "cost": cost,
+                   "time": elapsed, "stats": stats}, f)
+    print(f"Tour salvato in: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import os
 from gurobipy import GRB
 
-from src.utils.tsplib_reader import read_tsplib, distance_matrix
+from src.utils.instance_cache import load_cached
 from src.solver.tsp_mtz import solve_tsp_mtz
 
 
@@ -11,11 +11,10 @@ def main():
 
     print(f"Caricamento istanza: {instance_path}")
 
-    coords, n = read_tsplib(instance_path)
-    print(f"Città lette: {n}")
-
-    dist = distance_matrix(coords)
-    print("Matrice delle distanze creata.")
+    # istanza e matrice (distanza euclidea esatta) dalla cache su disco
+    instance, dist = load_cached(instance_path, weight_type=None)
+    print(f"Città lette: {instance.dimension}")
+    print("Matrice delle distanze caricata.")
 
     # Risolvi TSP con MTZ
     tour, cost, runtime, status = solve_tsp_mtz(
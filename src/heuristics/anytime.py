@@ -0,0 +1,251 @@
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+
+from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.lin_kernighan import lin_kernighan
+from src.heuristics.memetic import memetic_algorithm
+from src.heuristics.or_opt import or_opt
+from src.heuristics.simulated_annealing import simulated_annealing
+from src.heuristics.two_opt import default_neighbors, two_opt, _closed_tour
+from src.utils.tour_utils import tour_cost
+
+METHODS = ("greedy", "two_opt", "or_opt", "sa", "lk", "memetic")
+
+# Intervallo minimo (secondi) tra due soluzioni segnalate durante uno
+# stadio; il risultato di ogni stadio viene sempre segnalato se migliora
+REPORT_INTERVAL = 0.05
+
+# Iterazioni di ogni catena SA; con un budget di tempo le catene ripartono
+# dalla soluzione migliore finché il budget non è esaurito
+SA_CHAIN_ITERATIONS = 50000
+SA_NEIGHBORS = 10
+
+# Soluzione segnalata: tour chiuso, costo, secondi dall'inizio del budget e
+# stadio della pipeline che l'ha prodotta
+Incumbent = namedtuple("Incumbent", ["tour", "cost", "elapsed", "stage"])
+
+
+class Budget:
+    """
+    Budget di una ricerca anytime: tempo (secondi da quando il budget viene
+    creato), iterazioni e annullamento cooperativo. Le euristiche lo
+    controllano con expired() nei loro cicli e si fermano lasciando un tour
+    valido.
+
+    Parametri:
+    - time_limit: secondi a disposizione (None = nessun limite)
+    - iterations: iterazioni a disposizione, nell'unità del metodo
+      (iterazioni SA in totale sulle catene, kick per Lin-Kernighan);
+      None = nessun limite
+    - cancel: threading.Event condiviso per annullare la ricerca da un altro
+      thread (default: uno nuovo, impostato da cancel())
+    """
+
+    __slots__ = ("time_limit", "iterations", "started", "deadline", "_cancel")
+
+    def __init__(self, time_limit=None, iterations=None, cancel=None):
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.started = time.perf_counter()
+        self.deadline = None if time_limit is None else self.started + time_limit
+        self._cancel = cancel if cancel is not None else threading.Event()
+
+    def cancel(self):
+        """Chiede alla ricerca di fermarsi al prossimo controllo."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def remaining(self):
+        """Secondi rimasti (None se non c'è limite di tempo)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self):
+        return self._cancel.is_set() or (self.deadline is not None
+                                         and time.perf_counter() >= self.deadline)
+
+    def bounded(self):
+        """True se il budget prima o poi si esaurisce da solo (tempo o iterazioni)."""
+        return self.deadline is not None or self.iterations is not None
+
+
+def solve_anytime(distance_matrix, method="sa", budget=None, initial_tour=None, neighbors=None,
+                  seed=None, callback=None, report_interval=REPORT_INTERVAL):
+    """
+    Interfaccia anytime comune alle euristiche: esegue la pipeline del
+    metodo entro il budget e segnala le soluzioni via via migliori.
+
+    Pipeline (ogni stadio parte dal migliore tour del precedente):
+    - "greedy": nearest neighbour (o initial_tour)
+    - "two_opt": + 2-opt
+    - "or_opt": + 2-opt + Or-opt
+    - "sa": + 2-opt + catene SA (schedule adattivo) che ripartono dalla
+      soluzione migliore finché il budget non è esaurito
+    - "lk": + 2-opt + chained Lin-Kernighan fino a esaurimento del budget
+    - "memetic": algoritmo memetico (src.heuristics.memetic) con il nearest
+      neighbour nella popolazione iniziale, fino a esaurimento del budget
+
+    Parametri:
+    - method: uno di METHODS
+    - budget: Budget (default: nessun limite, ogni stadio fino alla sua
+      terminazione naturale e una sola catena SA)
+    - initial_tour: tour di partenza al posto del nearest neighbour
+    - neighbors: liste dei vicini (default_neighbors se None)
+    - seed: seme di SA, Lin-Kernighan e algoritmo memetico
+    - callback: chiamata con un Incumbent per ogni soluzione migliorata:
+      il risultato di ogni stadio e, durante SA, Lin-Kernighan e algoritmo
+      memetico, al più una soluzione intermedia ogni 'report_interval' secondi
+
+    Restituisce l'Incumbent migliore.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Metodo non supportato: {method} (ammessi: {', '.join(METHODS)})")
+    if budget is None:
+        budget = Budget()
+    reporter = _Reporter(distance_matrix, budget, callback, report_interval)
+
+    if initial_tour is None:
+        tour, cost = nearest_neighbor(distance_matrix)
+        reporter.offer(tour, cost, "greedy")
+    else:
+        reporter.offer(list(initial_tour), tour_cost(initial_tour, distance_matrix), "initial")
+    if method == "greedy" or budget.expired():
+        return reporter.finish()
+
+    if neighbors is None:
+        neighbors = default_neighbors(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+
+    if method == "memetic":
+        start = reporter.best.tour[0]
+        tour, cost = memetic_algorithm(distance_matrix, reporter.best.tour, budget=budget,
+                                       seed=seed, neighbors=neighbors,
+                                       callback=reporter.order_callback(start, "memetic"))
+        reporter.offer(tour, cost, "memetic")
+        return reporter.finish()
+
+    tour, cost = two_opt(distance_matrix, reporter.best.tour, neighbors, budget=budget)
+    reporter.offer(tour, cost, "two_opt")
+
+    if method == "or_opt" and not budget.expired():
+        tour, cost = or_opt(distance_matrix, reporter.best.tour, neighbors, budget=budget)
+        reporter.offer(tour, cost, "or_opt")
+    elif method == "sa":
+        _anytime_sa(distance_matrix, budget, neighbors, seed, reporter)
+    elif method == "lk" and not budget.expired():
+        start = reporter.best.tour[0]
+        tour, cost = lin_kernighan(distance_matrix, reporter.best.tour, neighbors, time_limit=None,
+                                   max_kicks=budget.iterations, seed=seed, budget=budget,
+                                   callback=reporter.order_callback(start, "lk"))
+        reporter.offer(tour, cost, "lk")
+    return reporter.finish()
+
+
+def incumbents(distance_matrix, method="sa", budget=None, **options):
+    """
+    Versione generatore di solve_anytime: restituisce gli Incumbent man
+    mano che vengono trovati. La ricerca gira in un thread; chiudere il
+    generatore (break, close()) la annulla tramite il budget.
+
+    Uso:
+        for inc in incumbents(D, "sa", Budget(time_limit=60)):
+            if inc.cost <= target:
+                break
+    """
+    if budget is None:
+        budget = Budget()
+    results = queue.Queue()
+    done = object()
+
+    def worker():
+        try:
+            solve_anytime(distance_matrix, method, budget, callback=results.put, **options)
+        except Exception as exc:
+            results.put(exc)
+        finally:
+            results.put(done)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        budget.cancel()
+        thread.join()
+
+
+def _anytime_sa(distance_matrix, budget, neighbors, seed, reporter):
+    """Catene SA successive dalla soluzione migliore, entro il budget."""
+    rng = random.Random(seed)
+    sa_neighbors = [row[:SA_NEIGHBORS] for row in neighbors]
+    used = 0
+    while not budget.expired():
+        iterations = SA_CHAIN_ITERATIONS
+        if budget.iterations is not None:
+            iterations = min(iterations, budget.iterations - used)
+            if iterations <= 0:
+                break
+        start = reporter.best.tour[0]
+        stats = {}
+        tour, cost = simulated_annealing(distance_matrix, reporter.best.tour, iterations=iterations,
+                                         neighbors=sa_neighbors, rng=rng, stats=stats,
+                                         schedule="adaptive", budget=budget,
+                                         callback=reporter.order_callback(start, "sa"))
+        reporter.offer(tour, cost, "sa")
+        used += stats.get("iterations", 0)
+        if not budget.bounded() or stats.get("iterations", 0) == 0:
+            break
+
+
+class _Reporter:
+    """Tiene la soluzione migliore e la segnala al callback."""
+
+    def __init__(self, distance_matrix, budget, callback, interval):
+        self.distance_matrix = distance_matrix
+        self.budget = budget
+        self.callback = callback
+        self.interval = interval
+        self.best = None
+        self.last_report = float("-inf")
+
+    def offer(self, tour, cost, stage):
+        if self.best is not None and cost >= self.best.cost - 1e-9:
+            return
+        self.best = Incumbent(tour, cost, self.budget.elapsed(), stage)
+        self.last_report = self.best.elapsed
+        if self.callback is not None:
+            self.callback(self.best)
+
+    def order_callback(self, start, stage):
+        """
+        Callback (order, cost) per le soluzioni intermedie delle euristiche:
+        copia il tour solo se migliora e se è passato 'interval' dall'ultima
+        segnalazione.
+        """
+        def callback(order, cost):
+            if self.callback is None or self.budget.elapsed() - self.last_report < self.interval:
+                return
+            if cost < self.best.cost - 1e-9:
+                tour = _closed_tour(list(order), start)
+                self.offer(tour, tour_cost(tour, self.distance_matrix), stage)
+        return callback
+
+    def finish(self):
+        return self.best
@@ -0,0 +1,380 @@
+import numpy as np
+
+from src.utils.distances import DistanceOracle, metric_pairs, prepare_coords
+from src.utils.neighbors import build_neighbor_lists, neighbors_from_matrix
+from src.heuristics.greedy import nearest_neighbor, multi_start_nearest_neighbor
+
+METHODS = ("nearest_neighbor", "multi_start_nn", "greedy_edge",
+           "space_filling_curve", "christofides")
+
+# Oltre questa dimensione i metodi basati sulla matrice usano DistanceOracle
+# (distanze calcolate su richiesta) invece della matrice NxN
+DENSE_MAX_N = 10000
+
+# Sottoinsiemi (estremi dei frammenti, vertici dispari) fino a questa
+# dimensione vengono collegati considerando tutte le coppie
+FULL_SUBSET_MAX = 2000
+
+CANDIDATES = 10
+HILBERT_ORDER = 16
+
+
+def construct(method, instance, weight_type="header", distance_matrix=None, **options):
+    """
+    Costruisce un tour iniziale per l'istanza con il metodo indicato.
+
+    Metodi:
+    - "nearest_neighbor": nearest neighbour dalla città 0
+    - "multi_start_nn": miglior nearest neighbour tra più partenze
+      (opzioni di multi_start_nearest_neighbor, es. sample, workers)
+    - "greedy_edge": archi in ordine di lunghezza crescente tra i candidati
+      (K vicini), scartando quelli che chiudono un ciclo o danno grado 3
+    - "space_filling_curve": città ordinate lungo una curva di Hilbert,
+      O(n log n), solo per istanze con coordinate
+    - "christofides": stile Christofides con albero ricoprente minimo sui
+      candidati, matching greedy dei vertici di grado dispari, circuito
+      euleriano e scorciatoie
+
+    Parametri:
+    - instance: TSPInstance (src.utils.tsplib_reader.load_instance)
+    - weight_type: metrica ("header" = EDGE_WEIGHT_TYPE del file, None =
+      euclidea esatta), come in TSPInstance.distance_matrix
+    - distance_matrix: matrice già calcolata per i metodi nearest neighbour
+      (se None viene costruita, o sostituita da DistanceOracle oltre DENSE_MAX_N)
+    - options: opzioni specifiche del metodo (es. k per i candidati)
+
+    Restituisce:
+    - tour: tour chiuso che parte e termina nella città 0
+    - cost: costo del tour
+    """
+    if method not in METHODS:
+        raise ValueError(f"Metodo non supportato: {method} (ammessi: {', '.join(METHODS)})")
+
+    metric = _Metric(instance, weight_type)
+    if metric.n < 3:
+        tour = list(range(metric.n)) + [0] if metric.n else []
+        return tour, metric.tour_length(tour)
+
+    if method in ("nearest_neighbor", "multi_start_nn"):
+        if distance_matrix is None:
+            distance_matrix = metric.matrix()
+        if method == "nearest_neighbor":
+            neighbors = None
+            if isinstance(distance_matrix, DistanceOracle):
+                neighbors = metric.neighbors(options.get("k", CANDIDATES))
+            tour, _ = nearest_neighbor(distance_matrix, 0, neighbors)
+        else:
+            tour, _ = multi_start_nearest_neighbor(distance_matrix, **options)
+    elif method == "greedy_edge":
+        tour = greedy_edge(metric, options.get("k", CANDIDATES))
+    elif method == "space_filling_curve":
+        tour = space_filling_curve(metric.coords, options.get("order", HILBERT_ORDER))
+    else:
+        tour = christofides(metric, options.get("k", CANDIDATES))
+
+    tour = _rotate_to(tour, 0)
+    return tour, metric.tour_length(tour)
+
+
+# ---------------------------------------------------------------------------
+#  Metodi
+# ---------------------------------------------------------------------------
+
+def greedy_edge(metric, k=CANDIDATES):
+    """
+    Greedy edge matching: scorre gli archi candidati (K vicini) dal più corto
+    e aggiunge quelli che non danno grado 3 e non chiudono cicli (union-find).
+    I frammenti rimasti vengono uniti ripetendo lo stesso procedimento sugli
+    estremi. Restituisce il tour chiuso.
+    """
+    n = metric.n
+    degree = [0] * n
+    parent = list(range(n))
+    adjacency = [[] for _ in range(n)]
+
+    edges = metric.candidate_edges(k)
+    fragments = n - _add_greedy_edges(edges, degree, parent, adjacency)
+
+    while fragments > 1:
+        endpoints = np.flatnonzero(np.asarray(degree) < 2)
+        edges = metric.subset_edges(endpoints, k)
+        added = _add_greedy_edges(edges, degree, parent, adjacency)
+        if added == 0:
+            # candidati tutti interni allo stesso frammento: più vicini
+            k *= 2
+        fragments -= added
+
+    # l'ultimo frammento è un cammino hamiltoniano: si chiude sugli estremi
+    ends = [v for v in range(n) if degree[v] < 2]
+    adjacency[ends[0]].append(ends[-1])
+    adjacency[ends[-1]].append(ends[0])
+    return _walk_cycle(adjacency, n)
+
+
+def space_filling_curve(coords, order=HILBERT_ORDER):
+    """
+    Tour che visita le città nell'ordine della curva di Hilbert: le coordinate
+    vengono scalate su una griglia 2^order x 2^order e ordinate per indice
+    di Hilbert (O(n log n)). Restituisce il tour chiuso.
+    """
+    if coords is None:
+        raise ValueError("La curva di Hilbert richiede le coordinate delle città")
+    index = hilbert_index(coords, order)
+    tour = np.argsort(index, kind="stable").tolist()
+    return tour + tour[:1]
+
+
+def hilbert_index(coords, order=HILBERT_ORDER):
+    """Indice sulla curva di Hilbert di ogni punto (array int64), calcolato in NumPy."""
+    xy = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    side = 1 << order
+    lo = xy.min(axis=0)
+    span = max(float((xy.max(axis=0) - lo).max()), 1e-12)
+    grid = np.minimum(((xy - lo) / span * side).astype(np.int64), side - 1)
+    x = grid[:, 0].copy()
+    y = grid[:, 1].copy()
+
+    d = np.zeros(len(xy), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # rotazione del quadrante
+        flip = ~ry & rx
+        x[flip] = side - 1 - x[flip]
+        y[flip] = side - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap].copy()
+        s >>= 1
+    return d
+
+
+def christofides(metric, k=CANDIDATES):
+    """
+    Stile Christofides: albero ricoprente minimo (Kruskal sugli archi
+    candidati, componenti residue unite tramite un campione dei loro nodi),
+    matching greedy dei vertici di grado dispari, circuito euleriano del
+    multigrafo e scorciatoie sui nodi già visitati. Restituisce il tour chiuso.
+    """
+    n = metric.n
+    parent = list(range(n))
+    adjacency = [[] for _ in range(n)]
+
+    # albero ricoprente minimo
+    tree_edges = _kruskal(metric.candidate_edges(k), parent, adjacency)
+    while tree_edges < n - 1:
+        # foresta: si collegano le componenti tramite un campione dei loro nodi
+        nodes = _component_sample(parent, metric.coords)
+        tree_edges += _kruskal(metric.subset_edges(nodes, k), parent, adjacency)
+
+    # matching greedy dei vertici di grado dispari
+    odd = np.flatnonzero(np.array([len(a) % 2 for a in adjacency]) == 1)
+    matched = np.zeros(n, dtype=bool)
+    while len(odd):
+        for i, j, _ in metric.subset_edges(odd, k):
+            if not matched[i] and not matched[j]:
+                matched[i] = matched[j] = True
+                adjacency[i].append(j)
+                adjacency[j].append(i)
+        odd = odd[~matched[odd]]
+        k *= 2
+
+    return _shortcut(_euler_circuit(adjacency, 0), n)
+
+
+# ---------------------------------------------------------------------------
+#  Supporto
+# ---------------------------------------------------------------------------
+
+class _Metric:
+    """Distanze dell'istanza senza matrice NxN: coordinate o pesi espliciti."""
+
+    def __init__(self, instance, weight_type="header"):
+        if weight_type == "header":
+            weight_type = instance.edge_weight_type
+        self.instance = instance
+        self.weight_type = weight_type
+        self.weights = instance.weights
+        self.coords = instance.coords
+        self.n = instance.dimension
+        self.prepared = None
+        if self.weights is None:
+            self.prepared = prepare_coords(self.coords, weight_type)
+
+    def pairs(self, i, j):
+        """Distanze tra le coppie (i[t], j[t]) come array float64."""
+        if self.weights is not None:
+            return self.weights[i, j].astype(np.float64)
+        return metric_pairs(self.prepared[i], self.prepared[j], self.weight_type)
+
+    def tour_length(self, tour):
+        if len(tour) < 2:
+            return 0.0
+        tour = np.asarray(tour)
+        return float(self.pairs(tour[:-1], tour[1:]).sum())
+
+    def matrix(self):
+        if self.weights is not None:
+            return self.weights.astype(np.float64, copy=False)
+        if self.n > DENSE_MAX_N:
+            return DistanceOracle(self.coords, self.weight_type)
+        return self.instance.distance_matrix(weight_type=self.weight_type)
+
+    def neighbors(self, k, nodes=None):
+        """Liste dei K vicini (indici locali a 'nodes' se indicato)."""
+        if self.weights is not None:
+            weights = self.weights if nodes is None else self.weights[np.ix_(nodes, nodes)]
+            return neighbors_from_matrix(weights, k)
+        coords = self.coords if nodes is None else self.coords[nodes]
+        return build_neighbor_lists(coords, k, weight_type=self.weight_type)
+
+    def candidate_edges(self, k):
+        return self.subset_edges(None, k)
+
+    def subset_edges(self, nodes, k):
+        """
+        Archi (i, j, lunghezza) tra i nodi indicati (tutti se None), ordinati
+        per lunghezza: tutte le coppie per sottoinsiemi piccoli, altrimenti
+        i K vicini di ogni nodo all'interno del sottoinsieme.
+        """
+        size = self.n if nodes is None else len(nodes)
+        if size < 2:
+            return []
+        if nodes is not None and size <= FULL_SUBSET_MAX:
+            a, b = np.triu_indices(size, 1)
+        else:
+            nb = self.neighbors(min(k, size - 1), nodes).astype(np.int64)
+            a = np.repeat(np.arange(size), nb.shape[1])
+            b = nb.ravel()
+            keep = a < b
+            # arco presente solo nella lista del nodo maggiore
+            pairs = np.unique(np.concatenate([
+                np.stack([a[keep], b[keep]], axis=1),
+                np.stack([b[~keep], a[~keep]], axis=1)]), axis=0)
+            a, b = pairs[:, 0], pairs[:, 1]
+        if nodes is not None:
+            a, b = nodes[a], nodes[b]
+        length = self.pairs(a, b)
+        order = np.lexsort((b, a, length))
+        return list(zip(a[order].tolist(), b[order].tolist(), length[order].tolist()))
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def _add_greedy_edges(edges, degree, parent, adjacency):
+    """Aggiunge gli archi ammissibili per greedy edge; restituisce quanti."""
+    added = 0
+    for i, j, _ in edges:
+        if degree[i] >= 2 or degree[j] >= 2:
+            continue
+        ri = _find(parent, i)
+        rj = _find(parent, j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        degree[i] += 1
+        degree[j] += 1
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+        added += 1
+    return added
+
+
+def _kruskal(edges, parent, adjacency):
+    """Kruskal sugli archi ordinati; restituisce il numero di archi aggiunti."""
+    added = 0
+    for i, j, _ in edges:
+        ri = _find(parent, i)
+        rj = _find(parent, j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+        added += 1
+    return added
+
+
+def _component_sample(parent, coords, budget=FULL_SUBSET_MAX):
+    """
+    Nodi rappresentativi di ogni componente della foresta (union-find): circa
+    budget / componenti nodi a intervalli regolari, più i punti estremi lungo
+    x, y e le due diagonali, che stanno sul bordo della componente.
+    """
+    n = len(parent)
+    roots = np.array([_find(parent, v) for v in range(n)])
+    _, labels = np.unique(roots, return_inverse=True)
+    count = labels.max() + 1
+    per_component = max(1, budget // count - 8)
+    members_of = np.split(np.argsort(labels, kind="stable"),
+                          np.cumsum(np.bincount(labels))[:-1])
+
+    if count * 9 > budget:
+        # troppe componenti: un solo nodo ciascuna, così ogni arco tra i
+        # campioni collega due componenti diverse
+        return np.array([members[0] for members in members_of], dtype=np.int64)
+
+    chosen = set()
+    for members in members_of:
+        step = max(1, len(members) // per_component)
+        chosen.update(members[::step][:per_component].tolist())
+        if coords is not None:
+            xy = coords[members]
+            for values in (xy[:, 0], xy[:, 1], xy[:, 0] + xy[:, 1], xy[:, 0] - xy[:, 1]):
+                chosen.add(int(members[values.argmin()]))
+                chosen.add(int(members[values.argmax()]))
+    return np.array(sorted(chosen), dtype=np.int64)
+
+
+def _walk_cycle(adjacency, n):
+    """Percorre il ciclo hamiltoniano descritto da liste di adiacenza di grado 2."""
+    tour = [0]
+    prev, current = -1, 0
+    for _ in range(n - 1):
+        a, b = adjacency[current]
+        nxt = a if a != prev else b
+        tour.append(nxt)
+        prev, current = current, nxt
+    tour.append(0)
+    return tour
+
+
+def _euler_circuit(adjacency, start):
+    """Circuito euleriano (Hierholzer iterativo) di un multigrafo con gradi pari."""
+    remaining = [list(a) for a in adjacency]
+    stack = [start]
+    circuit = []
+    while stack:
+        v = stack[-1]
+        if remaining[v]:
+            u = remaining[v].pop()
+            remaining[u].remove(v)
+            stack.append(u)
+        else:
+            circuit.append(stack.pop())
+    return circuit
+
+
+def _shortcut(circuit, n):
+    """Tour hamiltoniano chiuso dal circuito, saltando i nodi già visitati."""
+    seen = np.zeros(n, dtype=bool)
+    tour = []
+    for v in circuit:
+        if not seen[v]:
+            seen[v] = True
+            tour.append(v)
+    return tour + tour[:1]
+
+
+def _rotate_to(tour, start):
+    """Tour chiuso ruotato in modo da partire e terminare in 'start'."""
+    order = tour[:-1]
+    k = order.index(start)
+    order = order[k:] + order[:k]
+    return order + [start]
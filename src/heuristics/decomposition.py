@@ -0,0 +1,326 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.lin_kernighan import lin_kernighan
+from src.heuristics.or_opt import or_opt
+from src.heuristics.two_opt import two_opt, _open_tour, _closed_tour
+from src.utils.distances import DistanceOracle, build_distance_matrix, metric_block, prepare_coords
+from src.utils.neighbors import build_neighbor_lists, neighbors_from_matrix
+from src.utils.tour_utils import tour_cost
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy è opzionale: senza di esso l'assegnamento è un argmin a blocchi
+    cKDTree = None
+
+PARTITIONS = ("kmeans", "grid")
+SOLVERS = ("two_opt", "or_opt", "lk")
+
+# Città per cluster: ogni sotto-problema usa una matrice densa (m+1)^2
+CLUSTER_SIZE = 1000
+# Un cluster k-means più grande di MAX_CLUSTER_FACTOR * cluster_size viene
+# diviso ulteriormente con la partizione a griglia
+MAX_CLUSTER_FACTOR = 2
+KMEANS_ITERATIONS = 15
+NEIGHBORS = 10
+# Città candidate per lato quando si sceglie l'arco di giunzione tra due cluster
+SEAM_CANDIDATES = 32
+# Righe per blocco nell'assegnamento k-means senza scipy
+ASSIGN_BATCH = 4096
+
+# coordinate condivise dai processi del pool (impostate da _init_worker)
+_SHARED = {}
+
+
+def cluster_decomposition(coords, weight_type=None, cluster_size=CLUSTER_SIZE, partition="kmeans",
+                          solver="or_opt", workers=None, seed=0, repair=True, cluster_time=1.0,
+                          stats=None):
+    """
+    Decomposizione per istanze molto grandi (100k+ città), senza matrice
+    delle distanze globale:
+    1. partizione delle coordinate in cluster di circa 'cluster_size' città
+       (k-means oppure griglia bilanciata)
+    2. ordine di visita dei cluster: tour sui centroidi (nearest neighbour
+       + Or-opt)
+    3. per ogni coppia di cluster consecutivi l'arco di giunzione più corto
+       tra città vicine al confine, che fissa uscita e ingresso dei cluster
+    4. per ogni cluster un cammino hamiltoniano dall'ingresso all'uscita,
+       risolto in parallelo con le euristiche esistenti (tour chiuso con un
+       nodo fittizio a costo 0 verso ingresso e uscita)
+    5. concatenazione dei cammini e riparazione delle giunture: Or-opt
+       (con mosse 2-opt) sulla matrice calcolata su richiesta
+       (DistanceOracle), a partire dalle sole città di confine
+
+    Parametri:
+    - coords: array (n, 2) delle coordinate (ad es. da read_tsplib)
+    - weight_type: EDGE_WEIGHT_TYPE TSPLIB (None = euclidea esatta)
+    - cluster_size: città per cluster (circa)
+    - partition: "kmeans" oppure "grid"
+    - solver: euristica per i cluster, "two_opt", "or_opt" oppure "lk"
+      (chained Lin-Kernighan per 'cluster_time' secondi per cluster)
+    - workers: processi per i cluster (default: numero di core; 1 = nel
+      processo corrente, senza pool)
+    - seed: seme del k-means e di Lin-Kernighan
+    - repair: se True riottimizza le giunture con Or-opt
+    - stats: dizionario opzionale riempito con tempi e dimensioni delle fasi
+
+    Restituisce:
+    - best_tour: tour chiuso che parte e termina nella città 0
+    - best_cost: costo del tour
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"Partizione non supportata: {partition} (ammesse: {', '.join(PARTITIONS)})")
+    if solver not in SOLVERS:
+        raise ValueError(f"Solver non supportato: {solver} (ammessi: {', '.join(SOLVERS)})")
+
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    xy = prepare_coords(coords, weight_type)
+    n = len(xy)
+    timings = {}
+
+    t0 = time.perf_counter()
+    k = max(1, math.ceil(n / cluster_size))
+    if partition == "kmeans":
+        labels = kmeans_partition(xy, k, seed)
+        labels = _split_large(xy, labels, MAX_CLUSTER_FACTOR * cluster_size)
+    else:
+        labels = grid_partition(xy, k)
+    members = _members(labels)
+    k = len(members)
+    timings["partition"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    centres = np.array([xy[idx].mean(axis=0) for idx in members])
+    cluster_order = _cluster_order(centres, weight_type)
+    members = [members[c] for c in cluster_order]
+    centres = centres[cluster_order]
+    entries, exits = _seams(xy, members, centres, weight_type)
+    timings["order"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tasks = [(idx, entry, exit_, solver, seed + c, cluster_time)
+             for c, (idx, entry, exit_) in enumerate(zip(members, entries, exits))]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, k)
+    if workers <= 1:
+        _init_worker(coords, weight_type)
+        try:
+            paths = [_solve_cluster(*task) for task in tasks]
+        finally:
+            _SHARED.clear()
+    else:
+        # i cluster più grandi per primi, così i processi finiscono insieme
+        by_size = sorted(range(k), key=lambda c: -len(members[c]))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(coords, weight_type)) as pool:
+            futures = {c: pool.submit(_solve_cluster, *tasks[c]) for c in by_size}
+            paths = [futures[c].result() for c in range(k)]
+    timings["solve"] = time.perf_counter() - t0
+
+    order = [city for path in paths for city in path]
+    # la riparazione legge distanze sparse su tutto il tour: senza
+    # promozione a righe ogni lettura è O(1), invece di riempire e svuotare
+    # di continuo la cache con righe di n elementi
+    dist = DistanceOracle(coords, weight_type, promote_after=math.inf)
+    tour = _closed_tour(order, 0)
+    cost_before = tour_cost(tour, dist)
+
+    boundary = 0
+    t0 = time.perf_counter()
+    if repair and k > 1:
+        neighbors = build_neighbor_lists(coords, NEIGHBORS, weight_type=weight_type)
+        cluster_of = np.empty(n, dtype=np.int64)
+        for c, idx in enumerate(members):
+            cluster_of[idx] = c
+        # città con almeno un vicino in un altro cluster
+        active = np.flatnonzero((cluster_of[neighbors] != cluster_of[:, None]).any(axis=1))
+        boundary = len(active)
+        tour, cost = or_opt(dist, tour, neighbors, active=active.tolist())
+    else:
+        cost = cost_before
+    timings["repair"] = time.perf_counter() - t0
+
+    if stats is not None:
+        stats.update(clusters=k, largest_cluster=max(len(idx) for idx in members),
+                     boundary=boundary, cost_before_repair=cost_before, **timings)
+    return tour, cost
+
+
+def kmeans_partition(xy, k, seed=0, iterations=KMEANS_ITERATIONS):
+    """
+    Etichette (n,) di un k-means di Lloyd sulle coordinate, con centri
+    iniziali estratti a caso tra le città. I cluster rimasti vuoti vengono
+    scartati (le etichette non sono per forza consecutive).
+    """
+    n = len(xy)
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    centres = xy[rng.choice(n, size=k, replace=False)]
+    labels = None
+    for _ in range(iterations):
+        new_labels = _assign(xy, centres)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        filled = counts > 0
+        for axis in range(2):
+            sums = np.bincount(labels, weights=xy[:, axis], minlength=k)
+            centres[filled, axis] = sums[filled] / counts[filled]
+    return labels
+
+
+def grid_partition(xy, k):
+    """
+    Partizione bilanciata a griglia: ceil(sqrt(k)) strisce verticali con lo
+    stesso numero di città, ognuna divisa in ceil(sqrt(k)) celle con lo
+    stesso numero di città. Restituisce le etichette (n,).
+    """
+    n = len(xy)
+    side = max(1, math.ceil(math.sqrt(k)))
+    labels = np.empty(n, dtype=np.int64)
+    label = 0
+    for strip in np.array_split(np.argsort(xy[:, 0], kind="stable"), side):
+        if len(strip) == 0:
+            continue
+        for cell in np.array_split(strip[np.argsort(xy[strip, 1], kind="stable")], side):
+            if len(cell):
+                labels[cell] = label
+                label += 1
+    return labels
+
+
+def _assign(xy, centres):
+    """Centro più vicino (distanza euclidea) di ogni città."""
+    if cKDTree is not None:
+        return cKDTree(centres).query(xy)[1]
+    labels = np.empty(len(xy), dtype=np.int64)
+    sq = (centres ** 2).sum(axis=1)
+    for start in range(0, len(xy), ASSIGN_BATCH):
+        block = xy[start:start + ASSIGN_BATCH]
+        labels[start:start + ASSIGN_BATCH] = (sq - 2.0 * block @ centres.T).argmin(axis=1)
+    return labels
+
+
+def _split_large(xy, labels, max_size):
+    """Divide con grid_partition i cluster con più di max_size città."""
+    labels = labels.copy()
+    next_label = labels.max() + 1
+    for idx in _members(labels):
+        if len(idx) > max_size:
+            sub = grid_partition(xy[idx], math.ceil(len(idx) / (max_size / 2)))
+            labels[idx] = next_label + sub
+            next_label += sub.max() + 1
+    return labels
+
+
+def _members(labels):
+    """Indici delle città di ogni cluster non vuoto (lista di array)."""
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return np.split(order, bounds)
+
+
+def _cluster_order(centres, weight_type):
+    """Ordine di visita dei cluster: tour sui centroidi."""
+    k = len(centres)
+    if k <= 3:
+        return list(range(k))
+    dist = metric_block(centres, centres, weight_type)
+    np.fill_diagonal(dist, 0)
+    tour, _ = nearest_neighbor(dist)
+    tour, _ = or_opt(dist, tour)
+    return tour[:-1]
+
+
+def _seams(xy, members, centres, weight_type):
+    """
+    Città di ingresso e di uscita di ogni cluster (nell'ordine di visita):
+    per ogni coppia consecutiva (a, b) l'arco più corto tra le città di a
+    più vicine al centroide di b e quelle di b più vicine al centroide di a.
+    Ingresso e uscita coincidono solo nei cluster di una città.
+    """
+    k = len(members)
+    entries = [None] * k
+    exits = [None] * k
+    if k == 1:
+        entries[0] = exits[0] = int(members[0][0])
+        return entries, exits
+
+    for a in range(k):
+        b = (a + 1) % k
+        from_a = _closest(xy, members[a], centres[b], weight_type, exclude=entries[a])
+        to_b = _closest(xy, members[b], centres[a], weight_type, exclude=exits[b])
+        block = metric_block(xy[from_a], xy[to_b], weight_type)
+        i, j = np.unravel_index(block.argmin(), block.shape)
+        exits[a] = int(from_a[i])
+        entries[b] = int(to_b[j])
+    return entries, exits
+
+
+def _closest(xy, idx, point, weight_type, exclude=None, count=SEAM_CANDIDATES):
+    """Le 'count' città di idx più vicine a 'point' (esclusa 'exclude', se possibile)."""
+    if exclude is not None and len(idx) > 1:
+        idx = idx[idx != exclude]
+    if len(idx) <= count:
+        return idx
+    dist = metric_block(point[None, :], xy[idx], weight_type)[0]
+    return idx[np.argpartition(dist, count)[:count]]
+
+
+def _init_worker(coords, weight_type):
+    """Inizializzatore del pool: le coordinate vengono trasferite una volta per processo."""
+    _SHARED["coords"] = coords
+    _SHARED["weight_type"] = weight_type
+
+
+def _solve_cluster(idx, entry, exit_, solver, seed, cluster_time):
+    """
+    Cammino hamiltoniano sulle città 'idx' da 'entry' a 'exit_' (indici
+    globali). Si risolve un tour chiuso con un nodo fittizio collegato a
+    costo 0 a ingresso e uscita e a costo proibitivo alle altre città: le
+    euristiche accettano solo miglioramenti, quindi il nodo fittizio resta
+    tra ingresso e uscita e togliendolo si ottiene il cammino.
+    """
+    idx = [int(c) for c in idx]
+    m = len(idx)
+    if m <= 3:
+        middle = [c for c in idx if c not in (entry, exit_)]
+        return [entry] + middle + ([exit_] if exit_ != entry else [])
+
+    dist = build_distance_matrix(_SHARED["coords"][idx], _SHARED["weight_type"])
+    local = {city: i for i, city in enumerate(idx)}
+    first, last = local[entry], local[exit_]
+
+    # matrice con il nodo fittizio m
+    big = float(dist.max()) * m + 1.0
+    full = np.full((m + 1, m + 1), big)
+    full[:m, :m] = dist
+    full[m, m] = 0.0
+    full[m, first] = full[first, m] = 0.0
+    full[m, last] = full[last, m] = 0.0
+
+    path, _ = nearest_neighbor(dist, start=first)
+    path = path[:-1]
+    path.remove(last)
+    initial = path + [last, m, first]
+
+    neighbors = neighbors_from_matrix(full, min(NEIGHBORS, m))
+    if solver == "two_opt":
+        tour, _ = two_opt(full, initial, neighbors)
+    elif solver == "or_opt":
+        tour, _ = or_opt(full, initial, neighbors)
+    else:
+        tour, _ = lin_kernighan(full, initial, neighbors, time_limit=cluster_time, seed=seed)
+
+    # tour chiuso che parte dal nodo fittizio: [m, first, ..., last, m] o al contrario
+    order = _open_tour(_closed_tour(_open_tour(tour), m))[1:]
+    if order[0] != first:
+        order.reverse()
+    return [idx[i] for i in order]
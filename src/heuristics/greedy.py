@@ -1,14 +1,47 @@
-def nearest_neighbor(distance_matrix, start=0):
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.utils.distances import distance_lookup
+
+# Memoria massima (byte) per il blocco di righe elaborato a ogni passo del
+# nearest neighbour multi-start: batch * n * 8 byte
+BATCH_BYTES = 64 * 1024 * 1024
+
+# matrice condivisa dai processi del pool (impostata da _init_worker)
+_SHARED = {}
+
+
+def nearest_neighbor(distance_matrix, start=0, neighbors=None):
     """
     Euristica deterministica greedy per il TSP:
     Partendo dal nodo 'start', ogni volta sceglie il nodo più vicino.
+
+    Se vengono passate le liste dei vicini (ordinate per distanza, vedi
+    src.utils.neighbors), il primo vicino non visitato è già il più vicino e
+    la scansione della riga della città corrente serve solo quando i suoi
+    vicini sono stati tutti visitati. La scansione è un argmin NumPy sulla
+    riga, con le città visitate mascherate.
+
     Restituisce:
     - tour (lista di nodi in ordine)
     - costo totale
     """
+    if neighbors is None:
+        tours, costs = _nearest_neighbor_batch(_row_source(distance_matrix),
+                                               len(distance_matrix), [start])
+        return tours[0].tolist(), float(costs[0])
+
     n = len(distance_matrix)
+    d = distance_lookup(distance_matrix)
+    rows = _row_source(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
     unvisited = set(range(n))
     unvisited.remove(start)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
 
     tour = [start]
     total_cost = 0
@@ -16,14 +49,127 @@ def nearest_neighbor(distance_matrix, start=0):
 
     while unvisited:
         # trova il nodo più vicino non visitato
-        next_city = min(unvisited, key=lambda j: distance_matrix[current][j])
-        total_cost += distance_matrix[current][next_city]
+        next_city = None
+        for j in neighbors[current]:
+            if j in unvisited:
+                next_city = j
+                break
+        if next_city is None:
+            # vicini tutti visitati: argmin mascherato sulla riga
+            row = np.array(rows([current])[0], dtype=np.float64)
+            row[visited] = np.inf
+            next_city = int(row.argmin())
+        total_cost += d(current, next_city)
         tour.append(next_city)
         unvisited.remove(next_city)
+        visited[next_city] = True
         current = next_city
 
     # ritorno al nodo di partenza
-    total_cost += distance_matrix[current][start]
+    total_cost += d(current, start)
     tour.append(start)
 
     return tour, total_cost
+
+
+def multi_start_nearest_neighbor(distance_matrix, starts=None, sample=None, top_k=None,
+                                 workers=1, seed=None, batch_size=None):
+    """
+    Nearest neighbour da più città di partenza, eseguito in blocchi: a ogni
+    passo tutte le partenze del blocco scelgono insieme la città successiva
+    con un argmin mascherato sulle righe della matrice (NumPy).
+
+    Parametri:
+    - starts: città di partenza (default: tutte)
+    - sample: se indicato, numero di partenze estratte a caso da 'starts'
+    - top_k: se indicato, restituisce anche i k tour migliori (es. come
+      soluzioni iniziali per two_opt o SA)
+    - workers: processi tra cui dividere le partenze (1 = processo corrente)
+    - seed: seme per l'estrazione delle partenze
+    - batch_size: partenze per blocco (default: limitato da BATCH_BYTES)
+
+    Restituisce:
+    - best_tour: tour migliore (chiuso, dalla sua città di partenza)
+    - best_cost: costo del tour migliore
+    - seeds: solo con top_k, lista dei k migliori (tour, costo) in ordine di costo
+    """
+    n = len(distance_matrix)
+    starts = list(range(n)) if starts is None else [int(s) for s in starts]
+    if sample is not None and sample < len(starts):
+        starts = random.Random(seed).sample(starts, sample)
+    if batch_size is None:
+        batch_size = max(1, min(len(starts), BATCH_BYTES // (8 * max(n, 1))))
+
+    chunks = [starts[i:i + batch_size] for i in range(0, len(starts), batch_size)]
+    keep = top_k or 1
+    if workers is not None and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_worker,
+                                 initargs=(distance_matrix,)) as pool:
+            results = list(pool.map(_best_of_chunk, chunks, [keep] * len(chunks)))
+    else:
+        rows = _row_source(distance_matrix)
+        results = [_best_of_chunk(chunk, keep, rows, n) for chunk in chunks]
+
+    ranked = sorted((item for part in results for item in part), key=lambda item: item[1])
+    best_tour, best_cost = ranked[0]
+    if top_k is None:
+        return best_tour, best_cost
+    return best_tour, best_cost, ranked[:top_k]
+
+
+def _init_worker(distance_matrix):
+    """Inizializzatore del pool: la matrice viene trasferita una volta per processo."""
+    _SHARED["rows"] = _row_source(distance_matrix)
+    _SHARED["n"] = len(distance_matrix)
+
+
+def _best_of_chunk(chunk, keep, rows=None, n=None):
+    """I 'keep' tour migliori (tour, costo) di un blocco di partenze."""
+    if rows is None:
+        rows, n = _SHARED["rows"], _SHARED["n"]
+    tours, costs = _nearest_neighbor_batch(rows, n, chunk)
+    best = np.argsort(costs, kind="stable")[:keep]
+    return [(tours[b].tolist(), float(costs[b])) for b in best]
+
+
+def _nearest_neighbor_batch(rows, n, starts):
+    """
+    Nearest neighbour simultaneo per tutte le partenze: 'rows(idx)' restituisce
+    le righe della matrice per le città idx. Restituisce (tour chiusi (B, n+1),
+    costi (B,)).
+    """
+    batch = len(starts)
+    index = np.arange(batch)
+    current = np.asarray(starts, dtype=np.int64)
+    visited = np.zeros((batch, n), dtype=bool)
+    visited[index, current] = True
+    tours = np.empty((batch, n + 1), dtype=np.int64)
+    tours[:, 0] = current
+    costs = np.zeros(batch, dtype=np.float64)
+
+    for step in range(1, n):
+        block = np.array(rows(current), dtype=np.float64)
+        block[visited] = np.inf
+        nxt = block.argmin(axis=1)
+        costs += block[index, nxt]
+        visited[index, nxt] = True
+        tours[:, step] = nxt
+        current = nxt
+
+    # ritorno al nodo di partenza
+    first = tours[:, 0]
+    costs += np.array(rows(current), dtype=np.float64)[index, first]
+    tours[:, n] = first
+    return tours, costs
+
+
+def _row_source(distance_matrix):
+    """Funzione idx -> righe della matrice (ndarray, liste, CondensedDistance, DistanceOracle)."""
+    if isinstance(distance_matrix, np.ndarray):
+        return lambda idx: distance_matrix[idx]
+    row = getattr(distance_matrix, "row", None)
+    if row is not None:
+        return lambda idx: np.array([row(int(i)) for i in idx])
+    dense = np.asarray(distance_matrix, dtype=np.float64)
+    return lambda idx: dense[idx]
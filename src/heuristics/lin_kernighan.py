@@ -0,0 +1,234 @@
+import random
+import time
+
+from src.utils.distances import distance_lookup
+from src.utils.tour_utils import tour_cost
+from src.heuristics.or_opt import or_opt
+from src.heuristics.two_opt import (default_neighbors, run_dont_look_bits, _open_tour,
+                                    _closed_tour, _reverse)
+
+
+def lin_kernighan(distance_matrix, initial_tour, neighbors=None, time_limit=10.0,
+                  max_kicks=None, max_depth=50, breadth=5, seed=None, budget=None,
+                  callback=None):
+    """
+    Chained Lin-Kernighan (Or-LK): ricerca locale a profondità variabile in
+    stile LK, ripetuta dopo perturbazioni "double-bridge" locali.
+
+    Ogni passo LK fissa t1, rimuove l'arco (t1, t2) e prosegue con una
+    sequenza di mosse 2-opt (t2 -> t3, rimozione di (t4, t3)) finché il
+    guadagno parziale resta positivo; alla fine viene mantenuto il prefisso
+    della sequenza con il guadagno massimo. I guadagni sono incrementali e i
+    candidati t3 vengono dalle liste dei vicini.
+
+    Dopo il primo ottimo locale, fino a esaurimento del tempo o dei kick, si
+    applica un double-bridge su tre segmenti vicini del tour, si riottimizza
+    solo attorno agli archi cambiati e si tiene il risultato se non peggiora.
+
+    Parametri:
+    - neighbors: liste dei vicini ordinate per distanza (default_neighbors se None)
+    - time_limit: budget di tempo in secondi (None = nessun limite)
+    - max_kicks: numero massimo di perturbazioni (None = 50 * n se né
+      time_limit né il budget pongono un limite)
+    - max_depth: profondità massima di una sequenza LK
+    - breadth: alternative provate per t3 al primo livello
+    - seed: seme del generatore casuale dei kick
+    - budget: src.heuristics.anytime.Budget, in aggiunta a time_limit e
+      max_kicks
+    - callback: chiamata come callback(order, cost) dopo il primo ottimo
+      locale e dopo ogni kick che migliora il tour; 'order' è l'ordine
+      ciclico aperto corrente, da copiare se va conservato
+
+    Restituisce:
+    - best_tour: tour migliore trovato (chiuso, stesso nodo di partenza)
+    - best_cost: costo del tour migliore
+    """
+    start_time = time.perf_counter()
+    order = _open_tour(initial_tour)
+    n = len(order)
+    if n < 8:
+        return or_opt(distance_matrix, initial_tour, neighbors)
+
+    if neighbors is None:
+        neighbors = default_neighbors(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+    if max_kicks is None and time_limit is None and (budget is None or not budget.bounded()):
+        max_kicks = 50 * n
+    stop = budget.expired if budget is not None else None
+
+    rng = random.Random(seed)
+    d = distance_lookup(distance_matrix)
+    pos = [0] * n
+    for idx, city in enumerate(order):
+        pos[city] = idx
+
+    gain_total = [0.0]
+
+    def improve(t1):
+        result = lk_improve(t1, order, pos, n, d, neighbors, max_depth, breadth)
+        if result is None:
+            return None
+        touched, gain = result
+        gain_total[0] += gain
+        return touched
+
+    cost = tour_cost(order, distance_matrix)
+    run_dont_look_bits(improve, order, n, stop=stop)
+    cost -= gain_total[0]
+    if callback is not None:
+        callback(order, cost)
+
+    kicks = 0
+    while True:
+        if max_kicks is not None and kicks >= max_kicks:
+            break
+        if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+            break
+        if stop is not None and stop():
+            break
+        kicks += 1
+
+        saved_order = order[:]
+        saved_pos = pos[:]
+
+        delta, touched = _double_bridge(order, pos, n, d, rng)
+        gain_total[0] = 0.0
+        run_dont_look_bits(improve, order, n, active=touched, stop=stop)
+        new_cost = cost + delta - gain_total[0]
+
+        if new_cost <= cost + 1e-9:
+            improved = new_cost < cost - 1e-9
+            cost = new_cost
+            if improved and callback is not None:
+                callback(order, cost)
+        else:
+            order[:] = saved_order
+            pos[:] = saved_pos
+
+    best_tour = _closed_tour(order, initial_tour[0])
+    return best_tour, tour_cost(best_tour, distance_matrix)
+
+
+def lk_improve(t1, order, pos, n, d, neighbors, max_depth=50, breadth=5):
+    """
+    Passo LK a partire da t1, in entrambe le direzioni del tour.
+    Se trova una sequenza migliorante la lascia applicata e restituisce
+    (città toccate, guadagno); altrimenti ripristina il tour e restituisce None.
+    """
+    for t2 in (order[(pos[t1] + 1) % n], order[pos[t1] - 1]):
+        result = _lk_search(t1, t2, order, pos, n, d, neighbors, max_depth, breadth)
+        if result is not None:
+            return result
+    return None
+
+
+def _lk_search(t1, t2_start, order, pos, n, d, neighbors, max_depth, breadth):
+    g_start = d(t1, t2_start)
+
+    # alternative per il primo t3, ordinate per guadagno con lookahead
+    first_choices = _candidates(t1, t2_start, g_start, order, pos, n, d, neighbors, ())
+    for _, t3_first, t4_first in first_choices[:breadth]:
+        t2 = t2_start
+        g = g_start
+        moves = []
+        added = set()
+        best_gain = 1e-9
+        best_len = 0
+        choice = (t3_first, t4_first)
+
+        while choice is not None:
+            t3, t4 = choice
+            g = g - d(t2, t3) + d(t4, t3)
+            _apply_move(t1, t2, t3, t4, order, pos, n)
+            moves.append((t2, t3, t4))
+            added.add((t2, t3) if t2 < t3 else (t3, t2))
+
+            closed_gain = g - d(t4, t1)
+            if closed_gain > best_gain:
+                best_gain = closed_gain
+                best_len = len(moves)
+
+            t2 = t4
+            if len(moves) >= max_depth:
+                break
+            options = _candidates(t1, t2, g, order, pos, n, d, neighbors, added)
+            choice = options[0][1:] if options else None
+
+        # annulla le mosse oltre il prefisso migliore (in ordine inverso)
+        for t2_m, t3_m, t4_m in reversed(moves[best_len:]):
+            _apply_move(t1, t4_m, t3_m, t2_m, order, pos, n)
+
+        if best_len:
+            touched = {t1}
+            for t2_m, t3_m, t4_m in moves[:best_len]:
+                touched.update((t2_m, t3_m, t4_m))
+            return list(touched), best_gain
+
+    return None
+
+
+def _candidates(t1, t2, g, order, pos, n, d, neighbors, added):
+    """
+    Scelte (valore, t3, t4) per il passo successivo, in ordine decrescente
+    di g - d(t2, t3) + d(t4, t3), dove t4 è il predecessore di t3 nel verso
+    in cui t2 segue t1. Il guadagno parziale g - d(t2, t3) deve restare
+    positivo e gli archi già aggiunti non possono essere rimossi.
+    """
+    forward = order[(pos[t1] + 1) % n] == t2
+    result = []
+    for t3 in neighbors[t2]:
+        g1 = g - d(t2, t3)
+        if g1 <= 0:
+            break
+        if t3 == t1:
+            continue
+        t4 = order[pos[t3] - 1] if forward else order[(pos[t3] + 1) % n]
+        if t4 == t2:
+            continue
+        if ((t4, t3) if t4 < t3 else (t3, t4)) in added:
+            continue
+        result.append((g1 + d(t4, t3), t3, t4))
+    result.sort(reverse=True)
+    return result
+
+
+def _apply_move(t1, t2, t3, t4, order, pos, n):
+    """
+    Mossa 2-opt che rimuove (t1, t2) e (t4, t3) e aggiunge (t2, t3) e
+    (t1, t4), dove nel verso di lettura t2 segue t1 e t4 precede t3.
+    """
+    if order[(pos[t1] + 1) % n] == t2:
+        _reverse(order, pos, pos[t2], pos[t4], n)
+    else:
+        _reverse(order, pos, pos[t4], pos[t2], n)
+
+
+def _double_bridge(order, pos, n, d, rng, max_segment=50):
+    """
+    Perturbazione double-bridge locale: scambia due segmenti consecutivi
+    B e C scelti vicino a una posizione casuale (A B C D -> A C B D).
+    Restituisce (variazione di costo, città agli estremi degli archi cambiati).
+    """
+    limit = max(1, min(max_segment, (n - 2) // 3))
+    len_b = rng.randint(1, limit)
+    len_c = rng.randint(1, limit)
+    i = rng.randrange(n)
+
+    a = order[i]
+    b1 = order[(i + 1) % n]
+    b2 = order[(i + len_b) % n]
+    c1 = order[(i + len_b + 1) % n]
+    c2 = order[(i + len_b + len_c) % n]
+    e = order[(i + len_b + len_c + 1) % n]
+
+    delta = (d(a, c1) + d(c2, b1) + d(b2, e)) - (d(a, b1) + d(b2, c1) + d(c2, e))
+
+    segment_b = [order[(i + 1 + t) % n] for t in range(len_b)]
+    segment_c = [order[(i + 1 + len_b + t) % n] for t in range(len_c)]
+    for t, city in enumerate(segment_c + segment_b):
+        idx = (i + 1 + t) % n
+        order[idx] = city
+        pos[city] = idx
+
+    return delta, [a, b1, b2, c1, c2, e]
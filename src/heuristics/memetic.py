@@ -0,0 +1,314 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.heuristics.greedy import nearest_neighbor, _row_source
+from src.heuristics.or_opt import or_opt
+from src.heuristics.two_opt import default_neighbors, two_opt, _open_tour, _closed_tour
+from src.utils.tour_utils import tour_costs
+
+CROSSOVERS = ("erx", "ox")
+LOCAL_SEARCHES = ("two_opt", "or_opt")
+
+POPULATION = 24
+OFFSPRING = 12
+MUTATION_RATE = 0.2
+# Generazioni senza miglioramenti dopo le quali la popolazione viene
+# rigenerata attorno alle soluzioni migliori
+PATIENCE = 15
+ELITE = 4
+# Generazioni senza budget di tempo
+GENERATIONS = 100
+# Due tour con costi più vicini di così sono considerati uguali
+COST_EPS = 1e-6
+
+# stato condiviso dai processi del pool (impostato da _init_worker)
+_SHARED = {}
+
+
+def memetic_algorithm(distance_matrix, initial_tour=None, population_size=POPULATION,
+                      offspring=OFFSPRING, generations=None, budget=None, crossover="erx",
+                      local_search="or_opt", mutation_rate=MUTATION_RATE, workers=1, seed=None,
+                      neighbors=None, callback=None, stats=None):
+    """
+    Algoritmo memetico: popolazione di tour (array 2-D, un tour aperto per
+    riga) evoluta con crossover che conserva gli archi dei genitori, ricerca
+    locale su ogni figlio e sopravvivenza (mu + lambda) dei tour migliori e
+    distinti.
+
+    A ogni generazione 'offspring' coppie di genitori scelte a torneo
+    producono un figlio ciascuna (crossover, double-bridge con probabilità
+    mutation_rate, ricerca locale); la generazione dei figli è divisa tra i
+    processi del pool. Il costo di popolazione e figli è calcolato con una
+    sola chiamata vettoriale (tour_costs). Dopo PATIENCE generazioni senza
+    miglioramenti la popolazione viene rigenerata perturbando le ELITE
+    soluzioni migliori.
+
+    Parametri:
+    - initial_tour: tour inserito nella popolazione iniziale (default:
+      nearest neighbour dalla città 0); il resto parte dal nearest
+      neighbour da città casuali
+    - population_size, offspring: dimensione della popolazione e figli per
+      generazione
+    - generations: numero di generazioni (default GENERATIONS se non c'è
+      un budget di tempo, altrimenti fino a esaurimento del budget)
+    - budget: oggetto con expired() (src.heuristics.anytime.Budget),
+      controllato tra una generazione e l'altra
+    - crossover: "erx" (edge recombination, preferisce gli archi comuni ai
+      genitori) oppure "ox" (order crossover)
+    - local_search: "two_opt" oppure "or_opt" (Or-opt con mosse 2-opt)
+    - workers: processi del pool (1 = nel processo corrente, senza pool;
+      None = numero di core)
+    - seed: seme del generatore casuale
+    - neighbors: liste dei vicini (default_neighbors se None)
+    - callback: chiamata come callback(order, cost) quando la soluzione
+      migliore migliora ('order' è il tour aperto, una nuova lista)
+    - stats: dizionario opzionale riempito con generazioni, ripartenze e
+      tour valutati
+
+    Restituisce:
+    - best_tour: migliore soluzione trovata (chiusa, stesso nodo di partenza)
+    - best_cost: costo della migliore soluzione
+    """
+    if crossover not in CROSSOVERS:
+        raise ValueError(f"Crossover non supportato: {crossover} (ammessi: {', '.join(CROSSOVERS)})")
+    if local_search not in LOCAL_SEARCHES:
+        raise ValueError(f"Ricerca locale non supportata: {local_search} "
+                         f"(ammesse: {', '.join(LOCAL_SEARCHES)})")
+
+    n = len(distance_matrix)
+    if initial_tour is None:
+        initial_tour, _ = nearest_neighbor(distance_matrix)
+    start = initial_tour[0]
+    if n < 8:
+        tour, cost = or_opt(distance_matrix, initial_tour)
+        return tour, cost
+    if generations is None and (budget is None or not budget.bounded()):
+        generations = GENERATIONS
+
+    if neighbors is None:
+        neighbors = default_neighbors(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    rng = np.random.default_rng(seed)
+    options = (crossover, local_search, mutation_rate)
+    elite = min(ELITE, population_size // 2)
+
+    if workers <= 1:
+        _init_worker(distance_matrix, neighbors)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(distance_matrix, neighbors))
+    try:
+        tours = [_open_tour(initial_tour)]
+        for city in rng.choice(n, size=population_size - 1, replace=population_size - 1 > n):
+            tour, _ = nearest_neighbor(distance_matrix, start=int(city))
+            tours.append(tour[:-1])
+        population = _improve(pool, workers, np.array(tours, dtype=np.int32), rng, mutation_rate,
+                              local_search)
+        costs = tour_costs(population, distance_matrix)
+        population, costs = _survivors(population, costs, population_size)
+        evaluated = len(costs)
+
+        best_cost = costs[0]
+        if callback is not None:
+            callback(population[0].tolist(), float(best_cost))
+        generation = 0
+        last_improvement = 0
+        restarts = 0
+        while not (generations is not None and generation >= generations):
+            if budget is not None and budget.expired():
+                break
+            generation += 1
+
+            parents = _tournament(costs, offspring, rng)
+            children = _offspring(pool, workers, population[parents], rng, options)
+            merged = np.concatenate([population, children])
+            merged_costs = tour_costs(merged, distance_matrix)
+            evaluated += len(children)
+            population, costs = _survivors(merged, merged_costs, population_size)
+
+            if costs[0] < best_cost - COST_EPS:
+                best_cost = costs[0]
+                last_improvement = generation
+                if callback is not None:
+                    callback(population[0].tolist(), float(best_cost))
+            elif generation - last_improvement >= PATIENCE:
+                # popolazione convergente: si riparte perturbando le migliori
+                restarts += 1
+                last_improvement = generation
+                seeds = population[np.arange(population_size - elite) % elite]
+                fresh = _improve(pool, workers, seeds, rng, 1.0, local_search)
+                merged = np.concatenate([population[:elite], fresh])
+                population, costs = _survivors(merged, tour_costs(merged, distance_matrix),
+                                               population_size)
+                evaluated += len(fresh)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        else:
+            _SHARED.clear()
+
+    if stats is not None:
+        stats.update(generations=generation, restarts=restarts, evaluated=evaluated,
+                     distinct=len(np.unique(np.round(costs / COST_EPS))))
+
+    best_tour = _closed_tour(population[0].tolist(), start)
+    return best_tour, float(best_cost)
+
+
+def _tournament(costs, count, rng, size=2):
+    """Indici (count, 2) dei genitori, ognuno il migliore di 'size' estratti a caso."""
+    picks = rng.integers(len(costs), size=(count, 2, size))
+    best = costs[picks].argmin(axis=2)
+    return np.take_along_axis(picks, best[..., None], axis=2)[..., 0]
+
+
+def _survivors(population, costs, size):
+    """
+    I 'size' tour migliori, scartando quelli con lo stesso costo di uno già
+    scelto (duplicati quasi certi); se i distinti non bastano si completano
+    con i duplicati migliori. Restituisce (popolazione, costi) ordinati.
+    """
+    order = np.argsort(costs, kind="stable")
+    _, first = np.unique(np.round(costs[order] / COST_EPS), return_index=True)
+    keep = order[first[:size]]
+    if len(keep) < size:
+        rest = np.setdiff1d(order, keep, assume_unique=True)
+        keep = np.concatenate([keep, rest[np.argsort(costs[rest], kind="stable")][:size - len(keep)]])
+    keep = keep[np.argsort(costs[keep], kind="stable")]
+    return population[keep], costs[keep]
+
+
+def _chunks(count, workers):
+    """Divide 'count' elementi in al più 'workers' blocchi contigui."""
+    return [chunk for chunk in np.array_split(np.arange(count), max(1, workers)) if len(chunk)]
+
+
+def _run(pool, workers, fn, batch, rng, *args):
+    """Esegue fn sui blocchi di 'batch' (nel pool o nel processo corrente) e concatena."""
+    chunks = _chunks(len(batch), workers)
+    seeds = rng.integers(2 ** 63, size=len(chunks))
+    if pool is None:
+        parts = [fn(batch[chunk], int(s), *args) for chunk, s in zip(chunks, seeds)]
+    else:
+        futures = [pool.submit(fn, batch[chunk], int(s), *args) for chunk, s in zip(chunks, seeds)]
+        parts = [f.result() for f in futures]
+    return np.concatenate(parts)
+
+
+def _offspring(pool, workers, parents, rng, options):
+    return _run(pool, workers, _offspring_batch, parents, rng, *options)
+
+
+def _improve(pool, workers, tours, rng, mutation_rate, local_search):
+    return _run(pool, workers, _improve_batch, tours, rng, mutation_rate, local_search)
+
+
+def _init_worker(distance_matrix, neighbors):
+    """Inizializzatore del pool: matrice e vicini vengono trasferiti una volta per processo."""
+    _SHARED["D"] = distance_matrix
+    _SHARED["rows"] = _row_source(distance_matrix)
+    _SHARED["neighbors"] = neighbors
+
+
+def _offspring_batch(parents, seed, crossover, local_search, mutation_rate):
+    """Un figlio per coppia di genitori (m, 2, n): crossover, mutazione, ricerca locale."""
+    rng = np.random.default_rng(seed)
+    children = np.empty((len(parents), parents.shape[2]), dtype=np.int32)
+    for t, (p1, p2) in enumerate(parents):
+        child = _erx(p1, p2, rng) if crossover == "erx" else _ox(p1, p2, rng)
+        if rng.random() < mutation_rate:
+            child = _double_bridge(child, rng)
+        children[t] = _local_search(child, local_search)
+    return children
+
+
+def _improve_batch(tours, seed, mutation_rate, local_search):
+    """Ricerca locale su ogni tour (m, n), dopo un double-bridge con probabilità mutation_rate."""
+    rng = np.random.default_rng(seed)
+    improved = np.empty_like(tours)
+    for t, tour in enumerate(tours):
+        if rng.random() < mutation_rate:
+            tour = _double_bridge(tour, rng)
+        improved[t] = _local_search(tour, local_search)
+    return improved
+
+
+def _local_search(order, method):
+    tour = order.tolist()
+    tour.append(tour[0])
+    if method == "two_opt":
+        tour, _ = two_opt(_SHARED["D"], tour, _SHARED["neighbors"])
+    else:
+        tour, _ = or_opt(_SHARED["D"], tour, _SHARED["neighbors"])
+    return tour[:-1]
+
+
+def _erx(p1, p2, rng):
+    """
+    Edge recombination: il figlio prosegue sempre lungo un arco di uno dei
+    genitori, preferendo gli archi comuni a entrambi e poi le città con
+    meno archi ancora disponibili. Se la città corrente non ha più archi
+    liberi si passa alla città non visitata più vicina.
+    """
+    n = len(p1)
+    edges = [{} for _ in range(n)]
+    for parent in (p1.tolist(), p2.tolist()):
+        prev = parent[-1]
+        for city in parent:
+            edges[city][prev] = edges[city].get(prev, 0) + 1
+            edges[prev][city] = edges[prev].get(city, 0) + 1
+            prev = city
+
+    neighbors = _SHARED["neighbors"]
+    visited = np.zeros(n, dtype=bool)
+    current = int(p1[rng.integers(n)])
+    child = [current]
+    visited[current] = True
+    for _ in range(n - 1):
+        options = edges[current]
+        for city in options:
+            del edges[city][current]
+        if options:
+            # archi comuni (conteggio 2) prima, poi meno archi rimasti; pari merito a caso
+            noise = rng.random(len(options))
+            nxt = min(zip(options, noise),
+                      key=lambda item: (-options[item[0]], len(edges[item[0]]), item[1]))[0]
+        else:
+            nxt = next((c for c in neighbors[current] if not visited[c]), None)
+            if nxt is None:
+                row = np.array(_SHARED["rows"]([current])[0], dtype=np.float64)
+                row[visited] = np.inf
+                nxt = int(row.argmin())
+        visited[nxt] = True
+        child.append(nxt)
+        current = nxt
+    return np.array(child, dtype=np.int32)
+
+
+def _ox(p1, p2, rng):
+    """Order crossover: un tratto di p1, le altre città nell'ordine in cui compaiono in p2."""
+    n = len(p1)
+    i, j = np.sort(rng.choice(n + 1, size=2, replace=False))
+    in_segment = np.zeros(n, dtype=bool)
+    in_segment[p1[i:j]] = True
+    rotated = np.roll(p2, -j)
+    rest = rotated[~in_segment[rotated]]
+    child = np.empty(n, dtype=p1.dtype)
+    child[i:j] = p1[i:j]
+    child[j:] = rest[:n - j]
+    child[:i] = rest[n - j:]
+    return child
+
+
+def _double_bridge(order, rng):
+    """Double-bridge su tutto il tour: A B C D -> A C B D con tre tagli casuali."""
+    n = len(order)
+    i, j, k = np.sort(rng.choice(np.arange(1, n), size=3, replace=False))
+    return np.concatenate([order[:i], order[j:k], order[i:j], order[k:]])
@@ -0,0 +1,147 @@
+from src.utils.distances import distance_lookup
+from src.utils.tour_utils import tour_cost
+from src.heuristics.two_opt import (default_neighbors, improve_two_opt, run_dont_look_bits,
+                                    _open_tour, _closed_tour)
+
+
+def or_opt(distance_matrix, initial_tour, neighbors=None, max_segment=3,
+           two_opt_moves=True, active=None, budget=None):
+    """
+    Local search Or-opt: sposta segmenti di 1..max_segment città consecutive
+    (anche invertiti) tra altre due città adiacenti, cioè una mossa 3-opt
+    ristretta di "segment insertion". Con two_opt_moves=True il vicinato
+    comprende anche le mosse 2-opt ("or-2opt").
+
+    Tutti i guadagni sono calcolati in O(1) dagli archi rimossi e aggiunti;
+    le posizioni di inserimento vengono cercate solo tra i vicini degli
+    estremi del segmento, con don't-look bits come in two_opt_engine.
+
+    Parametri:
+    - neighbors: liste dei vicini ordinate per distanza (default_neighbors se None)
+    - max_segment: lunghezza massima dei segmenti spostati
+    - two_opt_moves: se True prova anche le mosse 2-opt
+    - active: città da esaminare inizialmente (default: tutte)
+    - budget: oggetto con expired() (src.heuristics.anytime.Budget); se
+      esaurito la ricerca si ferma e restituisce il tour corrente
+
+    Restituisce:
+    - best_tour: tour migliorato (chiuso, stesso nodo di partenza)
+    - best_cost: costo del tour migliorato
+    """
+    order = _open_tour(initial_tour)
+    n = len(order)
+    if n < 5:
+        return _closed_tour(order, order[0] if order else None), tour_cost(initial_tour, distance_matrix)
+
+    if neighbors is None:
+        neighbors = default_neighbors(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+
+    d = distance_lookup(distance_matrix)
+    pos = [0] * n
+    for idx, city in enumerate(order):
+        pos[city] = idx
+
+    def improve(a):
+        touched = None
+        if two_opt_moves:
+            touched = improve_two_opt(a, order, pos, n, d, neighbors)
+        if touched is None:
+            touched = improve_or_opt(a, order, pos, n, d, neighbors, max_segment)
+        return touched
+
+    run_dont_look_bits(improve, order, n, active, budget.expired if budget is not None else None)
+
+    best_tour = _closed_tour(order, initial_tour[0])
+    return best_tour, tour_cost(best_tour, distance_matrix)
+
+
+def improve_or_opt(a, order, pos, n, d, neighbors, max_segment=3):
+    """
+    Cerca la migliore mossa Or-opt tra i segmenti che iniziano o finiscono
+    nella città 'a' e la applica. Restituisce le città toccate, oppure None.
+    """
+    best_gain = 1e-9
+    best_move = None
+    pa = pos[a]
+
+    for length in range(1, min(max_segment, n - 3) + 1):
+        starts = (pa,) if length == 1 else (pa, (pa - length + 1) % n)
+        for i in starts:
+            first = order[i]
+            last = order[(i + length - 1) % n]
+            p = order[i - 1]
+            nx = order[(i + length) % n]
+            g_remove = d(p, first) + d(last, nx) - d(p, nx)
+            if g_remove <= best_gain:
+                continue
+
+            for end, other in ((first, last), (last, first)):
+                for x in neighbors[end]:
+                    d_end_x = d(end, x)
+                    if d_end_x >= g_remove - best_gain:
+                        break
+                    px = pos[x]
+                    if (px - i) % n < length:
+                        continue
+                    for y in (order[(px + 1) % n], order[px - 1]):
+                        if (pos[y] - i) % n < length:
+                            continue
+                        # inserimento tra x e y, con 'end' adiacente a x
+                        gain = g_remove - d_end_x - d(other, y) + d(x, y)
+                        if gain > best_gain:
+                            best_gain = gain
+                            best_move = (i, length, x, y, end)
+
+    if best_move is None:
+        return None
+
+    i, length, x, y, end = best_move
+    first = order[i]
+    last = order[(i + length - 1) % n]
+    p = order[i - 1]
+    nx = order[(i + length) % n]
+
+    # arco di inserimento (c, e) con e successore di c nell'ordine attuale
+    if order[(pos[x] + 1) % n] == y:
+        c, e = x, y
+        reverse = end != first
+    else:
+        c, e = y, x
+        reverse = end == first
+
+    _move_segment(order, pos, n, i, length, c, e, reverse)
+    return (p, nx, first, last, c, e)
+
+
+def _move_segment(order, pos, n, i, length, c, e, reverse):
+    """
+    Sposta il segmento di 'length' città che inizia in posizione i tra le
+    città adiacenti c ed e (e successore di c), invertendolo se richiesto.
+    Viene riscritto solo il tratto più corto tra il segmento e il punto di
+    inserimento.
+    """
+    segment = [order[(i + t) % n] for t in range(length)]
+    if reverse:
+        segment.reverse()
+
+    seg_end = i + length - 1
+    forward = (pos[c] - seg_end) % n      # città tra il segmento e c (inclusa)
+    backward = (i - pos[e]) % n           # città tra e (inclusa) e il segmento
+
+    if forward <= backward:
+        # [segmento][nx ... c]  ->  [nx ... c][segmento]
+        middle = [order[(seg_end + 1 + t) % n] for t in range(forward)]
+        start = i
+        new_block = middle + segment
+    else:
+        # [e ... p][segmento]  ->  [segmento][e ... p]
+        start = pos[e]
+        middle = [order[(start + t) % n] for t in range(backward)]
+        new_block = segment + middle
+
+    for t, city in enumerate(new_block):
+        idx = (start + t) % n
+        order[idx] = city
+        pos[city] = idx
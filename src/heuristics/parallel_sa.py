@@ -0,0 +1,368 @@
+import copy
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.utils.distances import distance_lookup
+from src.utils.tour_utils import tour_cost
+from src.heuristics.sa_schedules import calibrate_temperature
+from src.heuristics.simulated_annealing import simulated_annealing, anneal
+from src.heuristics.two_opt import _open_tour, _closed_tour
+
+MODES = ("multistart", "tempering")
+
+# Probabilità di accettare una mossa peggiorante media alla temperatura più
+# alta e più bassa della scala di default del parallel tempering
+LADDER_ACCEPTANCE = (0.005, 0.0001)
+
+# stato condiviso dai processi del pool (impostato da _init_worker)
+_SHARED = {}
+
+
+def parallel_simulated_annealing(distance_matrix, initial_tour, mode="multistart",
+                                 n_chains=None, workers=None, seed=None,
+                                 T0=10000, alpha=0.9993, iterations=50000,
+                                 neighbors=None, moves=("2opt",),
+                                 temperatures=None, exchange_every=1000, schedule=None):
+    """
+    Simulated Annealing su più catene in parallelo (processi), ognuna con un
+    proprio flusso casuale ricavato da un unico seme (SeedSequence.spawn),
+    quindi riproducibile a parità di seed e n_chains.
+
+    Modalità:
+    - "multistart": n_chains catene indipendenti, ognuna con lo schedule
+      (T0, alpha, iterations) di simulated_annealing a partire da initial_tour
+    - "tempering": parallel tempering, n_chains repliche a temperatura fissa
+      (scala geometrica tra le temperature a cui una mossa peggiorante media
+      è accettata con le probabilità LADDER_ACCEPTANCE, o 'temperatures');
+      ogni exchange_every iterazioni le repliche a temperature adiacenti
+      provano a scambiarsi la temperatura (criterio di Metropolis). Ogni
+      replica resta nel processo che la esegue: tra processi passano solo
+      costi e temperature
+
+    Parametri:
+    - n_chains: numero di catene/repliche (default: numero di core)
+    - workers: processi del pool (default: min(n_chains, core); 1 = nel
+      processo corrente, senza pool)
+    - seed: seme principale (None = non riproducibile)
+    - T0, alpha, neighbors, moves, schedule: come in simulated_annealing
+      (T0, alpha e schedule valgono solo per "multistart"; ogni catena usa
+      una copia dello schedule)
+    - temperatures: scala di temperature per "tempering" (una per replica)
+    - exchange_every: iterazioni tra due tentativi di scambio in "tempering"
+
+    Restituisce:
+    - best_tour: migliore soluzione trovata tra tutte le catene
+    - best_cost: costo della migliore soluzione
+    - chain_stats: lista di dizionari con le statistiche di ogni catena
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modalità non supportata: {mode} (ammesse: {', '.join(MODES)})")
+
+    cpu = os.cpu_count() or 1
+    if n_chains is None:
+        n_chains = cpu
+    if workers is None:
+        workers = min(n_chains, cpu)
+    if neighbors is not None and hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+
+    if len(_open_tour(initial_tour)) < 5:
+        return list(initial_tour), tour_cost(initial_tour, distance_matrix), []
+
+    rngs = _spawn_rngs(seed, n_chains)
+
+    if mode == "tempering":
+        if temperatures is not None and len(temperatures) != n_chains:
+            raise ValueError("Serve una temperatura per ogni replica")
+        best_order, chain_stats = _tempering(distance_matrix, initial_tour, rngs, temperatures,
+                                             iterations, exchange_every, moves, neighbors,
+                                             workers)
+        best_tour = _closed_tour(best_order, initial_tour[0])
+        return best_tour, tour_cost(best_tour, distance_matrix), chain_stats
+
+    if workers <= 1:
+        _init_worker(distance_matrix, neighbors)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(distance_matrix, neighbors))
+    try:
+        best_order, chain_stats = _multistart(pool, initial_tour, rngs, T0, alpha,
+                                              iterations, moves, schedule)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        else:
+            _SHARED.clear()
+
+    best_tour = _closed_tour(best_order, initial_tour[0])
+    return best_tour, tour_cost(best_tour, distance_matrix), chain_stats
+
+
+def _spawn_rngs(seed, n_chains):
+    """Un random.Random indipendente per catena, da SeedSequence(seed).spawn."""
+    children = np.random.SeedSequence(seed).spawn(n_chains)
+    return [random.Random(int(child.generate_state(2, dtype=np.uint64)[0])) for child in children]
+
+
+def _geometric_ladder(T_high, T_low, n):
+    """n temperature in progressione geometrica da T_high a T_low."""
+    if n == 1:
+        return [T_low]
+    ratio = (T_low / T_high) ** (1.0 / (n - 1))
+    return [T_high * ratio ** i for i in range(n)]
+
+
+def _calibrated_ladder(d, order, rng, neighbors, n, acceptance=LADDER_ACCEPTANCE):
+    """
+    Scala di n temperature calibrata sulle variazioni di costo delle mosse
+    2-opt del tour: agli estremi una mossa peggiorante media viene accettata
+    con le probabilità 'acceptance' (alta, bassa). Il rapporto tra gli
+    estremi è ln(bassa) / ln(alta), quindi le temperature adiacenti sono
+    vicine e gli scambi vengono accettati.
+    """
+    high, low = acceptance
+    pos = [0] * len(order)
+    for idx, city in enumerate(order):
+        pos[city] = idx
+    T_high = calibrate_temperature(d, order, pos, rng, neighbors, high)
+    return _geometric_ladder(T_high, T_high * math.log(high) / math.log(low), n)
+
+
+def _init_worker(distance_matrix, neighbors):
+    """Inizializzatore del pool: la matrice viene trasferita una volta per processo."""
+    _SHARED["D"] = distance_matrix
+    _SHARED["d"] = distance_lookup(distance_matrix)
+    _SHARED["neighbors"] = neighbors
+
+
+def _submit(pool, fn, *args):
+    """Esegue fn nel pool oppure subito (workers=1); restituisce un oggetto con result()."""
+    if pool is not None:
+        return pool.submit(fn, *args)
+    return _Done(fn(*args))
+
+
+class _Done:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+# ---------------------------------------------------------------------------
+#  Multi-start
+# ---------------------------------------------------------------------------
+
+def _multistart(pool, initial_tour, rngs, T0, alpha, iterations, moves, schedule):
+    futures = [_submit(pool, _multistart_chain, chain, list(initial_tour), rng,
+                       T0, alpha, iterations, moves, copy.deepcopy(schedule))
+               for chain, rng in enumerate(rngs)]
+    results = [f.result() for f in futures]
+
+    best_order = None
+    best_cost = math.inf
+    chain_stats = []
+    for tour, cost, stats in results:
+        chain_stats.append(stats)
+        if cost < best_cost:
+            best_cost = cost
+            best_order = _open_tour(tour)
+    return best_order, chain_stats
+
+
+def _multistart_chain(chain, initial_tour, rng, T0, alpha, iterations, moves, schedule):
+    start = time.perf_counter()
+    stats = {"chain": chain}
+    tour, cost = simulated_annealing(_SHARED["D"], initial_tour, T0=T0, alpha=alpha,
+                                     iterations=iterations, neighbors=_SHARED["neighbors"],
+                                     moves=moves, rng=rng, stats=stats, schedule=schedule)
+    stats["best_cost"] = cost
+    stats["time"] = time.perf_counter() - start
+    return tour, cost, stats
+
+
+# ---------------------------------------------------------------------------
+#  Parallel tempering
+# ---------------------------------------------------------------------------
+
+def _tempering(distance_matrix, initial_tour, rngs, temperatures, iterations, exchange_every,
+               moves, neighbors, workers):
+    n_replicas = len(rngs)
+    order = _open_tour(initial_tour)
+    cost = tour_cost(initial_tour, distance_matrix)
+    if temperatures is None:
+        ladder_rng = random.Random(rngs[0].getrandbits(64))
+        temperatures = _calibrated_ladder(distance_lookup(distance_matrix), order, ladder_rng,
+                                          neighbors, n_replicas)
+    swap_rng = random.Random(rngs[0].getrandbits(64))
+
+    # il gruppo g esegue le repliche r con r % len(groups) == g; le repliche
+    # non si spostano: uno scambio cambia solo le loro temperature
+    n_groups = max(1, min(workers, n_replicas))
+    members = [list(range(g, n_replicas, n_groups)) for g in range(n_groups)]
+    group_class = _LocalGroup if n_groups == 1 else _ProcessGroup
+    groups = []
+    try:
+        for replicas in members:
+            groups.append(group_class(distance_matrix, neighbors, moves,
+                                      {r: (order[:], cost, rngs[r]) for r in replicas}))
+
+        # slot[t] = replica alla temperatura t
+        slot = list(range(n_replicas))
+        costs = [cost] * n_replicas
+        chain_stats = [{"chain": r, "iterations": 0, "accepted": 0, "improvements": 0,
+                        "swaps": 0, "best_cost": cost, "time": 0.0}
+                       for r in range(n_replicas)]
+        done = 0
+        rounds = 0
+        while done < iterations:
+            steps = min(exchange_every, iterations - done)
+            temperature_of = {r: temperatures[t] for t, r in enumerate(slot)}
+            for group, replicas in zip(groups, members):
+                group.send((steps, {r: temperature_of[r] for r in replicas}))
+            for group in groups:
+                for r, (rep_cost, seg_best_cost, stats) in group.recv().items():
+                    costs[r] = rep_cost
+                    st = chain_stats[r]
+                    for key in ("iterations", "accepted", "improvements", "time"):
+                        st[key] += stats[key]
+                    st["best_cost"] = min(st["best_cost"], seg_best_cost)
+            done += steps
+
+            # scambi tra temperature adiacenti, alternando coppie pari e dispari
+            for t in range(rounds % 2, n_replicas - 1, 2):
+                r1, r2 = slot[t], slot[t + 1]
+                x = (1.0 / temperatures[t] - 1.0 / temperatures[t + 1]) * (costs[r1] - costs[r2])
+                if x >= 0 or swap_rng.random() < math.exp(x):
+                    slot[t], slot[t + 1] = r2, r1
+                    chain_stats[r1]["swaps"] += 1
+                    chain_stats[r2]["swaps"] += 1
+            rounds += 1
+
+        # solo alla fine i processi restituiscono il migliore ordine di ogni replica
+        best_order, best_cost = order, cost
+        for group in groups:
+            group.send(None)
+        for group in groups:
+            for rep_best_order, rep_best_cost in group.recv().values():
+                if rep_best_cost < best_cost:
+                    best_order, best_cost = rep_best_order, rep_best_cost
+    finally:
+        for group in groups:
+            group.close()
+
+    for t, r in enumerate(slot):
+        chain_stats[r]["final_temperature"] = temperatures[t]
+    return best_order, chain_stats
+
+
+class _Replicas:
+    """
+    Repliche del parallel tempering eseguite da un processo: ordine,
+    posizioni, costo, rng e migliore soluzione di ognuna restano qui.
+    """
+
+    def __init__(self, d, neighbors, moves, replicas):
+        self.d = d
+        self.neighbors = neighbors
+        self.moves = moves
+        self.state = {}
+        for r, (order, cost, rng) in replicas.items():
+            pos = [0] * len(order)
+            for idx, city in enumerate(order):
+                pos[city] = idx
+            self.state[r] = [order, pos, cost, rng, order[:], cost]
+
+    def run(self, steps, temperature_of):
+        """Esegue 'steps' iterazioni per replica; restituisce {r: (costo, migliore, stats)}."""
+        results = {}
+        for r, T in temperature_of.items():
+            st = self.state[r]
+            order, pos, cost, rng = st[0], st[1], st[2], st[3]
+            start = time.perf_counter()
+            # temperatura fissa: alpha = 1 e nessuna soglia minima
+            result = anneal(self.d, order, pos, cost, T, 1.0, steps, rng,
+                            self.neighbors, self.moves, T_min=0.0)
+            stats = result["stats"]
+            stats["time"] = time.perf_counter() - start
+            st[2] = result["cost"]
+            if result["best_cost"] < st[5]:
+                st[4], st[5] = result["best_order"], result["best_cost"]
+            results[r] = (result["cost"], result["best_cost"], stats)
+        return results
+
+    def best(self):
+        return {r: (st[4], st[5]) for r, st in self.state.items()}
+
+
+class _LocalGroup:
+    """Repliche eseguite nel processo corrente (workers=1)."""
+
+    def __init__(self, distance_matrix, neighbors, moves, replicas):
+        self.replicas = _Replicas(distance_lookup(distance_matrix), neighbors, moves, replicas)
+        self.reply = None
+
+    def send(self, request):
+        self.reply = self.replicas.best() if request is None else self.replicas.run(*request)
+
+    def recv(self):
+        return self.reply
+
+    def close(self):
+        pass
+
+
+class _ProcessGroup:
+    """Repliche eseguite da un processo dedicato, comandato tramite una pipe."""
+
+    def __init__(self, distance_matrix, neighbors, moves, replicas):
+        self.conn, child_conn = mp.Pipe()
+        self.proc = mp.Process(target=_replicas_main,
+                               args=(child_conn, distance_matrix, neighbors, moves, replicas),
+                               daemon=True)
+        self.proc.start()
+        child_conn.close()
+
+    def send(self, request):
+        self.conn.send(request)
+
+    def recv(self):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.close()
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join()
+
+
+def _replicas_main(conn, distance_matrix, neighbors, moves, replicas):
+    """
+    Corpo del processo di un _ProcessGroup: riceve (iterazioni, {replica:
+    temperatura}) e risponde con i costi; None chiede le migliori soluzioni
+    e termina il processo.
+    """
+    replicas = _Replicas(distance_lookup(distance_matrix), neighbors, moves, replicas)
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                conn.send(replicas.best())
+                break
+            conn.send(replicas.run(*request))
+    except EOFError:
+        # il processo principale ha chiuso la pipe (errore o interruzione)
+        pass
+    finally:
+        conn.close()
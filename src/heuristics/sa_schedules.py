@@ -0,0 +1,159 @@
+import math
+
+SCHEDULES = ("geometric", "adaptive")
+
+
+class GeometricSchedule:
+    """
+    Raffreddamento geometrico classico: T_{k+1} = alpha * T_k, a partire da
+    T0. Con stop_after la catena si ferma dopo stop_after iterazioni senza
+    miglioramenti della soluzione migliore.
+    """
+
+    def __init__(self, T0=10000, alpha=0.9993, stop_after=None, epoch=1000):
+        self.T0 = T0
+        self.alpha = alpha
+        self.stop_after = stop_after
+        self.epoch = epoch
+        self.stopped_early = False
+
+    def start(self, d, order, pos, rng, neighbors, iterations):
+        """Temperatura e fattore di raffreddamento iniziali."""
+        self.stopped_early = False
+        return self.T0, self.alpha
+
+    def update(self, T, accepted, since_best):
+        """
+        Chiamata ogni 'epoch' iterazioni con le mosse accettate nell'epoca e le
+        iterazioni dall'ultimo miglioramento; restituisce (T, alpha) oppure
+        None per terminare la catena.
+        """
+        if self.stop_after is not None and since_best >= self.stop_after:
+            self.stopped_early = True
+            return None
+        return T, self.alpha
+
+    def info(self):
+        return {"schedule": "geometric", "stopped_early": self.stopped_early}
+
+
+class AdaptiveSchedule:
+    """
+    Schedule auto-calibrato:
+    - T0 ricavata da un campione di variazioni di costo 2-opt sul tour
+      iniziale, in modo che le mosse peggioranti vengano accettate con
+      probabilità 'acceptance'
+    - ad ogni epoca la temperatura viene corretta in base al tasso di
+      accettazione osservato, che deve seguire un obiettivo decrescente
+      (geometricamente) da 'acceptance' a 'final_acceptance' lungo il budget
+      di iterazioni
+    - la catena è "congelata" quando accetta meno di 'freeze' mosse per
+      iterazione; se congelata e senza miglioramenti da 'reheat_after'
+      iterazioni, la temperatura torna a 'reheat' volte quella dell'ultimo
+      miglioramento (al più max_reheats volte), da 'stop_after' termina
+
+    I default dipendono dal numero di città n: epoch = 5 n (almeno 200),
+    reheat_after = 20 n, stop_after = 40 n.
+    """
+
+    def __init__(self, acceptance=0.1, final_acceptance=0.002, freeze=0.01, epoch=None,
+                 reheat_after=None, reheat=2.0, max_reheats=2, stop_after=None,
+                 samples=1000, T0=None):
+        if not 0 < final_acceptance < acceptance < 1:
+            raise ValueError("Serve 0 < final_acceptance < acceptance < 1")
+        self.acceptance = acceptance
+        self.final_acceptance = final_acceptance
+        self.freeze = freeze
+        self.epoch_param = epoch
+        self.reheat_after_param = reheat_after
+        self.reheat = reheat
+        self.max_reheats = max_reheats
+        self.stop_after_param = stop_after
+        self.samples = samples
+        self.T0 = T0
+
+    def start(self, d, order, pos, rng, neighbors, iterations):
+        n = len(order)
+        self.epoch = self.epoch_param or max(200, 5 * n)
+        self.reheat_after = self.reheat_after_param or 20 * n
+        self.stop_after = self.stop_after_param or 40 * n
+        self.epochs = max(1, iterations // self.epoch)
+        self.done = 0
+        self.reheats = 0
+        self.reheated_at = 0
+        self.stopped_early = False
+
+        T = self.T0
+        if T is None:
+            T = calibrate_temperature(d, order, pos, rng, neighbors,
+                                      self.acceptance, self.samples)
+        self.T_start = T
+        self.T_best = T
+        return T, 1.0
+
+    def update(self, T, accepted, since_best):
+        self.done += 1
+        rate = accepted / self.epoch
+
+        if since_best < self.epoch:
+            # miglioramento nell'ultima epoca
+            self.T_best = T
+            self.reheated_at = 0
+        elif rate < self.freeze:
+            if since_best >= self.stop_after:
+                self.stopped_early = True
+                return None
+            if since_best - self.reheated_at >= self.reheat_after and self.reheats < self.max_reheats:
+                self.reheats += 1
+                self.reheated_at = since_best
+                return max(T, self.T_best * self.reheat), 1.0
+
+        progress = min(1.0, self.done / self.epochs)
+        target = self.acceptance * (self.final_acceptance / self.acceptance) ** progress
+        # correzione moltiplicativa limitata: più accettazioni del previsto -> si raffredda
+        factor = math.sqrt((target + 1e-4) / (rate + 1e-4))
+        return T * min(1.25, max(0.5, factor)), 1.0
+
+    def info(self):
+        return {"schedule": "adaptive", "T0": self.T_start, "reheats": self.reheats,
+                "stopped_early": self.stopped_early}
+
+
+def make_schedule(schedule, T0=10000, alpha=0.9993):
+    """
+    Schedule a partire dal nome ("geometric", "adaptive") oppure restituisce
+    l'oggetto passato. Per "geometric" si usano T0 e alpha.
+    """
+    if schedule is None or schedule == "geometric":
+        return GeometricSchedule(T0, alpha)
+    if schedule == "adaptive":
+        return AdaptiveSchedule()
+    if isinstance(schedule, str):
+        raise ValueError(f"Schedule non supportato: {schedule} (ammessi: {', '.join(SCHEDULES)})")
+    return schedule
+
+
+def calibrate_temperature(d, order, pos, rng, neighbors=None, acceptance=0.1, samples=1000):
+    """
+    Temperatura alla quale una mossa 2-opt peggiorante "media" viene
+    accettata con probabilità 'acceptance': T = -mean(delta > 0) / ln(acceptance),
+    con le variazioni campionate sul tour corrente.
+    """
+    n = len(order)
+    total = 0.0
+    count = 0
+    for _ in range(samples):
+        a = order[rng.randrange(n)]
+        c = rng.choice(neighbors[a]) if neighbors is not None else order[rng.randrange(n)]
+        pa, pc = pos[a], pos[c]
+        b = order[(pa + 1) % n]
+        e = order[(pc + 1) % n]
+        if c == a or c == b or e == a:
+            continue
+        delta = d(a, c) + d(b, e) - d(a, b) - d(c, e)
+        if delta > 0:
+            total += delta
+            count += 1
+    if count == 0:
+        return 1.0
+    return -(total / count) / math.log(acceptance)
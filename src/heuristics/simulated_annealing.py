@@ -1,64 +1,253 @@
 import math
 import random
+import time
+
+from src.utils import instrumentation
+from src.utils.distances import distance_lookup
 from src.utils.tour_utils import tour_cost
-from src.heuristics.two_opt import two_opt_swap
+from src.heuristics.two_opt import _open_tour, _closed_tour, _reverse
+from src.heuristics.or_opt import _move_segment
+from src.heuristics.sa_schedules import make_schedule
+
+MOVES = ("2opt", "swap", "oropt")
+
+# Con budget o callback la catena li controlla ogni CHECK_EVERY iterazioni
+CHECK_EVERY = 256
 
 
 def simulated_annealing(distance_matrix, initial_tour,
-                        T0=10000, alpha=0.9993, iterations=50000):
+                        T0=10000, alpha=0.9993, iterations=50000, neighbors=None,
+                        moves=("2opt",), rng=None, stats=None, schedule=None,
+                        budget=None, callback=None):
     """
-    Simulated Annealing per TSP usando mosse 2-opt.
+    Simulated Annealing per TSP usando mosse 2-opt (e opzionalmente swap e
+    Or-opt).
+
+    Ogni mossa viene valutata in O(1) dagli archi rimossi e aggiunti e,
+    se accettata, applicata in place sull'ordine delle città; la migliore
+    soluzione viene copiata solo quando la catena se ne allontana.
 
     Parametri:
     - T0: temperatura iniziale
     - alpha: fattore di raffreddamento (0.99 - 0.999)
     - iterations: numero totale di iterazioni
+    - neighbors: liste dei vicini (src.utils.neighbors); se presenti, ogni
+      mossa collega una città casuale a uno dei suoi vicini
+    - moves: tipi di mossa tra "2opt", "swap" (scambio di due città) e
+      "oropt" (spostamento di un segmento di 1-3 città), scelti a caso
+    - rng: generatore casuale (random.Random); default il modulo random
+    - stats: dizionario opzionale riempito con i contatori della catena
+    - schedule: "geometric" (default, usa T0 e alpha), "adaptive" (T0
+      calibrata, raffreddamento guidato dal tasso di accettazione, reheating
+      e arresto per stagnazione) oppure un oggetto di src.heuristics.sa_schedules
+    - budget: oggetto con expired() (src.heuristics.anytime.Budget); la
+      catena si ferma quando è esaurito
+    - callback: chiamata come callback(order, cost) quando la soluzione
+      migliore è migliorata (controllo ogni CHECK_EVERY iterazioni); 'order'
+      è l'ordine ciclico aperto della catena, da copiare se va conservato
 
     Restituisce:
     - best_tour: migliore soluzione trovata
     - best_cost: costo della migliore soluzione
     """
+    order = _open_tour(initial_tour)
+    n = len(order)
+    if n < 5:
+        return _closed_tour(order, order[0] if order else None), tour_cost(initial_tour, distance_matrix)
 
-    current_tour = initial_tour[:]
-    current_cost = tour_cost(current_tour, distance_matrix)
-
-    best_tour = current_tour[:]
-    best_cost = current_cost
+    pos = [0] * n
+    for idx, city in enumerate(order):
+        pos[city] = idx
 
-    T = T0  # temperatura iniziale
-    n = len(current_tour)
+    d = distance_lookup(distance_matrix)
+    if neighbors is not None and hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
 
-    for step in range(iterations):
+    cost = tour_cost(order, distance_matrix)
+    result = anneal(d, order, pos, cost, T0, alpha, iterations,
+                    rng if rng is not None else random, neighbors, moves,
+                    schedule=make_schedule(schedule, T0, alpha),
+                    budget=budget, callback=callback)
 
-        # scegli random due indici per la mossa 2-opt
-        i = random.randint(1, n - 3)
-        k = random.randint(i + 1, n - 2)
+    if stats is not None:
+        stats.update(result["stats"])
 
-        new_tour = two_opt_swap(current_tour, i, k)
-        new_cost = tour_cost(new_tour, distance_matrix)
+    best_tour = _closed_tour(result["best_order"], initial_tour[0])
+    return best_tour, tour_cost(best_tour, distance_matrix)
 
-        delta = new_cost - current_cost
 
-        # Se migliora, accetta
-        if delta < 0:
-            current_tour = new_tour
-            current_cost = new_cost
-
-            if current_cost < best_cost:
-                best_tour = current_tour[:]
-                best_cost = current_cost
+def anneal(d, order, pos, cost, T, alpha, iterations, rng, neighbors=None,
+           moves=("2opt",), T_min=1e-8, schedule=None, budget=None, callback=None):
+    """
+    Catena di annealing sull'ordine ciclico 'order' (modificato in place,
+    con 'pos' posizione di ogni città) a partire dal costo 'cost' e dalla
+    temperatura T, raffreddata di un fattore alpha per iterazione.
+    Con uno 'schedule' (src.heuristics.sa_schedules) T e alpha iniziali
+    vengono da schedule.start() e ogni schedule.epoch iterazioni
+    schedule.update() li aggiorna o termina la catena. Ogni CHECK_EVERY
+    iterazioni la catena si ferma se 'budget' è esaurito e chiama
+    callback(order, cost) se la soluzione migliore è migliorata.
+
+    Restituisce un dizionario con lo stato finale ("cost", "T"), la migliore
+    soluzione ("best_order", "best_cost") e i contatori ("stats"). Con la
+    strumentazione attiva (src.utils.instrumentation) i contatori e il tempo
+    vengono anche registrati, e a ogni epoca il miglior costo va nella traccia.
+    """
+    for move in moves:
+        if move not in MOVES:
+            raise ValueError(f"Mossa non supportata: {move} (ammesse: {', '.join(MOVES)})")
+
+    n = len(order)
+    random_ = rng.random
+    randrange = rng.randrange
+    choice = rng.choice
+    exp = math.exp
+    n_moves = len(moves)
+
+    if schedule is not None:
+        T, alpha = schedule.start(d, order, pos, rng, neighbors, iterations)
+        epoch = schedule.epoch
+    else:
+        epoch = iterations + 1
+    next_update = epoch
+    accepted_mark = 0
+    check_every = CHECK_EVERY if budget is not None or callback is not None else iterations + 1
+    next_check = check_every
+
+    rec = instrumentation.current()
+    trace = rec.point if rec is not None and rec.trace is not None else None
+    started = time.perf_counter() if rec is not None else None
+
+    best_cost = cost
+    best_order = None      # None: lo stato corrente è il migliore
+    best_step = 0
+    reported_cost = cost
+    accepted = 0
+    improvements = 0
+    steps = 0
+
+    for steps in range(1, iterations + 1):
+        move = moves[0] if n_moves == 1 else moves[randrange(n_moves)]
+
+        if move == "2opt":
+            # rimuove (a, b) e (c, e), aggiunge (a, c) e (b, e)
+            a = order[randrange(n)]
+            c = choice(neighbors[a]) if neighbors is not None else order[randrange(n)]
+            pa = pos[a]
+            pc = pos[c]
+            b = order[pa + 1 if pa + 1 < n else 0]
+            e = order[pc + 1 if pc + 1 < n else 0]
+            if c == a or c == b or e == a:
+                delta = None
+            else:
+                delta = d(a, c) + d(b, e) - d(a, b) - d(c, e)
+
+        elif move == "swap":
+            a = order[randrange(n)]
+            c = choice(neighbors[a]) if neighbors is not None else order[randrange(n)]
+            delta = None if c == a else _swap_delta(d, order, pos, n, a, c)
 
         else:
-            # Accettazione probabilistica
-            prob = math.exp(-delta / T)
-            if random.random() < prob:
-                current_tour = new_tour
-                current_cost = new_cost
+            i = randrange(n)
+            length = randrange(1, 4) if n > 7 else 1
+            first = order[i]
+            last = order[(i + length - 1) % n]
+            p = order[i - 1]
+            nx = order[(i + length) % n]
+            x = choice(neighbors[first]) if neighbors is not None else order[randrange(n)]
+            px = pos[x]
+            y = order[px + 1 if px + 1 < n else 0]
+            if (px - i) % n < length or (pos[y] - i) % n < length:
+                delta = None
+            else:
+                forward = d(x, first) + d(last, y)
+                backward = d(x, last) + d(first, y)
+                reverse = backward < forward
+                delta = ((backward if reverse else forward) - d(x, y)
+                         - d(p, first) - d(last, nx) + d(p, nx))
+
+        if delta is not None and (delta < 0 or random_() < exp(-delta / T)):
+            new_cost = cost + delta
+            if new_cost < best_cost - 1e-12:
+                best_cost = new_cost
+                best_order = None
+                best_step = steps
+                improvements += 1
+            elif best_order is None and new_cost > best_cost:
+                # si lascia la soluzione migliore: la salviamo ora
+                best_order = order[:]
+
+            if move == "2opt":
+                _reverse(order, pos, pos[b], pc, n)
+            elif move == "swap":
+                ia, ic = pos[a], pos[c]
+                order[ia], order[ic] = c, a
+                pos[a], pos[c] = ic, ia
+            else:
+                _move_segment(order, pos, n, i, length, x, y, reverse)
+
+            cost = new_cost
+            accepted += 1
 
-        # Raffreddamento
         T *= alpha
-
-        if T < 1e-8:
+        if steps == next_check:
+            next_check += check_every
+            if callback is not None and best_cost < reported_cost:
+                reported_cost = best_cost
+                callback(order if best_order is None else best_order, best_cost)
+            if budget is not None and budget.expired():
+                break
+        if steps == next_update:
+            if trace is not None:
+                trace("sa", best_cost)
+            update = schedule.update(T, accepted - accepted_mark, steps - best_step)
+            if update is None:
+                break
+            T, alpha = update
+            accepted_mark = accepted
+            next_update += epoch
+        if T < T_min:
             break
 
-    return best_tour, best_cost
+    if best_order is None:
+        best_order = order[:]
+
+    stats = {
+        "iterations": steps,
+        "accepted": accepted,
+        "improvements": improvements,
+        "final_temperature": T,
+    }
+    if schedule is not None:
+        stats.update(schedule.info())
+
+    if rec is not None:
+        rec.add_time("sa.anneal", time.perf_counter() - started)
+        rec.count("sa.iterations", steps)
+        rec.count("sa.accepted", accepted)
+        rec.count("sa.improvements", improvements)
+        rec.count("sa.reheats", stats.get("reheats", 0))
+        rec.point("sa", best_cost)
+
+    return {
+        "cost": cost,
+        "T": T,
+        "best_order": best_order,
+        "best_cost": best_cost,
+        "stats": stats,
+    }
+
+
+def _swap_delta(d, order, pos, n, a, c):
+    """Variazione di costo scambiando le posizioni delle città a e c."""
+    ia, ic = pos[a], pos[c]
+    pa, sa = order[ia - 1], order[(ia + 1) % n]
+    pc, sc = order[ic - 1], order[(ic + 1) % n]
+    if sa == c:
+        # ... pa a c sc ...
+        return d(pa, c) + d(a, sc) - d(pa, a) - d(c, sc)
+    if sc == a:
+        # ... pc c a sa ...
+        return d(pc, a) + d(c, sa) - d(pc, c) - d(a, sa)
+    return (d(pa, c) + d(c, sa) + d(pc, a) + d(a, sc)
+            - d(pa, a) - d(a, sa) - d(pc, c) - d(c, sc))
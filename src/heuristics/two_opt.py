@@ -1,5 +1,22 @@
+import time
+from collections import deque
+
+from src.utils import instrumentation
+from src.utils.distances import distance_lookup
+from src.utils.neighbors import neighbors_from_matrix
 from src.utils.tour_utils import tour_cost
 
+# Fino a questa dimensione le liste dei vicini contengono tutte le città, e
+# la ricerca trova un vero ottimo locale 2-opt; oltre si usano i K più vicini
+FULL_NEIGHBORHOOD_MAX_N = 1000
+DEFAULT_NEIGHBORS = 40
+
+STRATEGIES = ("first", "best")
+
+# Con un budget, run_dont_look_bits lo controlla ogni STOP_CHECK_EVERY città esaminate
+STOP_CHECK_EVERY = 64
+
+
 def two_opt_swap(tour, i, k):
     """
     Applica una mossa 2-opt al tour:
@@ -12,38 +29,271 @@ def two_opt_swap(tour, i, k):
     return new_tour
 
 
-def two_opt(distance_matrix, initial_tour):
+def two_opt(distance_matrix, initial_tour, neighbors=None, budget=None):
     """
     Local search 2-opt:
     - parte da un tour iniziale
-    - esplora tutte le mosse 2-opt
+    - esplora le mosse 2-opt con guadagno calcolato in O(1)
     - accetta la prima mossa che migliora
     - ripete finché non ci sono miglioramenti
 
+    Con le liste dei vicini (src.utils.neighbors) vengono provate solo le
+    mosse che introducono un arco tra una città e uno dei suoi vicini.
+    Con un 'budget' (src.heuristics.anytime.Budget) la ricerca si ferma
+    appena il budget è esaurito, restituendo il tour corrente.
+
     Restituisce:
     - best_tour: tour migliorato
     - best_cost: costo del tour migliorato
     """
-    best_tour = initial_tour[:]
-    best_cost = tour_cost(best_tour, distance_matrix)
-    n = len(best_tour)
+    return two_opt_engine(distance_matrix, initial_tour, neighbors=neighbors, budget=budget)
 
-    improved = True
-    while improved:
-        improved = False
-        # Non tocchiamo il primo e l'ultimo nodo (0 e n-1), per preservare il ciclo
-        for i in range(1, n - 2):
-            for k in range(i + 1, n - 1):
-                new_tour = two_opt_swap(best_tour, i, k)
-                new_cost = tour_cost(new_tour, distance_matrix)
-
-                if new_cost < best_cost - 1e-9:
-                    best_tour = new_tour
-                    best_cost = new_cost
+
+def default_neighbors(distance_matrix):
+    """Liste dei vicini usate quando il chiamante non le fornisce."""
+    n = len(distance_matrix)
+    k = n - 1 if n <= FULL_NEIGHBORHOOD_MAX_N else DEFAULT_NEIGHBORS
+    return neighbors_from_matrix(distance_matrix, k)
+
+
+def two_opt_engine(distance_matrix, initial_tour, neighbors=None, strategy="first",
+                   dont_look_bits=True, active=None, budget=None):
+    """
+    Motore 2-opt con valutazione del guadagno in O(1) (quattro archi),
+    inversione in place del lato più corto del tour e "don't-look bits".
+
+    Parametri:
+    - neighbors: liste dei vicini di ogni città, ordinate per distanza; se
+      None vengono ricavate dalla matrice (default_neighbors)
+    - strategy: "first" applica la prima mossa migliorante trovata per una
+      città, "best" la migliore tra tutte le mosse che partono da essa
+    - dont_look_bits: se True una città viene riesaminata solo quando uno
+      dei suoi archi cambia; altrimenti si ripetono passate complete
+    - active: città da esaminare inizialmente; se indicate, la ricerca resta
+      locale a queste città e a quelle toccate dalle mosse (default: tutte,
+      con passata finale di verifica dell'ottimo locale)
+    - budget: oggetto con expired() (src.heuristics.anytime.Budget); se
+      esaurito la ricerca si ferma prima dell'ottimo locale
+
+    Con la strumentazione attiva (src.utils.instrumentation) vengono
+    registrati città esaminate, mosse applicate, tempo di ricerca e di
+    calcolo del costo e, con la traccia, il costo ogni trace_every mosse.
+
+    Restituisce:
+    - best_tour: tour migliorato (chiuso, stesso nodo di partenza)
+    - best_cost: costo del tour migliorato
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Strategia non supportata: {strategy} (ammesse: {', '.join(STRATEGIES)})")
+
+    order = _open_tour(initial_tour)
+    n = len(order)
+    if n < 4:
+        return _closed_tour(order, order[0] if order else None), tour_cost(initial_tour, distance_matrix)
+
+    if neighbors is None:
+        neighbors = default_neighbors(distance_matrix)
+    if hasattr(neighbors, "tolist"):
+        neighbors = neighbors.tolist()
+
+    d = distance_lookup(distance_matrix)
+    pos = [0] * n
+    for idx, city in enumerate(order):
+        pos[city] = idx
+
+    best_only = strategy == "best"
+
+    def improve(a):
+        return improve_two_opt(a, order, pos, n, d, neighbors, best_only)
+
+    rec = instrumentation.current()
+    if rec is not None:
+        rec.count("two_opt.calls")
+        cost = tour_cost(order, distance_matrix) if rec.trace is not None else None
+        improve, report = _instrumented(improve, rec, d, cost)
+        started = time.perf_counter()
+
+    stop = budget.expired if budget is not None else None
+    if dont_look_bits:
+        run_dont_look_bits(improve, order, n, active, stop)
+    else:
+        improved = True
+        while improved and not (stop is not None and stop()):
+            improved = False
+            for a in range(n):
+                if improve(a) is not None:
                     improved = True
-                    # usciamo dai cicli per ricominciare dalla nuova soluzione
-                    break
-            if improved:
-                break
 
+    start = initial_tour[0]
+    best_tour = _closed_tour(order, start)
+    if rec is None:
+        return best_tour, tour_cost(best_tour, distance_matrix)
+
+    rec.add_time("two_opt.search", time.perf_counter() - started)
+    report()
+    with rec.timer("two_opt.cost"):
+        best_cost = tour_cost(best_tour, distance_matrix)
+    rec.point("two_opt", best_cost)
     return best_tour, best_cost
+
+
+def _instrumented(improve, rec, d, cost=None):
+    """
+    Versione di 'improve' che conta le città esaminate e le mosse applicate;
+    se 'cost' è dato lo aggiorna con il guadagno di ogni mossa (a, b, c, e)
+    e lo aggiunge alla traccia ogni rec.trace_every mosse. Restituisce
+    (improve, report) dove report() scrive i contatori nel registratore.
+    """
+    examined = 0
+    moves = 0
+
+    def counted(a):
+        nonlocal examined, moves, cost
+        examined += 1
+        touched = improve(a)
+        if touched is not None:
+            moves += 1
+            if cost is not None:
+                a_, b, c, e = touched
+                cost -= d(a_, b) + d(c, e) - d(a_, c) - d(b, e)
+                if moves % rec.trace_every == 0:
+                    rec.point("two_opt", cost)
+        return touched
+
+    def report():
+        rec.count("two_opt.examined", examined)
+        rec.count("two_opt.moves", moves)
+
+    return counted, report
+
+
+def improve_two_opt(a, order, pos, n, d, neighbors, best_only=False):
+    """
+    Cerca e applica una mossa 2-opt migliorante che parte dalla città 'a'.
+    Restituisce le città i cui archi sono cambiati, oppure None.
+    """
+    best_gain = 1e-9
+    best_move = None
+
+    pa = pos[a]
+    for succ_side in (True, False):
+        b = order[(pa + 1) % n] if succ_side else order[pa - 1]
+        d_ab = d(a, b)
+        for c in neighbors[a]:
+            g1 = d_ab - d(a, c)
+            if g1 <= best_gain:
+                # lista ordinata: nessun vicino successivo può migliorare
+                break
+            pc = pos[c]
+            e = order[(pc + 1) % n] if succ_side else order[pc - 1]
+            if c == b or e == a:
+                continue
+            gain = g1 + d(c, e) - d(b, e)
+            if gain > best_gain:
+                best_gain = gain
+                best_move = (succ_side, b, c, e)
+                if not best_only:
+                    break
+        if best_move is not None and not best_only:
+            break
+
+    if best_move is None:
+        return None
+
+    succ_side, b, c, e = best_move
+    if succ_side:
+        # ... a b ... c e ...  ->  ... a c ... b e ...
+        _reverse(order, pos, pos[b], pos[c], n)
+    else:
+        # ... b a ... e c ...  ->  ... b e ... a c ...
+        _reverse(order, pos, pos[a], pos[e], n)
+    return (a, b, c, e)
+
+
+def run_dont_look_bits(improve, order, n, active=None, stop=None):
+    """
+    Ciclo di local search con "don't-look bits": 'improve(a)' applica una
+    mossa migliorante a partire dalla città a e restituisce le città toccate
+    (o None). Le città toccate tornano in coda; le altre restano "spente".
+    Senza 'active' si ripete una passata completa finché non certifica
+    l'ottimo locale. Se 'stop()' (controllata ogni STOP_CHECK_EVERY città)
+    restituisce True la ricerca si interrompe lasciando il tour valido.
+    Restituisce True se è stata applicata almeno una mossa.
+    """
+    in_queue = [False] * n
+    initial = order[:] if active is None else list(active)
+    any_improvement = False
+    checks = 0
+    while initial:
+        queue = deque(initial)
+        for city in queue:
+            in_queue[city] = True
+        improved = False
+
+        while queue:
+            if stop is not None:
+                checks += 1
+                if checks == STOP_CHECK_EVERY:
+                    checks = 0
+                    if stop():
+                        return any_improvement or improved
+            a = queue.popleft()
+            in_queue[a] = False
+            touched = improve(a)
+            if touched is None:
+                continue
+            improved = True
+            # le città con archi cambiati tornano "attive"
+            for city in touched:
+                if not in_queue[city]:
+                    in_queue[city] = True
+                    queue.append(city)
+
+        any_improvement = any_improvement or improved
+        # i don't-look bits possono fermarsi prima dell'ottimo locale:
+        # una passata completa senza miglioramenti lo certifica
+        initial = order[:] if improved and active is None else None
+
+    return any_improvement
+
+
+def _open_tour(tour):
+    """Copia del tour senza la ripetizione finale del nodo di partenza."""
+    if len(tour) > 1 and tour[0] == tour[-1]:
+        return list(tour[:-1])
+    return list(tour)
+
+
+def _closed_tour(order, start):
+    """Tour chiuso [start, ..., start] a partire dall'ordine ciclico 'order'."""
+    if not order:
+        return []
+    k = order.index(start)
+    rotated = order[k:] + order[:k]
+    return rotated + [start]
+
+
+def _reverse(order, pos, i, j, n):
+    """
+    Inverte in place il cammino dalle posizioni i a j (ciclico). Se il
+    cammino è più lungo di metà tour inverte il complementare, che produce
+    lo stesso ciclo con metà degli scambi.
+    """
+    length = (j - i) % n + 1
+    if 2 * length > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        length = n - length
+    for _ in range(length // 2):
+        ci = order[i]
+        cj = order[j]
+        order[i] = cj
+        pos[cj] = i
+        order[j] = ci
+        pos[ci] = j
+        i += 1
+        if i == n:
+            i = 0
+        j -= 1
+        if j < 0:
+            j = n - 1
+
@@ -0,0 +1,337 @@
+from collections import deque
+
+import numpy as np
+
+from src.utils.tour_utils import _pair_costs
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import minimum_spanning_tree
+except ImportError:  # scipy è opzionale: senza di esso si usa Prim sulla matrice
+    coo_matrix = minimum_spanning_tree = None
+
+# Coppie (sorgente, candidato) elaborate per blocco in alpha_nearness
+PAIR_BATCH = 1 << 20
+
+
+def held_karp_bound(distance_matrix, iterations=None, neighbors=None, tour=None,
+                    upper_bound=None, pi=None, special=0, stats=None):
+    """
+    Lower bound di Held-Karp per il TSP simmetrico: massimizza con
+    l'ottimizzazione per subgradiente
+
+        L(pi) = costo del 1-albero minimo con pesi d(i, j) + pi[i] + pi[j] - 2 sum(pi)
+
+    Ogni L(pi) è un lower bound del tour ottimo. Il passo è quello di Polyak,
+    lam * (UB - L) / ||g||^2 con g = grado - 2, e lam viene dimezzato quando
+    il bound non migliora per un po' di iterazioni.
+
+    Senza 'neighbors' il 1-albero è calcolato con Prim vettorizzato su tutta
+    la matrice (O(n^2) per iterazione). Con le liste dei vicini si usa il
+    minimum spanning tree di SciPy sul grafo sparso dei vicini (più gli
+    archi di 'tour', che lo rendono connesso): molto più veloce sulle istanze
+    grandi, ma il valore è il bound sul grafo dei candidati, che coincide con
+    quello completo quando i 1-alberi minimi usano solo archi candidati.
+
+    Parametri:
+    - distance_matrix: matrice NxN (lista di liste, ndarray, CondensedDistance
+      o DistanceOracle)
+    - iterations: iterazioni massime (default 300, 100 sul grafo sparso)
+    - neighbors: liste dei vicini (array (n, k)) per il grafo sparso
+    - tour: tour (chiuso o aperto) i cui archi vengono aggiunti al grafo sparso
+    - upper_bound: costo di un tour noto, obiettivo del passo (default 1.05
+      volte il miglior bound corrente)
+    - pi: penalità iniziali (ad esempio da una chiamata precedente)
+    - special: nodo speciale del 1-albero
+    - stats: dizionario opzionale riempito con iterazioni e lam finale
+
+    Restituisce:
+    - bound: miglior lower bound trovato
+    - pi: penalità dei nodi corrispondenti (da passare ad alpha_nearness)
+    """
+    D = _as_metric(distance_matrix)
+    n = len(D)
+    if n < 3:
+        return (0.0 if n < 2 else 2.0 * float(_pair_costs(D, np.array([0]), np.array([1]))[0]),
+                np.zeros(n))
+
+    one_tree = _one_tree_solver(D, neighbors, tour, special)
+    if iterations is None:
+        iterations = 100 if one_tree.sparse else 300
+    pi = np.zeros(n) if pi is None else np.array(pi, dtype=np.float64)
+
+    best, best_pi = -np.inf, pi.copy()
+    lam = 2.0
+    patience = max(10, iterations // 20)
+    since_best = 0
+    done = 0
+    for done in range(1, iterations + 1):
+        a, b, w, s_nb, s_w = one_tree(pi)
+        value = float(w.sum() + s_w.sum() - 2.0 * pi.sum())
+        if value > best + 1e-9 * abs(value):
+            best, best_pi = value, pi.copy()
+            since_best = 0
+        else:
+            since_best += 1
+            if since_best >= patience:
+                lam /= 2.0
+                since_best = 0
+
+        g = np.bincount(np.concatenate([a, b, s_nb]), minlength=n) - 2
+        g[special] += 2
+        norm = float(g @ g)
+        if norm == 0 or lam < 1e-6:
+            break       # il 1-albero è un tour (ottimo) oppure il passo è esaurito
+
+        target = upper_bound if upper_bound is not None else 1.05 * best
+        step = lam * max(target - value, 1e-9 * abs(target)) / norm
+        pi += step * g
+
+    if stats is not None:
+        stats["iterations"] = done
+        stats["lam"] = lam
+    return best, best_pi
+
+
+def minimum_one_tree(distance_matrix, pi=None, neighbors=None, tour=None, special=0):
+    """
+    1-albero minimo con pesi d(i, j) + pi[i] + pi[j]: minimum spanning tree
+    sui nodi diversi da 'special' più i due archi più corti di 'special'.
+
+    Restituisce:
+    - edges: array (n, 2) degli archi del 1-albero
+    - length: costo del 1-albero con le penalità (L(pi) = length - 2 sum(pi))
+    """
+    D = _as_metric(distance_matrix)
+    n = len(D)
+    pi = np.zeros(n) if pi is None else np.asarray(pi, dtype=np.float64)
+    a, b, w, s_nb, s_w = _one_tree_solver(D, neighbors, tour, special)(pi)
+    edges = np.concatenate([np.stack([a, b], axis=1),
+                            np.stack([np.full(len(s_nb), special), s_nb], axis=1)])
+    return edges, float(w.sum() + s_w.sum())
+
+
+def alpha_nearness(distance_matrix, pi=None, k=5, neighbors=None, tour=None, special=0):
+    """
+    Liste dei candidati per alpha-nearness (Helsgaun): alpha(i, j) è
+    l'aumento di costo del 1-albero minimo (con penalità pi) se lo si
+    obbliga a contenere l'arco (i, j), cioè il peso dell'arco meno il peso
+    massimo sul cammino da i a j nell'albero. Con le penalità di
+    held_karp_bound i candidati sono molto migliori dei vicini più prossimi.
+
+    Il massimo sul cammino è calcolato per tutte le coppie insieme con il
+    binary lifting sugli antenati dell'albero.
+
+    Parametri:
+    - pi: penalità dei nodi (default nessuna)
+    - k: candidati per città
+    - neighbors: se indicato, il 1-albero è quello sul grafo sparso e i
+      candidati vengono scelti tra questi vicini; altrimenti tra tutte le città
+    - tour, special: come in held_karp_bound
+
+    Restituisce:
+    - array (n, k) di indici int32, ogni riga ordinata per alpha crescente
+      (a parità di alpha per distanza), utilizzabile come 'neighbors'
+    """
+    D = _as_metric(distance_matrix)
+    n = len(D)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int32)
+    pi = np.zeros(n) if pi is None else np.asarray(pi, dtype=np.float64)
+
+    a, b, w, s_nb, s_w = _one_tree_solver(D, neighbors, tour, special)(pi)
+    lift = _Lifting(a, b, w, n, root=1 if special == 0 else 0)
+    second = float(s_w.max())
+
+    pool = None if neighbors is None else np.asarray(neighbors, dtype=np.int64)
+    width = n if pool is None else pool.shape[1]
+    rows_per_batch = max(1, PAIR_BATCH // max(width, 1))
+
+    result = np.empty((n, k), dtype=np.int32)
+    for start in range(0, n, rows_per_batch):
+        src = np.arange(start, min(start + rows_per_batch, n))
+        if pool is None:
+            dst = np.broadcast_to(np.arange(n), (len(src), n))
+        else:
+            dst = pool[src]
+        i = np.repeat(src, dst.shape[1])
+        j = dst.ravel()
+        weight = _pair_costs(D, i, j) + pi[i] + pi[j]
+
+        alpha = np.empty(len(i))
+        plain = (i != special) & (j != special)
+        alpha[plain] = weight[plain] - lift.path_max(i[plain], j[plain])
+        alpha[~plain] = weight[~plain] - second
+        alpha[i == j] = np.inf
+
+        alpha = alpha.reshape(dst.shape)
+        weight = weight.reshape(dst.shape)
+        order = np.lexsort((weight, alpha), axis=-1)[:, :k]
+        result[src] = np.take_along_axis(dst, order, axis=1)
+    return result
+
+
+class _Lifting:
+    """Albero radicato con binary lifting: peso massimo sul cammino tra due nodi."""
+
+    def __init__(self, a, b, w, n, root):
+        adjacency = [[] for _ in range(n)]
+        for e, (u, v) in enumerate(zip(a.tolist(), b.tolist())):
+            adjacency[u].append((v, e))
+            adjacency[v].append((u, e))
+
+        parent = np.arange(n)
+        parent_w = np.full(n, -np.inf)
+        depth = np.zeros(n, dtype=np.int64)
+        queue = deque([root])
+        seen = np.zeros(n, dtype=bool)
+        seen[root] = True
+        while queue:
+            u = queue.popleft()
+            for v, e in adjacency[u]:
+                if not seen[v]:
+                    seen[v] = True
+                    parent[v] = u
+                    parent_w[v] = w[e]
+                    depth[v] = depth[u] + 1
+                    queue.append(v)
+
+        levels = max(1, int(depth.max()).bit_length())
+        self.depth = depth
+        self.up = [parent]
+        self.top = [parent_w]
+        for _ in range(1, levels):
+            up, top = self.up[-1], self.top[-1]
+            self.up.append(up[up])
+            self.top.append(np.maximum(top, top[up]))
+
+    def path_max(self, a, b):
+        a = np.array(a, dtype=np.int64)
+        b = np.array(b, dtype=np.int64)
+        swap = self.depth[a] < self.depth[b]
+        a[swap], b[swap] = b[swap], a[swap]
+        best = np.full(len(a), -np.inf)
+
+        # risale da a fino alla profondità di b
+        diff = self.depth[a] - self.depth[b]
+        for level, (up, top) in enumerate(zip(self.up, self.top)):
+            sel = (diff >> level) & 1 == 1
+            best[sel] = np.maximum(best[sel], top[a[sel]])
+            a[sel] = up[a[sel]]
+
+        # risale insieme finché gli antenati coincidono
+        for up, top in zip(reversed(self.up), reversed(self.top)):
+            sel = up[a] != up[b]
+            best[sel] = np.maximum(best[sel], np.maximum(top[a[sel]], top[b[sel]]))
+            a[sel] = up[a[sel]]
+            b[sel] = up[b[sel]]
+        sel = a != b
+        best[sel] = np.maximum(best[sel], np.maximum(self.top[0][a[sel]], self.top[0][b[sel]]))
+        return best
+
+
+def _one_tree_solver(D, neighbors, tour, special):
+    """
+    Oggetto chiamabile pi -> 1-albero minimo (a, b, w, special_nb, special_w):
+    archi dell'albero sui nodi diversi da special con i pesi penalizzati, i
+    due vicini di special e i pesi dei loro archi.
+    """
+    if neighbors is None or minimum_spanning_tree is None:
+        return _DensePrim(D, special)
+    return _SparseTree(D, neighbors, tour, special)
+
+
+class _DensePrim:
+    """Prim vettorizzato sulle righe della matrice (O(n^2) per 1-albero)."""
+
+    sparse = False
+
+    def __init__(self, D, special):
+        self.D = D
+        self.n = len(D)
+        self.special = special
+        if isinstance(D, np.ndarray):
+            self.row = lambda v: D[v]
+        else:
+            self.row = lambda v: np.asarray(D.row(v), dtype=np.float64)
+
+    def __call__(self, pi):
+        n, s = self.n, self.special
+        row = self.row
+        root = 1 if s == 0 else 0
+        in_tree = np.zeros(n, dtype=bool)
+        in_tree[s] = in_tree[root] = True
+        key = row(root) + pi[root] + pi
+        key[in_tree] = np.inf
+        parent = np.full(n, root)
+        for _ in range(n - 2):
+            v = int(key.argmin())
+            in_tree[v] = True
+            key[v] = np.inf
+            w = row(v) + pi[v] + pi
+            better = w < key
+            better[in_tree] = False
+            key[better] = w[better]
+            parent[better] = v
+        a = np.flatnonzero(~np.isin(np.arange(n), (s, root)))
+        b = parent[a]
+        w = _pair_costs(self.D, a, b) + pi[a] + pi[b]
+
+        ws = row(s) + pi[s] + pi
+        ws[s] = np.inf
+        s_nb = np.argpartition(ws, 1)[:2]
+        return a, b, w, s_nb, ws[s_nb]
+
+
+class _SparseTree:
+    """Minimum spanning tree di SciPy sul grafo dei vicini (più gli archi del tour)."""
+
+    sparse = True
+
+    def __init__(self, D, neighbors, tour, special):
+        n = len(D)
+        nb = np.asarray(neighbors, dtype=np.int64)
+        i = np.repeat(np.arange(n, dtype=np.int64), nb.shape[1])
+        j = nb.ravel()
+        if tour is not None:
+            t = np.asarray(tour, dtype=np.int64)
+            if len(t) > 1 and t[0] == t[-1]:
+                t = t[:-1]
+            i = np.concatenate([i, t])
+            j = np.concatenate([j, np.roll(t, -1)])
+        lo, hi = np.minimum(i, j), np.maximum(i, j)
+        keys = np.unique(lo[lo != hi] * n + hi[lo != hi])
+        i, j = keys // n, keys % n
+
+        touches = (i == special) | (j == special)
+        self.n = n
+        self.i, self.j = i[~touches], j[~touches]
+        self.d = _pair_costs(D, self.i, self.j)
+        self.s_nb = np.where(i[touches] == special, j[touches], i[touches])
+        self.s_d = _pair_costs(D, np.full(len(self.s_nb), special), self.s_nb)
+        self.special = special
+        if len(self.s_nb) < 2:
+            raise ValueError("Il nodo speciale ha meno di due archi candidati")
+
+    def __call__(self, pi):
+        n = self.n
+        w = self.d + pi[self.i] + pi[self.j]
+        # minimum_spanning_tree ignora i pesi nulli: si trasla tutto sui positivi
+        shift = 1.0 - float(w.min())
+        tree = minimum_spanning_tree(coo_matrix((w + shift, (self.i, self.j)), shape=(n, n))).tocoo()
+        if tree.nnz != n - 2:
+            raise ValueError("Il grafo dei vicini non è connesso: passare anche 'tour'")
+        a = tree.row.astype(np.int64)
+        b = tree.col.astype(np.int64)
+
+        ws = self.s_d + pi[self.special] + pi[self.s_nb]
+        two = np.argpartition(ws, 1)[:2]
+        return a, b, tree.data - shift, self.s_nb[two], ws[two]
+
+
+def _as_metric(distance_matrix):
+    """ndarray, CondensedDistance o DistanceOracle; le liste di liste diventano ndarray."""
+    if isinstance(distance_matrix, np.ndarray) or hasattr(distance_matrix, "pairs"):
+        return distance_matrix
+    return np.asarray(distance_matrix, dtype=np.float64)
@@ -0,0 +1,29 @@
+try:
+    from gurobipy import GRB
+except ImportError:  # serve solo quando un solver Gurobi è in esecuzione
+    GRB = None
+
+
+def presolve_callback(inner=None):
+    """
+    Callback che annota in model._presolve_time il tempo dell'ultimo
+    callback di presolve (cioè la sua fine), poi chiama 'inner'.
+    """
+    def callback(model, where):
+        if where == GRB.Callback.PRESOLVE:
+            model._presolve_time = model.cbGet(GRB.Callback.RUNTIME)
+        if inner is not None:
+            inner(model, where)
+    return callback
+
+
+def report_solver(rec, prefix, m, build_time, runtime):
+    """Tempi (costruzione, presolve, soluzione) e dimensioni del modello nel registratore."""
+    presolve = getattr(m, "_presolve_time", 0.0)
+    rec.add_time(f"{prefix}.build", build_time)
+    rec.add_time(f"{prefix}.presolve", presolve)
+    rec.add_time(f"{prefix}.solve", max(runtime - presolve, 0.0))
+    rec.count(f"{prefix}.variables", m.NumVars)
+    rec.count(f"{prefix}.constraints", m.NumConstrs)
+    if m.IsMIP:
+        rec.count(f"{prefix}.nodes", int(m.NodeCount))
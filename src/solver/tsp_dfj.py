@@ -0,0 +1,203 @@
+import time
+
+from src.solver.reporting import presolve_callback, report_solver
+from src.utils import instrumentation
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:  # come in tsp_mtz: l'errore arriva solo chiamando il solver
+    gp = GRB = None
+
+
+def solve_tsp_dfj(distance_matrix, time_limit=None, verbose=False, initial_tour=None,
+                  timings=None):
+    """
+    Risolve il TSP simmetrico con la formulazione DFJ (Dantzig-Fulkerson-Johnson)
+    usando Gurobi, con i vincoli di eliminazione dei sottocicli aggiunti solo
+    quando servono.
+
+    Il modello ha una variabile binaria x[i, j] per ogni arco non orientato
+    (i < j, n(n-1)/2 variabili) e il vincolo di grado 2 per ogni nodo. Ogni
+    volta che Gurobi trova una soluzione intera che contiene sottocicli, la
+    callback aggiunge per ogni sottociclo S il vincolo lazy
+    sum(x[i, j] : i, j in S) <= |S| - 1; sulle soluzioni frazionarie dei nodi
+    aggiunge lo stesso taglio per le componenti sconnesse del supporto.
+
+    Parametri:
+    - distance_matrix: matrice NxN delle distanze (lista di liste o ndarray)
+    - time_limit: limite di tempo in secondi (opzionale)
+    - verbose: se True mostra l'output di Gurobi
+    - initial_tour: tour (chiuso o aperto) usato come soluzione iniziale
+      (MIP start), ad esempio il risultato di una euristica
+    - timings: dizionario opzionale riempito con i tempi (secondi) di
+      costruzione ("build") e di ottimizzazione ("optimize")
+
+    Con la strumentazione attiva (src.utils.instrumentation) vengono
+    registrati anche presolve, nodi e numero di tagli di sottociclo.
+
+    Restituisce:
+    - tour: lista di nodi [0, i2, i3, ..., 0]
+    - cost: costo totale del tour
+    - runtime: tempo di esecuzione in secondi
+    - status: codice di stato di Gurobi (GRB.Status.OPTIMAL, GRB.Status.TIME_LIMIT, ecc.)
+    """
+    if gp is None:
+        raise ImportError("solve_tsp_dfj richiede gurobipy")
+    n = len(distance_matrix)
+    if n == 0:
+        return [], 0.0, 0.0, None
+    if n < 3:
+        tour = list(range(n)) + [0]
+        cost = sum(float(distance_matrix[tour[k]][tour[k + 1]]) for k in range(n))
+        return tour, cost, 0.0, GRB.OPTIMAL
+
+    build_start = time.time()
+
+    # Modello
+    m = gp.Model("tsp_dfj")
+
+    # Output Gurobi
+    if not verbose:
+        m.Params.OutputFlag = 0
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    m.Params.LazyConstraints = 1
+    m.Params.PreCrush = 1
+
+    # Variabili x[i,j], i < j: 1 se l'arco {i, j} è nel tour
+    # (float() perché gli scalari NumPy non si combinano bene con le variabili Gurobi)
+    edges = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    x = m.addVars(edges, vtype=GRB.BINARY, obj={(i, j): float(distance_matrix[i][j]) for i, j in edges},
+                  name="x")
+    m.ModelSense = GRB.MINIMIZE
+
+    # Vincoli di grado: ogni nodo ha esattamente due archi incidenti
+    for i in range(n):
+        m.addConstr(
+            gp.quicksum(x[min(i, j), max(i, j)] for j in range(n) if j != i) == 2,
+            name=f"deg_{i}"
+        )
+
+    # Soluzione iniziale dalle euristiche
+    if initial_tour is not None:
+        tour_edges = _tour_edges(initial_tour)
+        for e in edges:
+            x[e].Start = 1.0 if e in tour_edges else 0.0
+
+    m._x = x
+    m._n = n
+    m._cuts = 0
+    m.update()
+    build_time = time.time() - build_start
+
+    # Risoluzione
+    rec = instrumentation.current()
+    start_time = time.time()
+    if rec is not None:
+        m.optimize(presolve_callback(_subtour_callback))
+    else:
+        m.optimize(_subtour_callback)
+    runtime = time.time() - start_time
+
+    if timings is not None:
+        timings["build"] = build_time
+        timings["optimize"] = runtime
+    if rec is not None:
+        report_solver(rec, "dfj", m, build_time, runtime)
+        rec.count("dfj.subtour_cuts", m._cuts)
+
+    status = m.Status
+
+    if m.SolCount == 0 or status not in [GRB.OPTIMAL, GRB.TIME_LIMIT]:
+        # Nessuna soluzione valida
+        return None, None, runtime, status
+
+    values = m.getAttr("X", x)
+    selected = [e for e in edges if values[e] > 0.5]
+    tour = _follow_cycle(selected, n)
+    cost = m.ObjVal
+
+    return tour, cost, runtime, status
+
+
+def _subtour_callback(model, where):
+    """Aggiunge i vincoli di eliminazione dei sottocicli (lazy e come tagli)."""
+    if where == GRB.Callback.MIPSOL:
+        values = model.cbGetSolution(model._x)
+        selected = [e for e, v in values.items() if v > 0.5]
+        components = _components(selected, model._n)
+        if len(components) > 1:
+            for component in components:
+                model.cbLazy(_subtour_lhs(model._x, component) <= len(component) - 1)
+                model._cuts += 1
+
+    elif where == GRB.Callback.MIPNODE:
+        if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+            return
+        values = model.cbGetNodeRel(model._x)
+        support = [e for e, v in values.items() if v > 1e-6]
+        components = _components(support, model._n)
+        if len(components) > 1:
+            for component in components:
+                model.cbCut(_subtour_lhs(model._x, component) <= len(component) - 1)
+                model._cuts += 1
+
+
+def _subtour_lhs(x, component):
+    nodes = sorted(component)
+    return gp.quicksum(x[nodes[a], nodes[b]]
+                       for a in range(len(nodes)) for b in range(a + 1, len(nodes)))
+
+
+def _components(edges, n):
+    """Componenti connesse (liste di nodi) del grafo con gli archi dati."""
+    adjacency = [[] for _ in range(n)]
+    for i, j in edges:
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+
+    seen = [False] * n
+    components = []
+    for start in range(n):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack = [start]
+        component = []
+        while stack:
+            v = stack.pop()
+            component.append(v)
+            for u in adjacency[v]:
+                if not seen[u]:
+                    seen[u] = True
+                    stack.append(u)
+        components.append(component)
+    return components
+
+
+def _tour_edges(tour):
+    """Insieme degli archi (i, j), i < j, di un tour chiuso o aperto."""
+    order = list(tour)
+    if len(order) > 1 and order[0] == order[-1]:
+        order.pop()
+    return {(min(a, b), max(a, b)) for a, b in zip(order, order[1:] + order[:1])}
+
+
+def _follow_cycle(edges, n):
+    """Tour [0, ..., 0] a partire dagli archi non orientati di un ciclo hamiltoniano."""
+    adjacency = [[] for _ in range(n)]
+    for i, j in edges:
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+
+    tour = [0]
+    prev, current = None, 0
+    while True:
+        a, b = adjacency[current]
+        nxt = a if a != prev else b
+        tour.append(nxt)
+        if nxt == 0:
+            break
+        prev, current = current, nxt
+    return tour
@@ -1,27 +1,74 @@
 import time
-import gurobipy as gp
-from gurobipy import GRB
 
+import numpy as np
 
-def solve_tsp_mtz(distance_matrix, time_limit=None, verbose=False):
+from src.solver.reporting import presolve_callback, report_solver
+from src.utils import instrumentation
+from src.utils.neighbors import neighbors_from_matrix
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # scipy è opzionale: senza di esso si costruisce con i cicli
+    sp = None
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:  # senza Gurobi restano usabili le funzioni sugli archi
+    gp = GRB = None
+
+# Modi di costruzione del modello
+BUILDS = ("matrix", "loop")
+
+
+def solve_tsp_mtz(distance_matrix, time_limit=None, verbose=False, build="matrix", k=None,
+                  initial_tour=None, timings=None):
     """
     Risolve il TSP simmetrico con formulazione MTZ usando Gurobi.
 
+    Il modello ha una variabile binaria per ogni arco orientato i -> j con
+    i != j (niente variabili sulla diagonale). Con build="matrix" i vincoli
+    vengono aggiunti in blocco con l'API matriciale (addMVar / addMConstr e
+    matrici sparse SciPy); build="loop" li aggiunge uno alla volta.
+
+    Con 'k' gli archi sono limitati al grafo dei k vicini più prossimi (in
+    entrambi i versi) più gli archi di 'initial_tour': il modello diventa
+    molto più piccolo, ma l'ottimo è quello sul grafo ridotto.
+
     Parametri:
-    - distance_matrix: matrice NxN delle distanze (lista di liste)
+    - distance_matrix: matrice NxN delle distanze (lista di liste o ndarray)
     - time_limit: limite di tempo in secondi (opzionale)
     - verbose: se True mostra l'output di Gurobi
+    - build: "matrix" (API matriciale, richiede scipy) oppure "loop"
+    - k: vicini per città del grafo degli archi (default: tutti gli archi)
+    - initial_tour: tour (chiuso o aperto) usato come soluzione iniziale
+      (MIP start); con 'k' i suoi archi restano sempre nel modello
+    - timings: dizionario opzionale riempito con i tempi (secondi) di
+      costruzione ("build") e di ottimizzazione ("optimize")
+
+    Con la strumentazione attiva (src.utils.instrumentation) il tempo di
+    ottimizzazione viene diviso in presolve e soluzione, e vengono
+    registrati nodi esplorati, variabili e vincoli.
 
     Restituisce:
     - tour: lista di nodi [0, i2, i3, ..., 0]
     - cost: costo totale del tour
-    - runtime: tempo di esecuzione in secondi
+    - runtime: tempo di ottimizzazione in secondi (esclusa la costruzione)
     - status: codice di stato di Gurobi (GRB.Status.OPTIMAL, GRB.Status.TIME_LIMIT, ecc.)
     """
+    if build not in BUILDS:
+        raise ValueError(f"Costruzione non supportata: {build} (ammesse: {', '.join(BUILDS)})")
+    if gp is None:
+        raise ImportError("solve_tsp_mtz richiede gurobipy")
+    if build == "matrix" and sp is None:
+        build = "loop"
+
     n = len(distance_matrix)
     if n == 0:
         return [], 0.0, 0.0, None
 
+    build_start = time.time()
+
     # Modello
     m = gp.Model("tsp_mtz")
 
@@ -31,66 +78,61 @@ def solve_tsp_mtz(distance_matrix, time_limit=None, verbose=False):
     if time_limit is not None:
         m.Params.TimeLimit = time_limit
 
-    # Variabili x[i,j] binarie: 1 se si va da i a j
-    x = m.addVars(n, n, vtype=GRB.BINARY, name="x")
+    tail, head = _arcs(distance_matrix, k, initial_tour)
+    arc_cost = _arc_costs(distance_matrix, tail, head)
 
-    # Variabili u[i] per vincoli MTZ (ordini di visita)
-    # u[0] può essere fissata implicitamente a 0 dai vincoli, usiamo [0, n-1]
-    u = m.addVars(n, vtype=GRB.CONTINUOUS, lb=0.0, ub=n - 1, name="u")
+    if build == "matrix":
+        x = _build_matrix(m, n, tail, head, arc_cost)
+    else:
+        x = _build_loop(m, n, tail, head, arc_cost)
 
-    # Niente auto-anelli
-    for i in range(n):
-        m.addConstr(x[i, i] == 0, name=f"no_loop_{i}")
+    # Soluzione iniziale dalle euristiche
+    if initial_tour is not None:
+        start = _start_values(tail, head, n, initial_tour)
+        if build == "matrix":
+            x.Start = start
+        else:
+            for a in range(len(tail)):
+                x[a].Start = float(start[a])
 
-    # Vincoli di grado: 1 arco uscente e 1 entrante per ogni nodo
-    for i in range(n):
-        m.addConstr(gp.quicksum(x[i, j] for j in range(n)) == 1, name=f"out_{i}")
-        m.addConstr(gp.quicksum(x[j, i] for j in range(n)) == 1, name=f"in_{i}")
-
-    # Vincoli MTZ per evitare sottocicli
-    # solo per nodi 1..n-1 (0 è il deposito di riferimento)
-    for i in range(1, n):
-        for j in range(1, n):
-            if i != j:
-                m.addConstr(
-                    u[i] - u[j] + n * x[i, j] <= n - 1,
-                    name=f"mtz_{i}_{j}"
-                )
-
-    # Funzione obiettivo: minimizzare costo totale del tour
-    m.setObjective(
-        gp.quicksum(
-            distance_matrix[i][j] * x[i, j]
-            for i in range(n)
-            for j in range(n)
-        ),
-        GRB.MINIMIZE
-    )
+    m.update()
+    build_time = time.time() - build_start
 
     # Risoluzione
+    rec = instrumentation.current()
     start_time = time.time()
-    m.optimize()
+    if rec is not None:
+        m.optimize(presolve_callback())
+    else:
+        m.optimize()
     runtime = time.time() - start_time
 
+    if timings is not None:
+        timings["build"] = build_time
+        timings["optimize"] = runtime
+    if rec is not None:
+        report_solver(rec, "mtz", m, build_time, runtime)
+
     status = m.Status
 
-    if status not in [GRB.OPTIMAL, GRB.TIME_LIMIT]:
+    if m.SolCount == 0 or status not in [GRB.OPTIMAL, GRB.TIME_LIMIT]:
         # Nessuna soluzione valida
         return None, None, runtime, status
 
     # Ricostruzione del tour dalla soluzione di x
-    successor = {}
-    for i in range(n):
-        for j in range(n):
-            if x[i, j].X > 0.5:
-                successor[i] = j
-                break
+    if build == "matrix":
+        values = x.X
+    else:
+        values = np.array([x[a].X for a in range(len(tail))])
+    chosen = values > 0.5
+    successor = np.empty(n, dtype=np.int64)
+    successor[tail[chosen]] = head[chosen]
 
     # Seguiamo il tour partendo da 0
     tour = [0]
     current = 0
     while True:
-        nxt = successor[current]
+        nxt = int(successor[current])
         tour.append(nxt)
         current = nxt
         if current == 0:
@@ -99,3 +141,123 @@ def solve_tsp_mtz(distance_matrix, time_limit=None, verbose=False):
     cost = m.ObjVal
 
     return tour, cost, runtime, status
+
+
+def _build_matrix(m, n, tail, head, arc_cost):
+    """
+    Variabili e vincoli con l'API matriciale. Un solo vettore di variabili
+    [x (archi), u (ordini di visita)] e due blocchi di vincoli sparsi.
+    """
+    n_arcs = len(tail)
+    arcs = np.arange(n_arcs)
+
+    # x binarie sugli archi, u continue in [0, n-1] per i vincoli MTZ
+    vtype = np.array([GRB.BINARY] * n_arcs + [GRB.CONTINUOUS] * n)
+    ub = np.concatenate([np.ones(n_arcs), np.full(n, n - 1.0)])
+    obj = np.concatenate([arc_cost, np.zeros(n)])
+    v = m.addMVar(n_arcs + n, lb=0.0, ub=ub, obj=obj, vtype=vtype, name="v")
+    m.ModelSense = GRB.MINIMIZE
+
+    # Vincoli di grado: riga i = archi uscenti da i, riga n+i = archi entranti in i
+    degree = sp.csr_matrix((np.ones(2 * n_arcs),
+                            (np.concatenate([tail, n + head]), np.concatenate([arcs, arcs]))),
+                           shape=(2 * n, n_arcs + n))
+    m.addMConstr(degree, v, "=", np.ones(2 * n), name="degree")
+
+    # Vincoli MTZ u[i] - u[j] + n x[i,j] <= n-1 sugli archi tra nodi 1..n-1
+    mtz = np.flatnonzero((tail != 0) & (head != 0))
+    rows = np.arange(len(mtz))
+    A = sp.csr_matrix((np.concatenate([np.ones(len(mtz)), -np.ones(len(mtz)), np.full(len(mtz), float(n))]),
+                       (np.concatenate([rows, rows, rows]),
+                        np.concatenate([n_arcs + tail[mtz], n_arcs + head[mtz], mtz]))),
+                      shape=(len(mtz), n_arcs + n))
+    m.addMConstr(A, v, "<", np.full(len(mtz), n - 1.0), name="mtz")
+
+    return v[:n_arcs]
+
+
+def _build_loop(m, n, tail, head, arc_cost):
+    """Variabili e vincoli aggiunti uno alla volta (costruzione originale)."""
+    n_arcs = len(tail)
+    arcs = range(n_arcs)
+
+    # Variabili x[a] binarie: 1 se si percorre l'arco a = (tail[a], head[a])
+    # (float() perché gli scalari NumPy non si combinano bene con le variabili Gurobi)
+    x = m.addVars(n_arcs, vtype=GRB.BINARY, obj=[float(c) for c in arc_cost], name="x")
+    m.ModelSense = GRB.MINIMIZE
+
+    # Variabili u[i] per vincoli MTZ (ordini di visita)
+    u = m.addVars(n, vtype=GRB.CONTINUOUS, lb=0.0, ub=n - 1, name="u")
+
+    # Vincoli di grado: 1 arco uscente e 1 entrante per ogni nodo
+    out_arcs = [[] for _ in range(n)]
+    in_arcs = [[] for _ in range(n)]
+    for a in arcs:
+        out_arcs[tail[a]].append(a)
+        in_arcs[head[a]].append(a)
+    for i in range(n):
+        m.addConstr(gp.quicksum(x[a] for a in out_arcs[i]) == 1, name=f"out_{i}")
+        m.addConstr(gp.quicksum(x[a] for a in in_arcs[i]) == 1, name=f"in_{i}")
+
+    # Vincoli MTZ per evitare sottocicli
+    # solo per nodi 1..n-1 (0 è il deposito di riferimento)
+    for a in arcs:
+        i, j = int(tail[a]), int(head[a])
+        if i != 0 and j != 0:
+            m.addConstr(u[i] - u[j] + n * x[a] <= n - 1, name=f"mtz_{i}_{j}")
+
+    return x
+
+
+def _arcs(distance_matrix, k, initial_tour):
+    """
+    Archi del modello come array (tail, head): tutti gli archi i != j oppure,
+    con k, quelli del grafo dei k vicini (in entrambi i versi) più gli archi
+    del tour iniziale.
+    """
+    n = len(distance_matrix)
+    if k is None or k >= n - 1:
+        tail, head = np.nonzero(~np.eye(n, dtype=bool))
+        return tail.astype(np.int64), head.astype(np.int64)
+
+    nb = neighbors_from_matrix(distance_matrix, k).astype(np.int64)
+    src = np.repeat(np.arange(n, dtype=np.int64), nb.shape[1])
+    dst = nb.ravel()
+    keys = [src * n + dst, dst * n + src]
+    if initial_tour is not None:
+        keys.append(_tour_arc_keys(initial_tour, n))
+    keys = np.unique(np.concatenate(keys))
+    return keys // n, keys % n
+
+
+def _tour_arc_keys(tour, n, both=True):
+    """
+    Chiavi i*n + j degli archi del tour: in entrambi i versi (per il grafo
+    degli archi) oppure, con both=False, solo nel verso di percorrenza.
+    """
+    order = np.asarray(tour, dtype=np.int64)
+    if len(order) > 1 and order[0] == order[-1]:
+        order = order[:-1]
+    nxt = np.roll(order, -1)
+    if not both:
+        return order * n + nxt
+    return np.concatenate([order * n + nxt, nxt * n + order])
+
+
+def _start_values(tail, head, n, tour):
+    """
+    Valori 0/1 del MIP start sugli archi (tail, head): solo gli archi del
+    tour nel verso di percorrenza, così ogni nodo ha un arco uscente e uno
+    entrante come richiesto dai vincoli di grado.
+    """
+    start = np.zeros(len(tail))
+    start[np.isin(tail * n + head, _tour_arc_keys(tour, n, both=False))] = 1.0
+    return start
+
+
+def _arc_costs(distance_matrix, tail, head):
+    if isinstance(distance_matrix, np.ndarray):
+        return distance_matrix[tail, head].astype(np.float64)
+    if hasattr(distance_matrix, "pairs"):
+        return np.asarray(distance_matrix.pairs(tail, head), dtype=np.float64)
+    return np.asarray(distance_matrix, dtype=np.float64)[tail, head]
@@ -0,0 +1,433 @@
+import math
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# Metriche TSPLIB supportate. None indica la distanza euclidea esatta (non
+# arrotondata), cioè il comportamento storico di distance_matrix.
+SUPPORTED_WEIGHT_TYPES = (None, "EUC_2D", "CEIL_2D", "ATT", "GEO")
+
+# Raggio terrestre e valore di pi greco fissati dalla specifica TSPLIB per GEO
+GEO_RRR = 6378.388
+GEO_PI = 3.141592
+
+INTEGER_DTYPES = (np.int32, np.int64)
+
+
+def _check_weight_type(weight_type):
+    if weight_type not in SUPPORTED_WEIGHT_TYPES:
+        raise ValueError(f"EDGE_WEIGHT_TYPE non supportato: {weight_type}")
+
+
+def _nint(values):
+    """Arrotondamento all'intero più vicino come definito da TSPLIB: (int)(x + 0.5)."""
+    return np.floor(values + 0.5)
+
+
+def prepare_coords(coords, weight_type=None):
+    """
+    Converte le coordinate in un array float64 (n, 2) pronto per il calcolo
+    delle distanze.
+    Per GEO le coordinate (formato DDD.MM) vengono convertite una sola volta in
+    latitudine/longitudine in radianti, così i blocchi successivi non devono
+    ripetere la conversione.
+    """
+    _check_weight_type(weight_type)
+    xy = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+
+    if weight_type == "GEO":
+        deg = np.trunc(xy)
+        minutes = xy - deg
+        xy = GEO_PI * (deg + 5.0 * minutes / 3.0) / 180.0
+
+    return xy
+
+
+def _metric(ax, ay, bx, by, weight_type):
+    """Metrica TSPLIB elemento per elemento (con broadcasting NumPy)."""
+    if weight_type == "GEO":
+        q1 = np.cos(ay - by)
+        q2 = np.cos(ax - bx)
+        q3 = np.cos(ax + bx)
+        arg = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        return np.trunc(GEO_RRR * np.arccos(arg) + 1.0)
+
+    dx = ax - bx
+    dy = ay - by
+    sq = dx * dx + dy * dy
+
+    if weight_type == "ATT":
+        r = np.sqrt(sq / 10.0)
+        t = _nint(r)
+        return np.where(t < r, t + 1.0, t)
+
+    d = np.sqrt(sq)
+    if weight_type == "EUC_2D":
+        return _nint(d)
+    if weight_type == "CEIL_2D":
+        return np.ceil(d)
+    return d
+
+
+def metric_block(a, b, weight_type=None):
+    """
+    Calcola le distanze tra tutti i punti di 'a' (m, 2) e tutti quelli di 'b'
+    (k, 2), già preparati con prepare_coords.
+    Restituisce un array float64 (m, k) con i valori della metrica TSPLIB.
+    """
+    return _metric(a[:, 0:1], a[:, 1:2], b[:, 0], b[:, 1], weight_type)
+
+
+def metric_pairs(a, b, weight_type=None):
+    """
+    Distanze tra le coppie corrispondenti a[..., :] e b[..., :] (stessa forma,
+    ultima dimensione 2), già preparate con prepare_coords.
+    """
+    return _metric(a[..., 0], a[..., 1], b[..., 0], b[..., 1], weight_type)
+
+
+def build_distance_matrix(coords, weight_type=None, dtype=np.float64, block_size=1024):
+    """
+    Crea la matrice NxN delle distanze come ndarray NumPy, calcolata a blocchi
+    di 'block_size' righe per limitare la memoria temporanea.
+
+    Parametri:
+    - coords: coordinate (lista di tuple o array (n, 2))
+    - weight_type: EDGE_WEIGHT_TYPE TSPLIB (None, "EUC_2D", "CEIL_2D", "ATT", "GEO");
+      None = distanza euclidea esatta
+    - dtype: tipo degli elementi (float64, float32 o int32)
+    - block_size: numero di righe calcolate per blocco
+
+    Restituisce:
+    - matrice (n, n) di tipo 'dtype' con diagonale nulla
+    """
+    dtype = np.dtype(dtype)
+    if dtype.type in INTEGER_DTYPES and weight_type is None:
+        raise ValueError("La distanza euclidea esatta non è intera: "
+                         "usare un dtype float o una metrica TSPLIB intera")
+
+    xy = prepare_coords(coords, weight_type)
+    n = len(xy)
+    dist = np.empty((n, n), dtype=dtype)
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        dist[start:stop] = metric_block(xy[start:stop], xy, weight_type)
+
+    # GEO e ATT non danno 0 sulla diagonale: la azzeriamo esplicitamente
+    np.fill_diagonal(dist, 0)
+
+    return dist
+
+
+def distance_lookup(distance_matrix):
+    """
+    Restituisce una funzione d(i, j) per leggere velocemente le distanze,
+    qualunque sia la rappresentazione della matrice.
+    Su un ndarray usa .item(), che restituisce scalari Python ed evita la
+    creazione della vista di riga fatta da distance_matrix[i][j].
+    """
+    item = getattr(distance_matrix, "item", None)
+    if item is not None:
+        return item
+    return lambda i, j: distance_matrix[i][j]
+
+
+class CondensedDistance:
+    """
+    Matrice delle distanze simmetrica in forma compatta: memorizza solo il
+    triangolo superiore (i < j) in un array piatto tipizzato, cioè
+    n(n-1)/2 elementi invece di n^2 oggetti float Python.
+
+    Supporta l'accesso d[i][j], d[i, j], d.item(i, j) (scalare Python) e le
+    letture vettorizzate d.take(i, js) e d.pairs(ii, jj).
+    """
+
+    __slots__ = ("n", "data", "_offsets", "_offsets_arr", "_zero")
+
+    def __init__(self, data, n):
+        self.n = n
+        self.data = data
+        # posizione di (i, j), i < j, nell'array piatto: offset[i] + j
+        idx = np.arange(n, dtype=np.int64)
+        self._offsets_arr = idx * (2 * n - idx - 1) // 2 - idx - 1
+        self._offsets = self._offsets_arr.tolist()
+        self._zero = data.dtype.type(0).item()
+
+    @classmethod
+    def from_coords(cls, coords, weight_type=None, dtype=np.float32, block_size=1024):
+        """Costruisce la forma compatta direttamente dalle coordinate, a blocchi di righe."""
+        dtype = np.dtype(dtype)
+        if dtype.type in INTEGER_DTYPES and weight_type is None:
+            raise ValueError("La distanza euclidea esatta non è intera: "
+                             "usare un dtype float o una metrica TSPLIB intera")
+
+        xy = prepare_coords(coords, weight_type)
+        n = len(xy)
+        data = np.empty(n * (n - 1) // 2, dtype=dtype)
+
+        pos = 0
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            block = metric_block(xy[start:stop], xy[start:], weight_type)
+            for r in range(stop - start):
+                # riga start + r: servono solo le colonne j > i
+                row = block[r, r + 1:]
+                data[pos:pos + len(row)] = row
+                pos += len(row)
+
+        return cls(data, n)
+
+    @classmethod
+    def from_matrix(cls, distance_matrix, dtype=np.float32):
+        """Comprime una matrice NxN simmetrica (lista di liste o ndarray)."""
+        dense = np.asarray(distance_matrix)
+        n = len(dense)
+        iu = np.triu_indices(n, k=1)
+        return cls(dense[iu].astype(dtype), n)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.item(*key)
+        return _RowView(self, key)
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def item(self, i, j):
+        """Distanza tra i e j come scalare Python."""
+        if i == j:
+            return self._zero
+        if i > j:
+            i, j = j, i
+        return self.data.item(self._offsets[i] + j)
+
+    def take(self, i, js):
+        """Distanze da i verso tutti i nodi in 'js' (array NumPy)."""
+        js = np.asarray(js)
+        lo = np.minimum(i, js)
+        hi = np.maximum(i, js)
+        same = lo == hi
+        k = self._offsets_arr[lo] + hi
+        k[same] = 0
+        out = self.data[k]
+        out[same] = 0
+        return out
+
+    def pairs(self, i, j):
+        """Distanze tra le coppie (i[t], j[t]) di due array di indici."""
+        return self.take(i, j)
+
+    def row(self, i):
+        """Riga i completa come ndarray."""
+        return self.take(i, np.arange(self.n))
+
+    def to_dense(self):
+        """Ricostruisce la matrice NxN completa."""
+        dense = np.zeros((self.n, self.n), dtype=self.data.dtype)
+        iu = np.triu_indices(self.n, k=1)
+        dense[iu] = self.data
+        dense.T[iu] = self.data
+        return dense
+
+
+class _RowView:
+    """Vista di una riga di una matrice compatta o lazy, per l'accesso d[i][j]."""
+
+    __slots__ = ("_dist", "_i")
+
+    def __init__(self, dist, i):
+        self._dist = dist
+        self._i = i
+
+    def __len__(self):
+        return self._dist.n
+
+    def __getitem__(self, j):
+        return self._dist.item(self._i, j)
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "row_hits", "row_misses",
+                                     "maxrows", "currrows", "nbytes"])
+
+
+def _scalar_metric(weight_type):
+    """Versione scalare (math) di metric_block, per punti già preparati."""
+    if weight_type == "GEO":
+        def metric(lat_a, lon_a, lat_b, lon_b):
+            q1 = math.cos(lon_a - lon_b)
+            q2 = math.cos(lat_a - lat_b)
+            q3 = math.cos(lat_a + lat_b)
+            arg = min(1.0, max(-1.0, 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)))
+            return float(math.trunc(GEO_RRR * math.acos(arg) + 1.0))
+        return metric
+
+    if weight_type == "ATT":
+        def metric(xa, ya, xb, yb):
+            dx = xa - xb
+            dy = ya - yb
+            r = math.sqrt((dx * dx + dy * dy) / 10.0)
+            t = math.floor(r + 0.5)
+            return float(t + 1 if t < r else t)
+        return metric
+
+    if weight_type == "EUC_2D":
+        def metric(xa, ya, xb, yb):
+            dx = xa - xb
+            dy = ya - yb
+            return float(math.floor(math.sqrt(dx * dx + dy * dy) + 0.5))
+        return metric
+
+    if weight_type == "CEIL_2D":
+        def metric(xa, ya, xb, yb):
+            dx = xa - xb
+            dy = ya - yb
+            return float(math.ceil(math.sqrt(dx * dx + dy * dy)))
+        return metric
+
+    def metric(xa, ya, xb, yb):
+        dx = xa - xb
+        dy = ya - yb
+        return math.sqrt(dx * dx + dy * dy)
+    return metric
+
+
+class DistanceOracle:
+    """
+    Distanze calcolate su richiesta a partire dalle coordinate, senza
+    costruire alcuna matrice O(n^2): la memoria occupata è O(n) più una
+    cache LRU di righe limitata da 'max_bytes'.
+
+    Le singole letture d[i][j] / d.item(i, j) usano una riga in cache se
+    disponibile (di i o, per simmetria, di j), altrimenti calcolano la sola
+    distanza richiesta. Una riga viene calcolata e messa in cache quando
+    riceve almeno 'promote_after' letture mancate, così gli accessi per riga
+    (ad es. nearest_neighbor) diventano hit, mentre gli accessi sparsi (ad es.
+    tour_cost) restano O(1) senza riempire la cache. Con
+    promote_after=math.inf le righe entrano in cache solo tramite row().
+    """
+
+    __slots__ = ("n", "weight_type", "dtype", "max_rows", "promote_after",
+                 "hits", "misses", "row_hits", "row_misses",
+                 "_xy", "_xs", "_ys", "_metric", "_rows", "_touches")
+
+    def __init__(self, coords, weight_type=None, dtype=np.float64,
+                 max_bytes=64 * 2 ** 20, promote_after=8):
+        self._xy = prepare_coords(coords, weight_type)
+        self.n = len(self._xy)
+        self.weight_type = weight_type
+        self.dtype = np.dtype(dtype)
+        row_bytes = max(1, self.n * self.dtype.itemsize)
+        self.max_rows = max(1, max_bytes // row_bytes)
+        self.promote_after = promote_after
+
+        self._xs = self._xy[:, 0].tolist()
+        self._ys = self._xy[:, 1].tolist()
+        self._metric = _scalar_metric(weight_type)
+        self._rows = OrderedDict()
+        self._touches = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.row_hits = 0
+        self.row_misses = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.item(*key)
+        return _RowView(self, key)
+
+    def item(self, i, j):
+        """Distanza tra i e j come scalare Python."""
+        rows = self._rows
+        key, col = i, j
+        row = rows.get(i)
+        if row is None:
+            key, col = j, i
+            row = rows.get(j)
+        if row is not None:
+            self.hits += 1
+            rows.move_to_end(key)
+            return row.item(col)
+
+        self.misses += 1
+        if i == j:
+            return 0.0
+
+        # con promote_after infinito le letture mancate non vengono contate
+        if self.promote_after != math.inf:
+            touches = self._touches.get(i, 0) + 1
+            if touches >= self.promote_after:
+                return self._load_row(i).item(j)
+            self._touches[i] = touches
+
+        xs = self._xs
+        ys = self._ys
+        return self._metric(xs[i], ys[i], xs[j], ys[j])
+
+    def row(self, i):
+        """Riga i completa come ndarray (dalla cache o calcolata e inserita in cache)."""
+        row = self._rows.get(i)
+        if row is not None:
+            self.row_hits += 1
+            self._rows.move_to_end(i)
+            return row
+        return self._load_row(i)
+
+    def take(self, i, js):
+        """Distanze da i verso tutti i nodi in 'js' (array NumPy)."""
+        row = self._rows.get(i)
+        if row is not None:
+            self.row_hits += 1
+            self._rows.move_to_end(i)
+            return row[js]
+        js = np.asarray(js)
+        out = metric_block(self._xy[i:i + 1], self._xy[js], self.weight_type)[0]
+        out[js == i] = 0
+        return out.astype(self.dtype, copy=False)
+
+    def pairs(self, i, j):
+        """Distanze tra le coppie (i[t], j[t]) di due array di indici, senza cache."""
+        i = np.asarray(i)
+        j = np.asarray(j)
+        out = metric_pairs(self._xy[i], self._xy[j], self.weight_type)
+        out[i == j] = 0
+        return out.astype(self.dtype, copy=False)
+
+    def _load_row(self, i):
+        self.row_misses += 1
+        row = metric_block(self._xy[i:i + 1], self._xy, self.weight_type)[0].astype(self.dtype)
+        row[i] = 0
+        self._touches.pop(i, None)
+        rows = self._rows
+        rows[i] = row
+        while len(rows) > self.max_rows:
+            rows.popitem(last=False)
+        return row
+
+    @property
+    def nbytes(self):
+        cached = sum(row.nbytes for row in self._rows.values())
+        return self._xy.nbytes + cached
+
+    def cache_info(self):
+        """Statistiche della cache, sul modello di functools.lru_cache."""
+        return CacheInfo(self.hits, self.misses, self.row_hits, self.row_misses,
+                         self.max_rows, len(self._rows), self.nbytes)
+
+    def cache_clear(self):
+        """Svuota la cache di righe e azzera i contatori."""
+        self._rows.clear()
+        self._touches.clear()
+        self.hits = self.misses = self.row_hits = self.row_misses = 0
@@ -0,0 +1,258 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.utils.tsplib_reader import TSPInstance, load_instance
+
+# Cartella 'cache' nella radice del repository, indipendente dalla
+# directory corrente; la variabile d'ambiente TSP_CACHE_DIR la sostituisce
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_DIR = os.environ.get("TSP_CACHE_DIR", os.path.join(REPO_ROOT, "cache"))
+DEFAULT_MAX_BYTES = 2 * 2 ** 30
+
+# Da incrementare se cambia il formato dei file in cache: le voci vecchie
+# avranno una chiave diversa e verranno eliminate dalla politica di evizione
+CACHE_VERSION = 1
+
+
+def file_hash(path, chunk_size=2 ** 20):
+    """Hash SHA-256 del contenuto del file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _metric_name(weight_type):
+    return "EXACT" if weight_type is None else weight_type
+
+
+class InstanceCache:
+    """
+    Cache su disco delle istanze TSPLIB già lette e delle relative matrici
+    delle distanze, salvate come file .npy.
+
+    Ogni voce è una cartella <root>/<chiave>/ con meta.json, coords.npy e
+    dist.npy; la chiave dipende dall'hash del contenuto del file sorgente,
+    dalla metrica e dal dtype, quindi un file modificato non riusa mai una
+    voce vecchia. Le matrici vengono riaperte in sola lettura con
+    np.load(mmap_mode="r"), senza copie in memoria.
+    La dimensione totale è limitata da 'max_bytes': oltre il limite vengono
+    eliminate le voci usate meno di recente.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, content_hash, weight_type, dtype):
+        return f"{content_hash[:24]}_{_metric_name(weight_type)}_{np.dtype(dtype).name}_v{CACHE_VERSION}"
+
+    def load(self, path, weight_type="header", dtype=np.float64):
+        """
+        Restituisce (TSPInstance, matrice delle distanze in memory-map).
+        weight_type="header" usa la metrica del file, None la distanza
+        euclidea esatta. Se la voce non esiste viene creata.
+        """
+        content_hash = file_hash(path)
+        instance = None
+
+        if weight_type == "header":
+            entry = self._find_any(content_hash)
+            if entry is None:
+                instance = load_instance(path)
+                weight_type = instance.edge_weight_type
+            else:
+                weight_type = self._read_meta(entry)["edge_weight_type"]
+
+        entry = os.path.join(self.root, self.key(content_hash, weight_type, dtype))
+        if not os.path.exists(os.path.join(entry, "meta.json")):
+            if instance is None:
+                instance = load_instance(path)
+            self._store(entry, path, content_hash, instance, weight_type, dtype)
+            self.evict(keep=entry)
+
+        return self._open(entry)
+
+    def invalidate(self, path):
+        """Elimina tutte le voci create a partire dal file 'path'."""
+        source = os.path.abspath(path)
+        removed = 0
+        for entry in self._entries():
+            if self._read_meta(entry).get("source") == source:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def clear(self):
+        """Svuota completamente la cache."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def size(self):
+        """Spazio occupato dalla cache, in byte."""
+        return sum(_dir_size(entry) for entry in self._entries())
+
+    def evict(self, keep=None):
+        """
+        Elimina le voci meno usate di recente finché la cache supera max_bytes.
+        La voce 'keep' (appena creata) non viene mai eliminata.
+        """
+        entries = [(self._last_used(entry), _dir_size(entry), entry) for entry in self._entries()]
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def warm(self, folder="instances", weight_types=("header",), dtype=np.float64, verbose=True):
+        """Pre-carica nella cache tutte le istanze .tsp / .tsp.gz di una cartella."""
+        files = sorted(f for f in os.listdir(folder) if f.endswith((".tsp", ".tsp.gz")))
+        for filename in files:
+            path = os.path.join(folder, filename)
+            for weight_type in weight_types:
+                t0 = time.perf_counter()
+                instance, _ = self.load(path, weight_type, dtype)
+                if verbose:
+                    print(f"{filename:<20} {_metric_name(weight_type):<8} n={instance.dimension:<7} "
+                          f"({time.perf_counter() - t0:.3f}s)")
+
+    # -----------------------
+    # funzioni interne
+    # -----------------------
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        return [os.path.join(self.root, name) for name in os.listdir(self.root)
+                if os.path.exists(os.path.join(self.root, name, "meta.json"))]
+
+    def _find_any(self, content_hash):
+        prefix = content_hash[:24]
+        for entry in self._entries():
+            if os.path.basename(entry).startswith(prefix):
+                return entry
+        return None
+
+    @staticmethod
+    def _read_meta(entry):
+        with open(os.path.join(entry, "meta.json")) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _last_used(entry):
+        return os.path.getmtime(os.path.join(entry, "meta.json"))
+
+    def _store(self, entry, path, content_hash, instance, weight_type, dtype):
+        source = os.path.abspath(path)
+        # le voci dello stesso file con contenuto diverso sono ormai obsolete
+        for old in self._entries():
+            meta = self._read_meta(old)
+            if meta.get("source") == source and meta.get("hash") != content_hash:
+                shutil.rmtree(old, ignore_errors=True)
+
+        # per le istanze EXPLICIT distance_matrix restituisce i pesi del file
+        dist = instance.distance_matrix(dtype, weight_type=weight_type)
+
+        meta = {
+            "source": source,
+            "hash": content_hash,
+            "name": instance.name,
+            "dimension": instance.dimension,
+            "edge_weight_type": instance.edge_weight_type,
+            "edge_weight_format": instance.edge_weight_format,
+            "comment": instance.comment,
+            "header": instance.header,
+            "metric": _metric_name(weight_type),
+            "dtype": np.dtype(dtype).name,
+        }
+
+        # scrittura in una cartella temporanea e rename atomico
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp_")
+        try:
+            np.save(os.path.join(tmp, "dist.npy"), dist)
+            for field in ("coords", "display_coords"):
+                value = getattr(instance, field)
+                if value is not None:
+                    np.save(os.path.join(tmp, f"{field}.npy"), value)
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=4)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            # un altro processo ha già creato la stessa voce
+            if not os.path.exists(os.path.join(entry, "meta.json")):
+                raise
+
+    def _open(self, entry):
+        meta = self._read_meta(entry)
+        # aggiorna il tempo di ultimo utilizzo per la politica LRU
+        os.utime(os.path.join(entry, "meta.json"))
+
+        arrays = {}
+        for field in ("coords", "display_coords"):
+            path = os.path.join(entry, f"{field}.npy")
+            arrays[field] = np.load(path) if os.path.exists(path) else None
+
+        dist = np.load(os.path.join(entry, "dist.npy"), mmap_mode="r")
+        instance = TSPInstance(
+            name=meta["name"],
+            dimension=meta["dimension"],
+            edge_weight_type=meta["edge_weight_type"],
+            edge_weight_format=meta["edge_weight_format"],
+            comment=meta["comment"],
+            coords=arrays["coords"],
+            weights=dist if meta["metric"] == "EXPLICIT" else None,
+            display_coords=arrays["display_coords"],
+            header=meta["header"],
+        )
+        return instance, dist
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+_default_cache = None
+
+
+def load_cached(path, weight_type="header", dtype=np.float64):
+    """load() sulla cache di default (DEFAULT_CACHE_DIR)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = InstanceCache()
+    return _default_cache.load(path, weight_type, dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestione della cache delle istanze TSPLIB")
+    parser.add_argument("--root", default=DEFAULT_CACHE_DIR, help="cartella della cache")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    parser.add_argument("--warm", metavar="CARTELLA", help="pre-carica tutte le istanze della cartella")
+    parser.add_argument("--exact", action="store_true",
+                        help="con --warm, calcola anche la distanza euclidea esatta")
+    parser.add_argument("--clear", action="store_true", help="svuota la cache")
+    args = parser.parse_args()
+
+    cache = InstanceCache(args.root, args.max_bytes)
+    if args.clear:
+        cache.clear()
+        print(f"Cache {args.root} svuotata.")
+    if args.warm:
+        weight_types = ("header", None) if args.exact else ("header",)
+        cache.warm(args.warm, weight_types)
+    print(f"Dimensione cache: {cache.size() / 2 ** 20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
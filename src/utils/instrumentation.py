@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Registratore attivo (None = strumentazione disattivata). Le funzioni
+# strumentate lo leggono una volta per chiamata con current(): da spente
+# costano un solo confronto, mai un controllo per mossa.
+_ACTIVE = None
+
+
+class Recorder:
+    """
+    Raccoglie contatori, tempi e (opzionale) una traccia costo/tempo dalle
+    funzioni strumentate (two_opt, simulated_annealing, solver esatti).
+
+    Parametri:
+    - trace: se True registra i punti (tempo, etichetta, costo)
+    - trace_every: per la 2-opt, un punto ogni 'trace_every' mosse
+
+    Uso:
+        with recording(trace=True) as rec:
+            two_opt(D, tour)
+        rec.to_json("results/instrumentation.json")
+    """
+
+    __slots__ = ("counters", "timers", "trace", "trace_every", "_start")
+
+    def __init__(self, trace=False, trace_every=100):
+        self.counters = {}
+        self.timers = {}
+        self.trace = [] if trace else None
+        self.trace_every = trace_every
+        self._start = time.perf_counter()
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        total, calls = self.timers.get(name, (0.0, 0))
+        self.timers[name] = (total + seconds, calls + 1)
+
+    @contextmanager
+    def timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def point(self, label, cost):
+        """Aggiunge un punto alla traccia costo/tempo (se la traccia è attiva)."""
+        if self.trace is not None:
+            self.trace.append((time.perf_counter() - self._start, label, float(cost)))
+
+    def to_dict(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: {"total": total, "calls": calls}
+                       for name, (total, calls) in self.timers.items()},
+            "trace": list(self.trace) if self.trace is not None else None,
+        }
+
+    def rows(self):
+        """Righe (tipo, nome, valore, chiamate) di contatori e tempi."""
+        rows = [("counter", name, value, "") for name, value in sorted(self.counters.items())]
+        rows += [("timer", name, round(total, 6), calls)
+                 for name, (total, calls) in sorted(self.timers.items())]
+        return rows
+
+    def to_json(self, path):
+        _makedirs_for(path)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_csv(self, path, trace_path=None):
+        """Contatori e tempi in 'path'; la traccia, se presente, in 'trace_path'."""
+        _makedirs_for(path)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", "value", "calls"])
+            writer.writerows(self.rows())
+        if trace_path is not None and self.trace is not None:
+            _makedirs_for(trace_path)
+            with open(trace_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["time", "label", "cost"])
+                writer.writerows(self.trace)
+
+
+def current():
+    """Registratore attivo, oppure None se la strumentazione è spenta."""
+    return _ACTIVE
+
+
+@contextmanager
+def recording(trace=False, trace_every=100, recorder=None):
+    """
+    Attiva un Recorder per il blocco 'with' (annidabile: all'uscita torna
+    attivo quello precedente) e lo restituisce.
+    """
+    global _ACTIVE
+    previous = _ACTIVE
+    _ACTIVE = recorder if recorder is not None else Recorder(trace, trace_every)
+    try:
+        yield _ACTIVE
+    finally:
+        _ACTIVE = previous
+
+
+def _makedirs_for(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
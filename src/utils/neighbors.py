@@ -0,0 +1,165 @@
+import numpy as np
+
+from src.utils.distances import metric_block, metric_pairs, prepare_coords
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy è opzionale: senza di esso si usa la griglia
+    cKDTree = None
+
+METHODS = ("kdtree", "grid", "quadrant")
+
+
+def build_neighbor_lists(coords, k=10, method="kdtree", weight_type=None):
+    """
+    Liste dei K vicini più prossimi di ogni città, calcolate sulle coordinate
+    senza costruire la matrice delle distanze.
+
+    Parametri:
+    - coords: coordinate (lista di tuple o array (n, 2))
+    - k: numero di vicini per città (limitato a n-1)
+    - method: "kdtree" (scipy, se disponibile), "grid" (griglia uniforme in
+      NumPy) oppure "quadrant" (k/4 vicini per ciascuno dei quattro
+      quadranti attorno alla città, completati con i più vicini)
+    - weight_type: metrica TSPLIB usata per ordinare i vicini
+
+    Restituisce:
+    - array (n, k) di indici int32, ogni riga ordinata per distanza crescente
+    """
+    if method not in METHODS:
+        raise ValueError(f"Metodo non supportato: {method} (ammessi: {', '.join(METHODS)})")
+
+    xy = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n = len(xy)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int32)
+
+    if method == "quadrant":
+        return _quadrant_neighbors(xy, k, weight_type)
+
+    if method == "kdtree" and cKDTree is not None:
+        _, idx = cKDTree(xy).query(xy, k=k + 1)
+        # con punti coincidenti la città stessa non è per forza la prima:
+        # si toglie dove compare (o l'ultimo, se non compare affatto)
+        is_self = idx == np.arange(n)[:, None]
+        is_self[~is_self.any(axis=1), -1] = True
+        candidates = idx[~is_self].reshape(n, k)
+    else:
+        candidates = _grid_neighbors(xy, k)
+
+    # riordino secondo la metrica richiesta (es. arrotondamenti EUC_2D, ATT)
+    return _sort_by_metric(xy, candidates, weight_type)
+
+
+def neighbors_from_matrix(distance_matrix, k=10, block_size=1024):
+    """
+    Liste dei K vicini ricavate da una matrice delle distanze (lista di liste,
+    ndarray, CondensedDistance o DistanceOracle), utile per le istanze
+    EXPLICIT senza coordinate. Restituisce un array (n, k) int32.
+    """
+    n = len(distance_matrix)
+    k = min(k, n - 1)
+    result = np.empty((n, max(k, 0)), dtype=np.int32)
+    if k <= 0:
+        return result
+
+    row_of = getattr(distance_matrix, "row", None)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        if row_of is not None:
+            block = np.array([row_of(i) for i in range(start, stop)], dtype=np.float64)
+        else:
+            block = np.array(distance_matrix[start:stop], dtype=np.float64)
+        block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+
+        part = np.argpartition(block, k - 1, axis=1)[:, :k]
+        part_d = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(part_d, axis=1, kind="stable")
+        result[start:stop] = np.take_along_axis(part, order, axis=1)
+
+    return result
+
+
+def _sort_by_metric(xy, candidates, weight_type):
+    """Ordina ogni riga di candidati per distanza crescente secondo la metrica."""
+    prepared = prepare_coords(xy, weight_type)
+    dist = metric_pairs(prepared[:, None, :], prepared[candidates], weight_type)
+    order = np.argsort(dist, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1).astype(np.int32)
+
+
+def _grid_neighbors(xy, k):
+    """
+    K vicini tramite griglia uniforme: per ogni cella si esaminano gli anelli
+    di celle attorno ad essa finché il k-esimo vicino trovato è certamente più
+    vicino del bordo della zona esplorata.
+    """
+    n = len(xy)
+    lo = xy.min(axis=0)
+    span = np.maximum(xy.max(axis=0) - lo, 1e-12)
+    # circa k/2 punti per cella
+    cells_per_side = max(1, int(np.sqrt(n / max(k / 2.0, 1.0))))
+    cell_size = float(max(span)) / cells_per_side
+    nx = int(span[0] / cell_size) + 1
+    ny = int(span[1] / cell_size) + 1
+
+    cx = np.minimum(((xy[:, 0] - lo[0]) / cell_size).astype(np.int64), nx - 1)
+    cy = np.minimum(((xy[:, 1] - lo[1]) / cell_size).astype(np.int64), ny - 1)
+    cell = cx * ny + cy
+    order = np.argsort(cell, kind="stable")
+    sorted_cells = cell[order]
+    starts = np.searchsorted(sorted_cells, np.arange(nx * ny))
+    ends = np.searchsorted(sorted_cells, np.arange(nx * ny), side="right")
+
+    result = np.empty((n, k), dtype=np.int64)
+    for c in np.unique(sorted_cells):
+        members = order[starts[c]:ends[c]]
+        gx, gy = divmod(int(c), ny)
+        pending = members
+        ring = 1
+        while len(pending):
+            x0, x1 = max(gx - ring, 0), min(gx + ring, nx - 1)
+            y0, y1 = max(gy - ring, 0), min(gy + ring, ny - 1)
+            cand = np.concatenate([order[starts[i * ny + y0]:ends[i * ny + y1]]
+                                   for i in range(x0, x1 + 1)])
+            covers_all = x0 == 0 and y0 == 0 and x1 == nx - 1 and y1 == ny - 1
+            if len(cand) > k or covers_all:
+                d = metric_block(xy[pending], xy[cand])
+                d[cand[None, :] == pending[:, None]] = np.inf
+                kk = min(k, len(cand) - 1)
+                part = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+                kth = np.take_along_axis(d, part, axis=1).max(axis=1)
+                # distanza minima garantita dal bordo della zona esplorata
+                radius = ring * cell_size
+                ok = (kth <= radius) | covers_all
+                result[pending[ok]] = cand[part[ok]]
+                pending = pending[~ok]
+            ring += 1
+
+    return result
+
+
+def _quadrant_neighbors(xy, k, weight_type):
+    """Vicini bilanciati per quadrante: k/4 per quadrante, completati coi più vicini."""
+    n = len(xy)
+    pool_size = min(n - 1, 5 * k)
+    pool = build_neighbor_lists(xy, pool_size, "kdtree", weight_type)
+    per_quadrant = max(1, k // 4)
+
+    delta = xy[pool] - xy[:, None, :]
+    quadrant = (delta[..., 0] >= 0).astype(np.int8) * 2 + (delta[..., 1] >= 0)
+
+    # posizione di ogni candidato all'interno del proprio quadrante (1, 2, ...)
+    rank_in_quadrant = np.zeros(pool.shape, dtype=np.int64)
+    for q in range(4):
+        mask = quadrant == q
+        rank_in_quadrant[mask] = np.cumsum(mask, axis=1)[mask]
+    selected = rank_in_quadrant <= per_quadrant
+
+    # prima i selezionati per quadrante, poi i più vicini rimasti; infine
+    # le posizioni scelte vengono riordinate, quindi per distanza crescente
+    positions = np.arange(pool.shape[1])
+    key = np.where(selected, positions, positions + pool.shape[1])
+    chosen = np.sort(np.argsort(key, axis=1, kind="stable")[:, :k], axis=1)
+    return np.take_along_axis(pool, chosen, axis=1).astype(np.int32)
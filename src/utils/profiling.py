@@ -0,0 +1,172 @@
+import argparse
+import cProfile
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+MODES = ("cprofile", "sample")
+
+# Intervallo di campionamento del profiler statistico (secondi)
+SAMPLE_INTERVAL = 0.005
+
+
+class SamplingProfiler:
+    """
+    Profiler statistico: un thread legge ogni 'interval' secondi lo stack del
+    thread profilato e conta gli stack uguali. Costa poco anche su
+    esecuzioni lunghe (niente hook per chiamata come cProfile), ma vede solo
+    il codice Python: le chiamate numpy appaiono come la riga che le invoca.
+
+    Uso:
+        with SamplingProfiler() as prof:
+            two_opt(D, tour)
+        prof.write_collapsed("results/profile.txt")
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def top(self, limit=20):
+        """Funzioni più campionate: lista di (funzione, campioni in cima allo stack, totali)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        return [(name, own[name], total[name]) for name, _ in own.most_common(limit)]
+
+    def write_collapsed(self, path):
+        """Stack nel formato 'f1;f2;f3 campioni' (flamegraph.pl, speedscope)."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(mode, output=None, interval=SAMPLE_INTERVAL):
+    """
+    Profila il blocco 'with' con cProfile o con il profiler a campionamento.
+
+    Parametri:
+    - mode: "cprofile" oppure "sample"
+    - output: file in cui salvare il profilo (statistiche pstats per
+      cProfile, stack collassati per "sample"); None = non salvare
+    - interval: intervallo di campionamento per "sample"
+
+    Restituisce (nel 'with') il profiler: cProfile.Profile o SamplingProfiler.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Profiler non supportato: {mode} (ammessi: {', '.join(MODES)})")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+    try:
+        yield profiler
+    finally:
+        if mode == "cprofile":
+            profiler.disable()
+        else:
+            profiler.stop()
+        if output is not None:
+            folder = os.path.dirname(output)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            if mode == "cprofile":
+                profiler.dump_stats(output)
+            else:
+                profiler.write_collapsed(output)
+
+
+def print_report(profiler, limit=20, sort="cumulative"):
+    """Stampa le funzioni più costose del profilo."""
+    if isinstance(profiler, cProfile.Profile):
+        pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+        return
+    total = sum(profiler.samples.values()) or 1
+    print(f"{'proprio':>8} {'totale':>8}  funzione  ({total} campioni)")
+    for name, own, cumulative in profiler.top(limit):
+        print(f"{100 * own / total:7.1f}% {100 * cumulative / total:7.1f}%  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Esegue uno script Python sotto cProfile o un profiler a campionamento",
+        usage="python -m src.utils.profiling [opzioni] script.py [argomenti dello script]",
+    )
+    parser.add_argument("--mode", choices=MODES, default="cprofile")
+    parser.add_argument("--output", default=None,
+                        help="file del profilo (default: results/profile.prof o results/profile.txt)")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL,
+                        help="intervallo di campionamento in secondi (solo --mode sample)")
+    parser.add_argument("--sort", default="cumulative", help="ordinamento pstats (solo cprofile)")
+    parser.add_argument("--limit", type=int, default=20, help="righe del riepilogo")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        output = "results/profile.prof" if args.mode == "cprofile" else "results/profile.txt"
+
+    # lo script vede i propri argomenti come se fosse lanciato direttamente
+    sys.argv = [args.script] + args.args
+    t0 = time.perf_counter()
+    with profiled(args.mode, output, args.interval) as profiler:
+        try:
+            runpy.run_path(args.script, run_name="__main__")
+        except SystemExit:
+            pass
+    print(f"\n== PROFILO ({args.mode}, {time.perf_counter() - t0:.2f}s) ==")
+    print_report(profiler, args.limit, args.sort)
+    print(f"Profilo salvato in: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import math
+from array import array
+
+from src.utils.distances import distance_lookup
+from src.utils.tour_utils import tour_cost
+
+
+class _TourBase:
+    """Operazioni comuni a Tour e TwoLevelTour, definite tramite next/flip."""
+
+    __slots__ = ()
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.to_list(closed=False))
+
+    @property
+    def cost(self):
+        """Costo del tour (richiede distance_matrix), calcolato una volta e poi aggiornato."""
+        if self._cost is None:
+            if self._dist is None:
+                raise ValueError("Serve una matrice delle distanze per calcolare il costo")
+            self._cost = tour_cost(self.to_list(closed=False), self._dist)
+        return self._cost
+
+    def two_opt_move(self, a, c):
+        """
+        Mossa 2-opt che rimuove (a, next(a)) e (c, next(c)) e aggiunge
+        (a, c) e (next(a), next(c)). Il costo in cache viene aggiornato in O(1).
+        """
+        b = self.next(a)
+        e = self.next(c)
+        if self._cost is not None:
+            d = distance_lookup(self._dist)
+            self._cost += d(a, c) + d(b, e) - d(a, b) - d(c, e)
+        cost = self._cost
+        self.flip(b, c)
+        self._cost = cost
+
+    def to_list(self, closed=True, start=None):
+        """
+        Tour nel formato a lista: chiuso ([start, ..., start]) oppure aperto,
+        a partire da 'start' (default la prima città dell'ordine).
+        """
+        if self.n == 0:
+            return []
+        if start is None:
+            start = self._first()
+        tour = [start]
+        city = self.next(start)
+        while city != start:
+            tour.append(city)
+            city = self.next(city)
+        if closed:
+            tour.append(start)
+        return tour
+
+
+class Tour(_TourBase):
+    """
+    Tour ciclico su array: 'order' (array('i')) contiene le città in ordine
+    di visita e 'pos' la posizione di ogni città, quindi next/prev/between
+    costano O(1) e l'inversione di un tratto costa quanto il lato più corto.
+    Il tour non ripete la città iniziale; to_list() / from_list() convertono
+    da e verso il formato a lista chiusa usato dal resto del progetto.
+
+    Parametri:
+    - order: sequenza delle città (aperta o chiusa)
+    - distance_matrix: matrice opzionale per il costo in cache
+    """
+
+    __slots__ = ("n", "order", "pos", "_dist", "_cost")
+
+    def __init__(self, order, distance_matrix=None):
+        order = list(order)
+        if len(order) > 1 and order[0] == order[-1]:
+            order.pop()
+        self.n = len(order)
+        self.order = array("i", order)
+        self.pos = array("i", bytes(4 * self.n))
+        for idx, city in enumerate(order):
+            self.pos[city] = idx
+        self._dist = distance_matrix
+        self._cost = None
+
+    @classmethod
+    def from_list(cls, tour, distance_matrix=None):
+        """Tour dal formato a lista (chiusa o aperta)."""
+        return cls(tour, distance_matrix)
+
+    def __getitem__(self, i):
+        return self.order[i]
+
+    def copy(self):
+        other = Tour.__new__(Tour)
+        other.n = self.n
+        other.order = array("i", self.order)
+        other.pos = array("i", self.pos)
+        other._dist = self._dist
+        other._cost = self._cost
+        return other
+
+    def _first(self):
+        return self.order[0]
+
+    def next(self, city):
+        idx = self.pos[city] + 1
+        return self.order[idx if idx < self.n else 0]
+
+    def prev(self, city):
+        return self.order[self.pos[city] - 1]
+
+    def between(self, a, b, c):
+        """True se percorrendo il tour in avanti da a a c si incontra b."""
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def reverse(self, i, j):
+        """
+        Inverte il tratto dalle posizioni i a j (ciclico). Se è più lungo di
+        metà tour inverte il complementare, che dà lo stesso ciclo.
+        """
+        order = self.order
+        pos = self.pos
+        n = self.n
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+        for _ in range(length // 2):
+            ci = order[i]
+            cj = order[j]
+            order[i] = cj
+            pos[cj] = i
+            order[j] = ci
+            pos[ci] = j
+            i += 1
+            if i == n:
+                i = 0
+            j -= 1
+            if j < 0:
+                j = n - 1
+        self._cost = None
+
+    def flip(self, a, b):
+        """Inverte il cammino che va in avanti dalla città a alla città b."""
+        self.reverse(self.pos[a], self.pos[b])
+
+
+class _Segment:
+    __slots__ = ("cities", "reversed", "rank")
+
+    def __init__(self, cities, rank):
+        self.cities = cities
+        self.reversed = False
+        self.rank = rank
+
+
+class TwoLevelTour(_TourBase):
+    """
+    Tour a due livelli per istanze molto grandi: le città sono divise in
+    segmenti di circa sqrt(n) città, ognuno con un bit di inversione, in una
+    lista ciclica di segmenti. Invertire un cammino richiede al più due
+    divisioni di segmento e l'inversione dell'ordine dei segmenti interni
+    (con i loro bit), quindi O(sqrt(n)); next/prev/between restano O(1).
+    Quando le divisioni hanno raddoppiato il numero di segmenti, la struttura
+    viene ricostruita (costo ammortizzato O(sqrt(n)) per inversione).
+
+    Parametri:
+    - order: sequenza delle città (aperta o chiusa)
+    - distance_matrix: matrice opzionale per il costo in cache
+    - group_size: città per segmento (default circa sqrt(n))
+    """
+
+    __slots__ = ("n", "group_size", "segments", "seg_of", "offset", "_dist", "_cost")
+
+    def __init__(self, order, distance_matrix=None, group_size=None):
+        order = list(order)
+        if len(order) > 1 and order[0] == order[-1]:
+            order.pop()
+        self.n = len(order)
+        self.group_size = group_size or max(8, int(math.sqrt(self.n)))
+        self.seg_of = [None] * self.n
+        self.offset = [0] * self.n
+        self._dist = distance_matrix
+        self._cost = None
+        self._build(order)
+
+    @classmethod
+    def from_list(cls, tour, distance_matrix=None, group_size=None):
+        """Tour dal formato a lista (chiusa o aperta)."""
+        return cls(tour, distance_matrix, group_size)
+
+    def __getitem__(self, i):
+        """Città in posizione i (O(sqrt(n)))."""
+        if i < 0:
+            i += self.n
+        for seg in self.segments:
+            size = len(seg.cities)
+            if i < size:
+                return seg.cities[size - 1 - i] if seg.reversed else seg.cities[i]
+            i -= size
+        raise IndexError("posizione fuori dal tour")
+
+    def _build(self, order):
+        g = self.group_size
+        self.segments = []
+        for rank, start in enumerate(range(0, len(order), g)):
+            seg = _Segment(order[start:start + g], rank)
+            self.segments.append(seg)
+            self._assign(seg)
+
+    def _assign(self, seg):
+        seg_of = self.seg_of
+        offset = self.offset
+        for k, city in enumerate(seg.cities):
+            seg_of[city] = seg
+            offset[city] = k
+
+    def _first(self):
+        seg = self.segments[0]
+        return seg.cities[-1] if seg.reversed else seg.cities[0]
+
+    def _index(self, city):
+        """Posizione di city nel suo segmento secondo il verso del tour."""
+        seg = self.seg_of[city]
+        k = self.offset[city]
+        return len(seg.cities) - 1 - k if seg.reversed else k
+
+    def _key(self, city):
+        return self.seg_of[city].rank, self._index(city)
+
+    def next(self, city):
+        seg = self.seg_of[city]
+        k = self.offset[city]
+        cities = seg.cities
+        if seg.reversed:
+            if k > 0:
+                return cities[k - 1]
+        elif k + 1 < len(cities):
+            return cities[k + 1]
+        nxt = self.segments[seg.rank + 1 if seg.rank + 1 < len(self.segments) else 0]
+        return nxt.cities[-1] if nxt.reversed else nxt.cities[0]
+
+    def prev(self, city):
+        seg = self.seg_of[city]
+        k = self.offset[city]
+        cities = seg.cities
+        if seg.reversed:
+            if k + 1 < len(cities):
+                return cities[k + 1]
+        elif k > 0:
+            return cities[k - 1]
+        prv = self.segments[seg.rank - 1]
+        return prv.cities[0] if prv.reversed else prv.cities[-1]
+
+    def between(self, a, b, c):
+        """True se percorrendo il tour in avanti da a a c si incontra b."""
+        ka, kb, kc = self._key(a), self._key(b), self._key(c)
+        if ka <= kc:
+            return ka <= kb <= kc
+        return kb >= ka or kb <= kc
+
+    def reverse(self, i, j):
+        """Inverte il tratto dalle posizioni i a j (ciclico)."""
+        self.flip(self[i], self[j])
+
+    def flip(self, a, b):
+        """Inverte il cammino che va in avanti dalla città a alla città b."""
+        self._cost = None
+        if self.next(b) == a:
+            return      # il cammino è l'intero tour: il ciclo non cambia
+        if self._key(a) > self._key(b):
+            # il cammino attraversa la fine della lista dei segmenti: si
+            # inverte il complementare, che dà lo stesso ciclo e non la attraversa
+            a, b = self.next(b), self.prev(a)
+
+        first = self._split_before(a)
+        after = self._split_before(self.next(b))
+        last = after - 1 if after > first else len(self.segments) - 1
+
+        segments = self.segments
+        segments[first:last + 1] = segments[first:last + 1][::-1]
+        for rank in range(first, last + 1):
+            seg = segments[rank]
+            seg.reversed = not seg.reversed
+            seg.rank = rank
+        if len(segments) > 2 * math.ceil(self.n / self.group_size):
+            self._build(self.to_list(closed=False))
+
+    def _split_before(self, city):
+        """
+        Divide il segmento di city in modo che city ne diventi la prima città
+        (secondo il verso del tour). Restituisce il rango del segmento che
+        inizia con city.
+        """
+        seg = self.seg_of[city]
+        k = self._index(city)
+        if k == 0:
+            return seg.rank
+        cities = seg.cities[::-1] if seg.reversed else seg.cities
+        head = _Segment(cities[:k], seg.rank)
+        tail = _Segment(cities[k:], seg.rank + 1)
+        self.segments[seg.rank:seg.rank + 1] = [head, tail]
+        for rank in range(seg.rank + 2, len(self.segments)):
+            self.segments[rank].rank = rank
+        self._assign(head)
+        self._assign(tail)
+        return tail.rank
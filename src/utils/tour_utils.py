@@ -1,19 +1,169 @@
-def tour_cost(tour, distance_matrix):
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from src.utils.distances import distance_lookup
+
+# Righe di tour_costs elaborate per blocco (limita la memoria temporanea)
+BATCH_ROWS = 1024
+
+
+def tour_cost(tour, distance_matrix, cache=None):
     """
     Calcola il costo totale di un tour dato e una matrice delle distanze.
     Il tour può essere:
     - chiuso (primo nodo uguale all'ultimo)
     - aperto (in tal caso chiudiamo il ciclo aggiungendo l'arco finale)
+
+    Con un ndarray, CondensedDistance o DistanceOracle la somma è vettorizzata
+    (D[t[:-1], t[1:]].sum()); con una lista di liste si legge arco per arco.
+    Con 'cache' (TourCostCache della stessa matrice) un tour già valutato
+    non viene ricalcolato.
     """
+    if cache is not None:
+        return cache.cost(tour)
+
     if len(tour) < 2:
         return 0.0
 
+    if isinstance(distance_matrix, np.ndarray) or hasattr(distance_matrix, "pairs"):
+        t = np.asarray(tour, dtype=np.int64)
+        if t[0] != t[-1]:
+            t = np.append(t, t[0])
+        return float(_pair_costs(distance_matrix, t[:-1], t[1:]).sum(dtype=np.float64))
+
+    d = distance_lookup(distance_matrix)
+
     cost = 0.0
     for i in range(len(tour) - 1):
-        cost += distance_matrix[tour[i]][tour[i + 1]]
+        cost += d(tour[i], tour[i + 1])
 
     # se il tour non è chiuso, chiudiamolo
     if tour[0] != tour[-1]:
-        cost += distance_matrix[tour[-1]][tour[0]]
+        cost += d(tour[-1], tour[0])
 
     return cost
+
+
+def tour_costs(tours, distance_matrix):
+    """
+    Costi di molti tour insieme: 'tours' è un array 2-D (m, n) di tour aperti
+    oppure (m, n+1) di tour chiusi, tutti della stessa lunghezza.
+    Restituisce un array float64 (m,).
+    """
+    batch = np.asarray(tours, dtype=np.int64)
+    if batch.ndim != 2:
+        raise ValueError("tour_costs richiede un array 2-D di tour")
+    m = len(batch)
+    costs = np.zeros(m, dtype=np.float64)
+    if m == 0 or batch.shape[1] < 2:
+        return costs
+
+    dense = distance_matrix
+    if not isinstance(dense, np.ndarray) and not hasattr(dense, "pairs"):
+        dense = np.asarray(distance_matrix, dtype=np.float64)
+
+    closed = bool((batch[:, 0] == batch[:, -1]).all())
+    for start in range(0, m, BATCH_ROWS):
+        block = batch[start:start + BATCH_ROWS]
+        if not closed:
+            block = np.concatenate([block, block[:, :1]], axis=1)
+        costs[start:start + len(block)] = _pair_costs(
+            dense, block[:, :-1], block[:, 1:]).sum(axis=1, dtype=np.float64)
+    return costs
+
+
+def validate_tour(tour, n=None, closed=True):
+    """
+    Controlla in O(n), senza cicli Python, che il tour sia una permutazione
+    delle città 0..n-1 e, se closed=True, che termini nella città di partenza.
+    Solleva ValueError con il motivo in caso contrario.
+    """
+    t = np.asarray(tour)
+    if t.ndim != 1 or not np.issubdtype(t.dtype, np.integer):
+        raise ValueError("Il tour deve essere una sequenza 1-D di interi")
+    if closed:
+        if len(t) < 2 or t[0] != t[-1]:
+            raise ValueError("Il tour non è chiuso (l'ultima città deve essere quella di partenza)")
+        t = t[:-1]
+    if n is None:
+        n = len(t)
+    if len(t) != n:
+        raise ValueError(f"Il tour visita {len(t)} città invece di {n}")
+    if n == 0:
+        return
+    if t.min() < 0 or t.max() >= n:
+        raise ValueError(f"Il tour contiene città fuori dall'intervallo 0..{n - 1}")
+    counts = np.bincount(t, minlength=n)
+    if (counts != 1).any():
+        repeated = np.flatnonzero(counts > 1)
+        raise ValueError(f"Il tour non è una permutazione: città ripetute {repeated[:10].tolist()}")
+
+
+def canonical_tour(tour):
+    """
+    Forma canonica di un tour ciclico (array int32 aperto): rotazione che
+    parte dalla città 0 e verso in cui la seconda città è minore dell'ultima,
+    così rotazioni e inversioni dello stesso ciclo coincidono.
+    """
+    t = np.asarray(tour, dtype=np.int32)
+    if len(t) > 1 and t[0] == t[-1]:
+        t = t[:-1]
+    if len(t) < 3:
+        return np.sort(t)
+    t = np.roll(t, -int(np.argmin(t)))
+    if t[1] > t[-1]:
+        t = np.concatenate([t[:1], t[:0:-1]])
+    return t
+
+
+class TourCostCache:
+    """
+    Cache limitata (LRU) dei costi dei tour per una matrice delle distanze:
+    la chiave è un hash della forma canonica del tour, quindi la stessa
+    soluzione ruotata o invertita non viene ricalcolata.
+
+    Parametri:
+    - distance_matrix: matrice a cui si riferiscono i costi
+    - maxsize: numero massimo di tour memorizzati
+    """
+
+    __slots__ = ("distance_matrix", "maxsize", "hits", "misses", "_costs")
+
+    def __init__(self, distance_matrix, maxsize=4096):
+        self.distance_matrix = distance_matrix
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._costs = OrderedDict()
+
+    def __len__(self):
+        return len(self._costs)
+
+    def cost(self, tour):
+        key = hashlib.blake2b(canonical_tour(tour).tobytes(), digest_size=16).digest()
+        costs = self._costs
+        cost = costs.get(key)
+        if cost is not None:
+            self.hits += 1
+            costs.move_to_end(key)
+            return cost
+
+        self.misses += 1
+        cost = tour_cost(tour, self.distance_matrix)
+        costs[key] = cost
+        if len(costs) > self.maxsize:
+            costs.popitem(last=False)
+        return cost
+
+    def clear(self):
+        self._costs.clear()
+        self.hits = self.misses = 0
+
+
+def _pair_costs(distance_matrix, a, b):
+    """Distanze tra le coppie (a, b) per ndarray, CondensedDistance o DistanceOracle."""
+    if isinstance(distance_matrix, np.ndarray):
+        return distance_matrix[a, b]
+    return distance_matrix.pairs(a, b)
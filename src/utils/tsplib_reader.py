@@ -1,35 +1,251 @@
+import gzip
 import math
+import mmap
+import os
+import re
+from dataclasses import dataclass, field
 
-def read_tsplib(filename):
+import numpy as np
+
+from src.utils.distances import build_distance_matrix
+
+# File più grandi di questa soglia vengono letti tramite memory-map
+MMAP_THRESHOLD = 16 * 2 ** 20
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Inizio della prossima riga non numerica (nuova sezione, chiave o EOF)
+_NEXT_KEYWORD = re.compile(rb"^[ \t]*[A-Za-z]", re.MULTILINE)
+
+# Per un TSP simmetrico i formati "per colonne" coincidono con quelli
+# "per righe" del triangolo opposto
+_EQUIVALENT_FORMATS = {
+    "UPPER_COL": "LOWER_ROW",
+    "LOWER_COL": "UPPER_ROW",
+    "UPPER_DIAG_COL": "LOWER_DIAG_ROW",
+    "LOWER_DIAG_COL": "UPPER_DIAG_ROW",
+}
+
+
+@dataclass
+class TSPInstance:
     """
-    Legge un file TSPLIB .tsp e restituisce:
-    - lista di coordinate [(x1, y1), (x2, y2), ...]
-    - numero di città
+    Istanza TSPLIB letta da load_instance.
+
+    - coords: array (n, 2) delle coordinate (None per istanze EXPLICIT)
+    - weights: matrice (n, n) dei pesi espliciti (None se ci sono coordinate)
+    - display_coords: coordinate di DISPLAY_DATA_SECTION, se presenti
+    - header: tutte le righe "CHIAVE : valore" del file
+    """
+    name: str
+    dimension: int
+    edge_weight_type: str
+    edge_weight_format: str = None
+    comment: str = ""
+    coords: np.ndarray = None
+    weights: np.ndarray = None
+    display_coords: np.ndarray = None
+    header: dict = field(default_factory=dict)
+
+    def distance_matrix(self, dtype=np.float64, weight_type="header"):
+        """
+        Matrice NxN delle distanze dell'istanza come ndarray.
+        weight_type="header" usa l'EDGE_WEIGHT_TYPE del file; None forza la
+        distanza euclidea esatta (comportamento storico di distance_matrix).
+        """
+        if self.weights is not None:
+            return self.weights.astype(dtype, copy=False)
+        if weight_type == "header":
+            weight_type = self.edge_weight_type
+        return build_distance_matrix(self.coords, weight_type, dtype=dtype)
+
+
+def _open_buffer(filename, mmap_threshold=MMAP_THRESHOLD):
+    """
+    Restituisce il contenuto del file come oggetto bytes-like: decompresso se
+    il file è gzip, memory-mappato se più grande di 'mmap_threshold'.
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(2)
+        if magic == GZIP_MAGIC:
+            f.seek(0)
+            with gzip.GzipFile(fileobj=f) as gz:
+                return gz.read()
+
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return b""
+        if size > mmap_threshold:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.seek(0)
+        return f.read()
+
+
+def _read_numbers(buf, pos):
+    """
+    Legge in blocco tutti i numeri da 'pos' fino alla prossima riga che
+    inizia con una lettera. Restituisce (array float64, posizione finale).
+    """
+    match = _NEXT_KEYWORD.search(buf, pos)
+    end = match.start() if match else len(buf)
+    values = np.array(buf[pos:end].split(), dtype=np.float64)
+    return values, end
+
+
+def _node_section(values, dimension):
+    """Converte una sezione "id x y [z]" in un array (n, 2) ordinato per id."""
+    if dimension and len(values) % dimension == 0 and len(values) // dimension >= 3:
+        width = len(values) // dimension
+    else:
+        width = 3
+    table = values.reshape(-1, width)
+    ids = table[:, 0].astype(np.int64) - 1
+    xy = np.empty((len(table), 2), dtype=np.float64)
+    xy[ids] = table[:, 1:3]
+    return xy
+
+
+def _explicit_matrix(values, dimension, edge_weight_format):
+    """Ricostruisce la matrice simmetrica completa da EDGE_WEIGHT_SECTION."""
+    n = dimension
+    fmt = _EQUIVALENT_FORMATS.get(edge_weight_format, edge_weight_format)
+
+    if fmt == "FULL_MATRIX":
+        return values[:n * n].reshape(n, n).copy()
+
+    if fmt == "UPPER_ROW":
+        rows, cols = np.triu_indices(n, k=1)
+    elif fmt == "LOWER_ROW":
+        rows, cols = np.tril_indices(n, k=-1)
+    elif fmt == "UPPER_DIAG_ROW":
+        rows, cols = np.triu_indices(n, k=0)
+    elif fmt == "LOWER_DIAG_ROW":
+        rows, cols = np.tril_indices(n, k=0)
+    else:
+        raise ValueError(f"EDGE_WEIGHT_FORMAT non supportato: {edge_weight_format}")
+
+    if len(values) < len(rows):
+        raise ValueError(f"EDGE_WEIGHT_SECTION incompleta: attesi {len(rows)} valori, "
+                         f"letti {len(values)}")
+
+    weights = np.zeros((n, n), dtype=np.float64)
+    weights[rows, cols] = values[:len(rows)]
+    weights[cols, rows] = values[:len(rows)]
+    return weights
+
+
+def load_instance(filename, mmap_threshold=MMAP_THRESHOLD):
+    """
+    Legge un file TSPLIB (.tsp o .tsp.gz) e restituisce un TSPInstance.
+
+    L'intestazione viene letta riga per riga; le sezioni numeriche
+    (NODE_COORD_SECTION, EDGE_WEIGHT_SECTION, DISPLAY_DATA_SECTION) vengono
+    convertite in blocco in array NumPy, senza cicli Python per riga.
     """
-    coords = []
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+    buf = _open_buffer(filename, mmap_threshold)
+    header = {}
+    coords = weights = display_coords = None
+
+    try:
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            nl = buf.find(b"\n", pos)
+            if nl < 0:
+                nl = size
+            line = bytes(buf[pos:nl]).decode("ascii", "replace").strip()
+            pos = nl + 1
+
+            if not line:
+                continue
+            if line.startswith("EOF"):
+                break
 
-    node_coord_section = False
-    for line in lines:
-        line = line.strip()
+            keyword = line.split(":", 1)[0].strip().upper()
+            dimension = int(header.get("DIMENSION", 0))
 
-        if line.startswith("NODE_COORD_SECTION"):
-            node_coord_section = True
-            continue
+            if keyword == "NODE_COORD_SECTION":
+                values, pos = _read_numbers(buf, pos)
+                coords = _node_section(values, dimension)
+            elif keyword == "DISPLAY_DATA_SECTION":
+                values, pos = _read_numbers(buf, pos)
+                display_coords = _node_section(values, dimension)
+            elif keyword == "EDGE_WEIGHT_SECTION":
+                values, pos = _read_numbers(buf, pos)
+                weights = _explicit_matrix(values, dimension,
+                                           header.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX"))
+            elif keyword.endswith("_SECTION"):
+                # sezioni non usate per il TSP (FIXED_EDGES, TOUR, ...): le saltiamo
+                _, pos = _read_numbers(buf, pos)
+            elif ":" in line:
+                key, value = line.split(":", 1)
+                header[key.strip().upper()] = value.strip()
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
 
-        if line.startswith("EOF"):
-            break
+    if coords is not None:
+        dimension = len(coords)
+    elif weights is not None:
+        dimension = len(weights)
+    else:
+        dimension = int(header.get("DIMENSION", 0))
 
-        if node_coord_section:
-            parts = line.split()
-            if len(parts) >= 3:
-                _, x, y = parts
-                coords.append((float(x), float(y)))
+    return TSPInstance(
+        name=header.get("NAME", os.path.basename(filename).split(".")[0]),
+        dimension=dimension,
+        edge_weight_type=header.get("EDGE_WEIGHT_TYPE"),
+        edge_weight_format=header.get("EDGE_WEIGHT_FORMAT"),
+        comment=header.get("COMMENT", ""),
+        coords=coords,
+        weights=weights,
+        display_coords=display_coords,
+        header=header,
+    )
+
+
+def read_tsplib(filename):
+    """
+    Legge un file TSPLIB .tsp (anche .tsp.gz) e restituisce:
+    - array (n, 2) delle coordinate [(x1, y1), (x2, y2), ...]
+    - numero di città
+    Per le istanze EXPLICIT senza coordinate usare load_instance.
+    """
+    instance = load_instance(filename)
+    coords = instance.coords
+    if coords is None:
+        coords = instance.display_coords
+    if coords is None:
+        raise ValueError(f"{filename}: istanza senza coordinate "
+                         f"(EDGE_WEIGHT_TYPE {instance.edge_weight_type}), usare load_instance")
 
     return coords, len(coords)
 
 
+def read_tsplib_header(filename):
+    """
+    Legge l'intestazione di un file TSPLIB (righe "CHIAVE : valore" prima
+    della prima sezione dati) e restituisce un dizionario, ad esempio
+    {"NAME": "eil51", "DIMENSION": "51", "EDGE_WEIGHT_TYPE": "EUC_2D"}.
+    """
+    header = {}
+    with open(filename, 'rb') as f:
+        is_gzip = f.read(2) == GZIP_MAGIC
+        f.seek(0)
+        stream = gzip.GzipFile(fileobj=f) if is_gzip else f
+        for raw in stream:
+            line = raw.decode("ascii", "replace").strip()
+            if not line:
+                continue
+            if ":" not in line:
+                # inizio di una sezione dati (NODE_COORD_SECTION, EOF, ...)
+                break
+            key, value = line.split(":", 1)
+            header[key.strip().upper()] = value.strip()
+
+    return header
+
+
 def euclidean_distance(p1, p2):
     """Calcola la distanza euclidea tra due punti."""
     return math.dist(p1, p2)
@@ -0,0 +1,26 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.heuristics.anytime import METHODS, solve_anytime
+from src.utils.tour_utils import tour_cost
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_unbounded_budget_terminates(method):
+    xy = np.random.default_rng(5).uniform(0, 1000, size=(60, 2))
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+    result = {}
+
+    def run():
+        result["best"] = solve_anytime(dist, method, seed=0)
+
+    # senza budget ogni stadio deve fermarsi da solo
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+    best = result["best"]
+    assert sorted(best.tour[:-1]) == list(range(len(dist)))
+    assert best.cost == pytest.approx(tour_cost(best.tour, dist))
@@ -0,0 +1,39 @@
+import math
+
+import numpy as np
+
+from src.utils.distances import DistanceOracle
+
+
+def _oracle(**options):
+    coords = np.random.default_rng(0).uniform(0, 100, size=(50, 2))
+    return DistanceOracle(coords, max_bytes=3 * 50 * 8, **options)
+
+
+def test_scalar_hits_refresh_lru_order():
+    d = _oracle()
+    assert d.max_rows == 3
+    for i in (0, 1, 2):
+        d.row(i)
+    # una lettura scalare sulla riga 0 la rende la più recente
+    d.item(0, 5)
+    d.item(7, 1)  # hit sulla riga 1 per simmetria
+    d.row(3)
+    assert list(d._rows) == [0, 1, 3]
+
+
+def test_no_miss_tracking_without_promotion():
+    d = _oracle(promote_after=math.inf)
+    for i in range(50):
+        for j in range(50):
+            d.item(i, j)
+    assert d._touches == {}
+    assert d.cache_info().currrows == 0
+
+
+def test_promoted_row_clears_miss_count():
+    d = _oracle(promote_after=4)
+    for j in range(1, 5):
+        d.item(0, j)
+    assert 0 in d._rows
+    assert 0 not in d._touches
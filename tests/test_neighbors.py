@@ -0,0 +1,44 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.two_opt import two_opt
+from src.utils.neighbors import METHODS, build_neighbor_lists
+from src.utils.tour_utils import tour_cost
+
+
+def _coincident_coords():
+    # blocco di punti tutti uguali più coppie e terne di punti coincidenti
+    rng = np.random.default_rng(0)
+    distinct = rng.uniform(0, 1000, size=(20, 2))
+    return np.vstack([np.full((15, 2), 500.0), np.repeat(distinct, 3, axis=0)])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_no_city_is_its_own_neighbor(method):
+    coords = _coincident_coords()
+    neighbors = build_neighbor_lists(coords, k=10, method=method)
+    assert neighbors.shape == (len(coords), 10)
+    assert not (neighbors == np.arange(len(coords))[:, None]).any()
+
+
+def test_two_opt_terminates_with_coincident_points():
+    coords = _coincident_coords()
+    diff = coords[:, None, :] - coords[None, :, :]
+    dist = np.sqrt((diff ** 2).sum(axis=2))
+    neighbors = build_neighbor_lists(coords, k=10)
+    tour, _ = nearest_neighbor(dist)
+    result = {}
+
+    def run():
+        result["tour"], result["cost"] = two_opt(dist, tour, neighbors)
+
+    # con una città tra i propri vicini 2-opt non terminava
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert sorted(result["tour"][:-1]) == list(range(len(coords)))
+    assert result["cost"] == pytest.approx(tour_cost(result["tour"], dist))
@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.heuristics.greedy import nearest_neighbor
+from src.heuristics.parallel_sa import parallel_simulated_annealing
+from src.utils.neighbors import build_neighbor_lists
+
+
+def _instance(n=60):
+    xy = np.random.default_rng(3).uniform(0, 1000, size=(n, 2))
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+    return dist, build_neighbor_lists(xy, k=8)
+
+
+def test_tempering_exchanges_and_matches_in_process_run():
+    dist, neighbors = _instance()
+    tour, cost = nearest_neighbor(dist)
+    results = [parallel_simulated_annealing(dist, tour, "tempering", n_chains=4, workers=workers,
+                                            seed=7, neighbors=neighbors, iterations=5000,
+                                            exchange_every=250)
+               for workers in (1, 2)]
+    (tour1, cost1, stats1), (tour2, cost2, stats2) = results
+    assert tour1 == tour2 and cost1 == cost2
+    assert sorted(tour1[:-1]) == list(range(len(dist)))
+    assert cost1 < cost
+    # scala calibrata: le repliche adiacenti si scambiano davvero
+    assert sum(st["swaps"] for st in stats1) > 0
+    temperatures = sorted(st["final_temperature"] for st in stats1)
+    assert temperatures[-1] / temperatures[0] < 2
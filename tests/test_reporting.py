@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.solver.reporting import report_solver
+from src.utils.instrumentation import Recorder
+
+
+def test_report_solver_splits_presolve_and_solve_time():
+    rec = Recorder()
+    model = SimpleNamespace(_presolve_time=0.5, NumVars=10, NumConstrs=7, IsMIP=1, NodeCount=3.0)
+    report_solver(rec, "mtz", model, build_time=0.2, runtime=2.0)
+
+    assert rec.timers["mtz.build"] == (pytest.approx(0.2), 1)
+    assert rec.timers["mtz.presolve"] == (pytest.approx(0.5), 1)
+    assert rec.timers["mtz.solve"] == (pytest.approx(1.5), 1)
+    assert rec.counters == {"mtz.variables": 10, "mtz.constraints": 7, "mtz.nodes": 3}
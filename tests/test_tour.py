@@ -0,0 +1,103 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from src.utils.tour import Tour, TwoLevelTour
+from src.utils.tour_utils import tour_cost
+
+
+def _edges(tour):
+    """Archi non orientati del ciclo: due tour sono lo stesso ciclo se coincidono."""
+    return {frozenset((city, tour.next(city))) for city in range(len(tour))}
+
+
+def _flip_both(tour, reference, a, b):
+    """
+    Stessa inversione sui due tour. Le due strutture possono percorrere il
+    ciclo in versi opposti (invertire il complementare cambia il verso): in
+    quel caso il cammino da a a b di tour è quello da b ad a di reference.
+    """
+    if reference.next(a) == tour.next(a):
+        reference.flip(a, b)
+    else:
+        reference.flip(b, a)
+    tour.flip(a, b)
+
+
+def _check_links(tour, rng):
+    """next/prev/between coerenti con l'ordine di visita di to_list()."""
+    n = len(tour)
+    cycle = tour.to_list(closed=False)
+    assert sorted(cycle) == list(range(n))
+    position = {city: k for k, city in enumerate(cycle)}
+    for k, city in enumerate(cycle):
+        assert tour.next(city) == cycle[(k + 1) % n]
+        assert tour.prev(city) == cycle[k - 1]
+    for _ in range(20):
+        a, b, c = rng.sample(cycle, 3)
+        forward = (position[b] - position[a]) % n <= (position[c] - position[a]) % n
+        assert tour.between(a, b, c) == forward
+
+
+def test_list_round_trip():
+    order = [3, 0, 4, 1, 2]
+    for cls in (Tour, TwoLevelTour):
+        tour = cls.from_list(order + [3])
+        assert tour.to_list() == order + [3]
+        assert tour.to_list(closed=False, start=4) == [4, 1, 2, 3, 0]
+
+
+@pytest.mark.parametrize("group_size", [4, 7])
+def test_two_level_flip_matches_array_flip(group_size):
+    n = 60
+    rng = random.Random(group_size)
+    order = list(range(n))
+    rng.shuffle(order)
+    reference = Tour(order)
+    tour = TwoLevelTour(order, group_size=group_size)
+    rebuilds = 0
+
+    for _ in range(400):
+        a, b = rng.sample(range(n), 2)
+        segments_before = len(tour.segments)
+        _flip_both(tour, reference, a, b)
+        # le divisioni aumentano i segmenti: se diminuiscono c'è stata una ricostruzione
+        rebuilds += len(tour.segments) < segments_before
+        assert len(tour.segments) <= 2 * math.ceil(n / group_size)
+
+        assert _edges(tour) == _edges(reference)
+        _check_links(tour, rng)
+        _check_links(reference, rng)
+
+    assert rebuilds > 0
+
+
+def test_flip_across_end_of_segment_list():
+    n = 40
+    order = list(range(n))
+    reference = Tour(order)
+    tour = TwoLevelTour(order, group_size=5)
+    rng = random.Random(0)
+    # il cammino da 37 in avanti fino a 2 attraversa la fine della lista dei segmenti
+    for a, b in [(37, 2), (35, 4), (39, 0), (33, 31)]:
+        _flip_both(tour, reference, a, b)
+        assert _edges(tour) == _edges(reference)
+        _check_links(tour, rng)
+
+
+@pytest.mark.parametrize("cls", [Tour, TwoLevelTour])
+def test_two_opt_move_updates_cached_cost(cls):
+    n = 50
+    xy = np.random.default_rng(4).uniform(0, 100, size=(n, 2))
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+    rng = random.Random(1)
+    tour = cls(list(range(n)), dist)
+    tour.cost
+    for _ in range(100):
+        a, c = rng.sample(range(n), 2)
+        if c in (tour.next(a), tour.prev(a)):
+            continue
+        tour.two_opt_move(a, c)
+        assert tour.cost == pytest.approx(tour_cost(tour.to_list(), dist))
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from src.solver.tsp_mtz import _arcs, _start_values
+
+
+@pytest.mark.parametrize("k", [None, 3])
+def test_mip_start_has_one_arc_in_and_out_per_node(k):
+    n = 40
+    xy = np.random.default_rng(1).uniform(0, 100, size=(n, 2))
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+    order = np.random.default_rng(2).permutation(n).tolist()
+    tour = order + [order[0]]
+
+    tail, head = _arcs(dist, k, tour)
+    start = _start_values(tail, head, n, tour)
+    chosen = start > 0.5
+
+    assert chosen.sum() == n
+    assert (np.bincount(tail[chosen], minlength=n) == 1).all()
+    assert (np.bincount(head[chosen], minlength=n) == 1).all()
+    successor = dict(zip(tail[chosen].tolist(), head[chosen].tolist()))
+    assert [successor[a] for a in tour[:-1]] == tour[1:]